@@ -13,12 +13,14 @@ import os
 from formatting_checker import (
     is_in_table, is_main_heading, is_introduction_heading, is_bibliography_heading,
     is_section_heading, is_subsection_heading, is_figure_caption, is_table_title,
-    is_bibliography_item, is_list_item, is_appendix_heading, get_paragraph_type
+    is_bibliography_item, is_list_item, is_appendix_heading, get_paragraph_type,
+    check_document_formatting
 )
 
 from formatting_utils import (
     get_effective_first_line_indent_obj, get_effective_alignment, get_first_line_indent_cm
 )
+from classification_trace import ClassificationTrace
 
 def analyze_document(docx_path):
     """
@@ -162,9 +164,25 @@ def analyze_document(docx_path):
         import traceback
         traceback.print_exc()
 
+def trace_document(docx_path):
+    """
+    Прогоняет полную проверку с трассировкой классификатора, сохраняет ее
+    в <документ>.trace.jsonl и выводит путь по детекторам для каждого абзаца.
+    """
+    trace = ClassificationTrace()
+    check_document_formatting(docx_path, trace=trace)
+    trace_path = trace.write_jsonl(f"{os.path.splitext(docx_path)[0]}.trace.jsonl")
+    
+    for record in trace.records:
+        tried = ", ".join(f"{step['detector']}={'да' if step['result'] else 'нет'}" for step in record["path"])
+        outcome = record.get("kind") or f"пропущен ({record.get('skipped')})"
+        print(f"Параграф {record['para_idx']}: {outcome} <- {tried}")
+        print(f"  Текст: {record.get('text', '')}")
+    print(f"Трассировка сохранена: {trace_path}")
+
 def main():
     if len(sys.argv) < 2:
-        print("Использование: python analyze_docx.py <путь_к_docx_файлу>")
+        print("Использование: python analyze_docx.py <путь_к_docx_файлу> [--trace]")
         return
     
     docx_path = sys.argv[1]
@@ -172,7 +190,10 @@ def main():
         print(f"Файл не найден: {docx_path}")
         return
     
-    analyze_document(docx_path)
+    if "--trace" in sys.argv[2:]:
+        trace_document(docx_path)
+    else:
+        analyze_document(docx_path)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -5,20 +5,25 @@
 Требуется Python 3.13+ и python-docx 1.2.0+, которые поддерживают API для комментариев.
 """
 
-from flask import Flask, render_template, request, send_from_directory, url_for, redirect, flash, jsonify
+from flask import (Flask, render_template, request, send_from_directory, url_for, redirect, flash, jsonify, Response,
+                   abort, stream_with_context)
 import os
 import uuid
 import time
 import sys
 import platform
 from datetime import datetime
-from werkzeug.utils import secure_filename
+from werkzeug.utils import secure_filename, safe_join
 from pathlib import Path
 import docx
 
 # Импортируем существующие модули
 from formatting_checker import check_document_formatting
-from comment_utils import add_comments_to_docx
+from comment_utils import DebugSidecar, add_comments_to_docx, aggregate_comments, debug_sidecar_path
+from rule_profiles import load_profiles, get_profile
+from classification_trace import ClassificationTrace
+from findings_export import FORMATS, dump_findings
+from findings_report import SNAPSHOT_SUFFIX, load_snapshot, report_cache_path, stream_report, write_snapshot
 
 # Определяем базовую директорию приложения (для корректной работы абсолютных путей)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -31,6 +36,36 @@ UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 ALLOWED_EXTENSIONS = {'docx'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # Ограничение размера файла 16MB
+# Лимит времени на проверку одного документа (в секундах). По истечении лимита
+# показываем частичный отчет, а не держим запрос до таймаута воркера
+app.config['CHECK_TIME_BUDGET'] = 60
+# Агрегация замечаний: сколько примеров оставлять для нарушения, повторяющегося
+# по всему документу, и ограничения числа замечаний по категориям
+app.config['COMMENT_MAX_EXAMPLES'] = 3
+app.config['COMMENT_CATEGORY_CAPS'] = {}
+app.config['COMMENT_DEFAULT_CATEGORY_CAP'] = 200
+# Профиль правил по умолчанию (None - default_profile из rule_profiles.json)
+app.config['RULE_PROFILE'] = None
+# Трассировка классификации абзацев: рядом с загруженным файлом сохраняется
+# <файл>.trace.jsonl с решениями детекторов. Только для отладки
+app.config['CLASSIFICATION_TRACE'] = False
+# Уровень сжатия zlib (0-9) для измененных частей документа с замечаниями:
+# меньше - быстрее ответ, но больше файл
+app.config['OUTPUT_COMPRESSION_LEVEL'] = 6
+# Формат результата по умолчанию: 'docx' - документ с комментариями,
+# 'json'/'ndjson' - только список замечаний, документ не переписывается.
+# Для отдельного запроса формат задается полем формы или параметром format
+app.config['OUTPUT_FORMAT'] = 'docx'
+# Отладка привязки комментариев: к тексту замечаний добавляется [Debug ID: ...],
+# а рядом с результатом сохраняется <файл>.debug.jsonl (пишется в фоне после ответа)
+app.config['COMMENT_DEBUG'] = False
+# Перед проверкой из документа удаляются комментарии автора проверки: студент
+# загружает исправленную работу вместе с нашими прошлыми замечаниями
+app.config['STRIP_PRIOR_COMMENTS'] = True
+
+# Компилируем профили правил при старте, чтобы ошибка в конфигурации была видна сразу.
+# Дальше они берутся из кэша и перечитываются только при изменении файла
+get_profile(app.config['RULE_PROFILE'])
 
 # Создаем директорию для загрузок, если она не существует
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -70,20 +105,31 @@ def estimate_pages(doc):
 @app.route('/')
 def index():
     """Главная страница с формой загрузки"""
-    return render_template('index.html')
+    profiles, default_name = load_profiles()
+    return render_template('index.html', profiles=profiles.values(),
+                           selected_profile=app.config['RULE_PROFILE'] or default_name)
+
+def upload_error(message, output_format, status=400):
+    """Ошибка загрузки: для JSON/NDJSON - ответ с ошибкой, для браузера - сообщение и возврат к форме"""
+    if output_format in FORMATS:
+        return jsonify({"error": message}), status
+    flash(message)
+    return redirect(url_for('index'))
 
 @app.route('/upload', methods=['POST'])
 def upload():
     """Обработка загрузки файла"""
+    output_format = request.values.get('format') or app.config['OUTPUT_FORMAT']
+    if output_format != 'docx' and output_format not in FORMATS:
+        return upload_error(f'Неизвестный формат результата: {output_format}', 'json')
+    
     if 'docx_file' not in request.files:
-        flash('Файл не выбран')
-        return redirect(url_for('index'))
+        return upload_error('Файл не выбран', output_format)
     
     file = request.files['docx_file']
     
     if file.filename == '':
-        flash('Файл не выбран')
-        return redirect(url_for('index'))
+        return upload_error('Файл не выбран', output_format)
     
     if file and allowed_file(file.filename):
         # Безопасное сохранение файла
@@ -96,26 +142,50 @@ def upload():
         
         author = request.form.get('author', 'Norm Control')
         output_prefix = request.form.get('output_prefix', '_with_remarks')
+        profile_name = request.form.get('profile') or app.config['RULE_PROFILE']
         
         try:
+            trace = ClassificationTrace() if app.config['CLASSIFICATION_TRACE'] else None
+            comments = check_document_formatting(file_path, author,
+                                                 time_budget=app.config['CHECK_TIME_BUDGET'],
+                                                 profile=profile_name, trace=trace)
+            if trace is not None:
+                trace.write_jsonl(f"{os.path.splitext(file_path)[0]}.trace.jsonl")
             
-            document_stats = get_document_stats(file_path)
-            
+            # Машинная проверка: только список замечаний, документ не переписываем
+            if output_format in FORMATS:
+                return Response(dump_findings(comments, output_format), mimetype=FORMATS[output_format])
             
-            comments = check_document_formatting(file_path, author)
+            document_stats = get_document_stats(file_path)
             
             # Если есть комментарии, добавляем их в документ
             if comments:
                 base_name = Path(filename).stem
                 output_filename = f"{base_name}{output_prefix}.docx"
                 output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
-                result_file = add_comments_to_docx(file_path, output_path, comments)
+                document_comments = aggregate_comments(comments,
+                                                       max_examples=app.config['COMMENT_MAX_EXAMPLES'],
+                                                       category_caps=app.config['COMMENT_CATEGORY_CAPS'],
+                                                       default_category_cap=app.config['COMMENT_DEFAULT_CATEGORY_CAP'])
+                # Снимок замечаний для HTML-отчета; сам отчет строится при первом открытии
+                write_snapshot(comments, os.path.join(app.config['UPLOAD_FOLDER'], output_filename + SNAPSHOT_SUFFIX))
+                debug = DebugSidecar() if app.config['COMMENT_DEBUG'] else None
+                # Прежние замечания автора снимаются при добавлении новых, в том же проходе
+                strip_author = author if app.config['STRIP_PRIOR_COMMENTS'] else None
+                result_file = add_comments_to_docx(file_path, output_path, document_comments,
+                                                   compression_level=app.config['OUTPUT_COMPRESSION_LEVEL'],
+                                                   debug=debug, strip_author=strip_author)
                 
-                
-                return render_template('result.html', 
+                response = render_template('result.html', 
                                       filename=output_filename,
                                       comment_count=len(comments),
-                                      document_stats=document_stats)
+                                      document_stats=document_stats,
+                                      partial=comments.is_partial,
+                                      skipped=comments.skipped)
+                # Отладочные записи сохраняются в фоне, ответ их не ждет
+                if debug is not None:
+                    debug.write_in_background(debug_sidecar_path(result_file))
+                return response
             else:
                 
                 return render_template('result.html', 
@@ -124,18 +194,30 @@ def upload():
                                       document_stats=document_stats)
                 
         except Exception as e:
-            flash(f"Ошибка при обработке файла: {e}")
-            return redirect(url_for('index'))
+            return upload_error(f"Ошибка при обработке файла: {e}", output_format, 500)
             
     else:
-        flash('Разрешены только файлы с расширением .docx')
-        return redirect(url_for('index'))
+        return upload_error('Разрешены только файлы с расширением .docx', output_format)
 
 @app.route('/download/<filename>')
 def download(filename):
     """Скачивание обработанного файла"""
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+@app.route('/report/<filename>')
+def report(filename):
+    """HTML-отчет по замечаниям: строится потоком из снимка, дальше отдается из кэша"""
+    snapshot_path = safe_join(app.config['UPLOAD_FOLDER'], filename + SNAPSHOT_SUFFIX)
+    if snapshot_path is None or not os.path.isfile(snapshot_path):
+        abort(404)
+    cache_path = report_cache_path(snapshot_path)
+    if os.path.isfile(cache_path):
+        return send_from_directory(app.config['UPLOAD_FOLDER'], os.path.basename(cache_path), mimetype='text/html')
+    
+    template = app.jinja_env.get_template('report.html')
+    chunks = stream_report(template, load_snapshot(snapshot_path), cache_path, docx_filename=filename)
+    return Response(stream_with_context(chunks), mimetype='text/html')
+
 @app.route('/debug/paths')
 def debug_paths():
     """Добавил этот маршрут для диагностики проблем на хостинге"""
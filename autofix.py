@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Автоисправление оформления на уровне стилей.
+
+Большая часть замечаний о шрифте, выравнивании, отступах и интервале
+появляется не из-за отдельных runs, а из-за неправильного определения стиля
+(Normal, Заголовок 1), от которого их наследуют сотни абзацев. Поэтому
+исправления вносятся в стили, а не в каждый run:
+
+1. Документ проверяется, замечания к основному тексту и заголовкам
+   раскладываются по стилям абзацев: неправильное значение либо унаследовано
+   от стиля, либо задано прямым форматированием.
+2. Стили, от которых унаследовано не меньше MIN_STYLE_FINDINGS замечаний,
+   исправляются по скомпилированному профилю правил (RuleProfile): шрифт,
+   размер, цвет, полужирность, выравнивание, отступ первой строки, интервал.
+   Если стилем пользуются и другие абзацы (например, Normal в таблицах) или от
+   него унаследованы другие стили, исходный стиль не меняется: создается
+   производный стиль "<имя> (нормоконтроль)" с исправлениями, и на него
+   переключаются только абзацы с замечаниями.
+3. У абзацев с замечаниями снимается только то прямое форматирование,
+   которое противоречит профилю, - и только если стиль абзаца дает
+   правильное значение.
+4. Оставшееся неправильное прямое форматирование во всех абзацах основного
+   текста и заголовков (по типам абзацев из классификатора) исправляется
+   преобразованиями XSLT (format_normalizer): шрифт runs, цвет, выравнивание.
+
+Использование:
+    python autofix.py документ.docx [исправленный.docx] [--profile имя]
+"""
+
+import os
+import sys
+from collections import Counter, namedtuple
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+from docx.shared import Emu
+
+from docx_writer import save_docx
+from formatting_checker import check_document_formatting
+from format_normalizer import FORCE_FONT, REMOVE_COLOR, SET_ALIGNMENT, normalize_part
+from formatting_utils import _get_style_attr
+from rule_profiles import get_profile
+
+# Сколько замечаний должно быть унаследовано от стиля, чтобы исправлять сам стиль
+MIN_STYLE_FINDINGS = 3
+
+DERIVED_STYLE_SUFFIX = " (нормоконтроль)"
+
+# Свойства, которые исправляются на уровне стиля
+FONT_NAME, FONT_SIZE, FONT_COLOR, BOLD = "font_name", "font_size", "font_color", "bold"
+ALIGNMENT, FIRST_LINE_INDENT, LINE_SPACING = "alignment", "first_line_indent", "line_spacing"
+RUN_PROPERTIES = (FONT_NAME, FONT_SIZE, FONT_COLOR, BOLD)
+
+# Элементы документа, которые исправляются через стили (как в кодах замечаний)
+FIXABLE_ELEMENTS = ("main_text", "main_heading", "section_heading", "subsection_heading")
+
+# Исправленный стиль: имя, элемент, сколько замечаний от него унаследовано,
+# исправленные свойства и создан ли производный стиль
+StyleFix = namedtuple("StyleFix", ["style_name", "element", "findings", "properties", "derived_from"])
+# normalized - {свойство: сколько значений прямого форматирования исправлено преобразованиями XSLT}
+AutofixResult = namedtuple("AutofixResult", ["style_fixes", "paragraphs_restyled", "direct_removed", "normalized"])
+
+
+class ElementTargets(dict):
+    """Ожидаемые значения свойств элемента {свойство: значение} и допуск отступа первой строки."""
+
+    def __init__(self, values, indent_tolerance):
+        super().__init__(values)
+        self.indent_tolerance = indent_tolerance
+
+
+def element_targets(element, profile):
+    """Ожидаемые значения свойств элемента по профилю правил (None - свойство не проверяется)."""
+    targets = {
+        FONT_NAME: profile.font_name,
+        FONT_SIZE: profile.font_size,
+        FONT_COLOR: profile.font_color,
+        BOLD: None,
+        ALIGNMENT: WD_ALIGN_PARAGRAPH.JUSTIFY,
+        FIRST_LINE_INDENT: profile.text_first_line_indent,
+        LINE_SPACING: profile.text_line_spacing,
+    }
+    indent_tolerance = profile.text_indent_tolerance
+    if element == "main_heading":
+        targets.update({BOLD: True, ALIGNMENT: WD_ALIGN_PARAGRAPH.CENTER, FIRST_LINE_INDENT: Emu(0),
+                        LINE_SPACING: None})
+        indent_tolerance = profile.heading_no_indent_tolerance
+    elif element in ("section_heading", "subsection_heading"):
+        targets.update({BOLD: True, ALIGNMENT: WD_ALIGN_PARAGRAPH.LEFT,
+                        FIRST_LINE_INDENT: profile.heading_first_line_indent, LINE_SPACING: None})
+        indent_tolerance = profile.heading_indent_tolerance
+    return ElementTargets(targets, indent_tolerance)
+
+
+def _matches(prop, value, targets, profile):
+    """Значение соответствует профилю (с теми же допусками, что в проверках)."""
+    target = targets[prop]
+    if target is None:
+        return True
+    if prop == FONT_SIZE:
+        return value is not None and abs(value - target) <= profile.font_size_tolerance
+    if prop == FIRST_LINE_INDENT:
+        return abs((value or 0) - target) <= targets.indent_tolerance
+    if prop == LINE_SPACING:
+        return value is not None and abs(value - target) <= profile.text_line_spacing_tolerance
+    if prop == BOLD:
+        return bool(value) == target
+    return value == target
+
+def _direct_value(para, run, prop):
+    """Прямое форматирование абзаца (run=None) или run."""
+    if prop == ALIGNMENT:
+        return para.paragraph_format.alignment
+    if prop == FIRST_LINE_INDENT:
+        return para.paragraph_format.first_line_indent
+    if prop == LINE_SPACING:
+        return para.paragraph_format.line_spacing
+    font = run.font
+    if prop == FONT_NAME:
+        return font.name
+    if prop == FONT_SIZE:
+        return font.size
+    if prop == FONT_COLOR:
+        return font.color.rgb if font.color.type is not None else None
+    return font.bold
+
+_STYLE_PATHS = {
+    ALIGNMENT: "paragraph_format.alignment",
+    FIRST_LINE_INDENT: "paragraph_format.first_line_indent",
+    LINE_SPACING: "paragraph_format.line_spacing",
+    FONT_NAME: "font.name",
+    FONT_SIZE: "font.size",
+    FONT_COLOR: "font.color.rgb",
+    BOLD: "font.bold",
+}
+
+def _style_value(style, prop):
+    """Значение свойства в стиле с учетом цепочки basedOn."""
+    return _get_style_attr(style, _STYLE_PATHS[prop])
+
+def _run_style_value(run, prop):
+    """Значение из символьного стиля run (его прямое форматирование не трогаем)."""
+    if prop in RUN_PROPERTIES and run.style is not None and run.style.type == WD_STYLE_TYPE.CHARACTER:
+        return _style_value(run.style, prop)
+    return None
+
+def _set_style_value(style, prop, value):
+    if prop == ALIGNMENT:
+        style.paragraph_format.alignment = value
+    elif prop == FIRST_LINE_INDENT:
+        style.paragraph_format.first_line_indent = value
+    elif prop == LINE_SPACING:
+        style.paragraph_format.line_spacing = value
+    elif prop == FONT_NAME:
+        style.font.name = value
+        # Тема шрифта в Word важнее явного имени - убираем ее
+        r_fonts = style.element.rPr.rFonts if style.element.rPr is not None else None
+        if r_fonts is not None:
+            for attr in ("w:asciiTheme", "w:hAnsiTheme", "w:cstheme", "w:eastAsiaTheme"):
+                r_fonts.attrib.pop(qn(attr), None)
+            r_fonts.set(qn("w:cs"), value)
+    elif prop == FONT_SIZE:
+        style.font.size = value
+    elif prop == FONT_COLOR:
+        style.font.color.rgb = value
+    elif prop == BOLD:
+        style.font.bold = value
+
+def _clear_direct(para, run, prop):
+    if prop == ALIGNMENT:
+        para.paragraph_format.alignment = None
+    elif prop == FIRST_LINE_INDENT:
+        para.paragraph_format.first_line_indent = None
+    elif prop == LINE_SPACING:
+        para.paragraph_format.line_spacing = None
+    elif prop == FONT_NAME:
+        run.font.name = None
+    elif prop == FONT_SIZE:
+        run.font.size = None
+    elif prop == FONT_COLOR:
+        color = run._r.rPr.color if run._r.rPr is not None else None
+        if color is not None:
+            run._r.rPr.remove(color)
+    elif prop == BOLD:
+        run.font.bold = None
+
+
+class _StyleUsage:
+    """Замечания, собранные по одному стилю абзаца."""
+
+    def __init__(self, style):
+        self.style = style
+        self.elements = Counter()      # элемент -> абзацев с замечаниями
+        self.inherited = Counter()     # элемент -> абзацев, где неправильное значение от стиля
+        self.paragraphs = {}           # индекс абзаца -> элемент
+
+
+def _wrong_inherited(para, style, targets, profile):
+    """Есть ли у абзаца неправильное значение, унаследованное от стиля."""
+    for prop in (ALIGNMENT, FIRST_LINE_INDENT):
+        if _direct_value(para, None, prop) is None and not _matches(prop, _style_value(style, prop), targets, profile):
+            return True
+    for run in para.runs:
+        if not run.text.strip():
+            continue
+        for prop in RUN_PROPERTIES:
+            if targets[prop] is None or _direct_value(para, run, prop) is not None or _run_style_value(run, prop) is not None:
+                continue
+            value = _style_value(style, prop)
+            # Шрифт, размер и цвет, не заданные нигде, проверка не считает ошибкой
+            if (value is not None or prop == BOLD) and not _matches(prop, value, targets, profile):
+                return True
+    return False
+
+def _collect_usage(paragraphs, findings, profile):
+    """Раскладывает абзацы с замечаниями по стилям: {styleId: _StyleUsage}."""
+    usage = {}
+    for finding in findings:
+        element, _, rule = finding.code.partition(".")
+        if element not in FIXABLE_ELEMENTS or not 0 <= finding.para_idx < len(paragraphs):
+            continue
+        para = paragraphs[finding.para_idx]
+        style = para.style
+        if style is None:
+            continue
+        entry = usage.get(style.style_id)
+        if entry is None:
+            entry = usage[style.style_id] = _StyleUsage(style)
+        if finding.para_idx in entry.paragraphs:
+            continue
+        entry.paragraphs[finding.para_idx] = element
+        entry.elements[element] += 1
+        if _wrong_inherited(para, style, element_targets(element, profile), profile):
+            entry.inherited[element] += 1
+    return usage
+
+def _style_users(doc, style):
+    """Абзацы с текстом во всем документе (и в таблицах), которые используют стиль."""
+    default = doc.styles.default(WD_STYLE_TYPE.PARAGRAPH)
+    users = []
+    for p in doc.element.body.iter(qn("w:p")):
+        style_id = p.style
+        if (style_id == style.style_id or (style_id is None and default is not None and
+                                            default.style_id == style.style_id)):
+            if "".join(p.itertext()).strip():
+                users.append(p)
+    return users
+
+def _has_derived_styles(doc, style):
+    return any(other.base_style is not None and other.base_style.style_id == style.style_id
+               for other in doc.styles if other.type == WD_STYLE_TYPE.PARAGRAPH)
+
+def _derived_style(doc, style):
+    """Производный стиль "<имя> (нормоконтроль)" на основе style (при повторном запуске - тот же)."""
+    name = f"{style.name}{DERIVED_STYLE_SUFFIX}"
+    for existing in doc.styles:
+        if existing.name == name and existing.type == WD_STYLE_TYPE.PARAGRAPH:
+            return existing
+    derived = doc.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+    derived.base_style = style
+    derived.quick_style = False
+    # Стиль следующего абзаца - как у исходного, чтобы Word вел себя так же при вводе текста
+    if style.next_paragraph_style is not None and style.next_paragraph_style.style_id != style.style_id:
+        derived.next_paragraph_style = style.next_paragraph_style
+    return derived
+
+
+def autofix_document(doc, findings, profile=None, min_style_findings=MIN_STYLE_FINDINGS):
+    """
+    Исправляет оформление документа через стили.
+
+    Args:
+        doc: документ docx (изменяется на месте)
+        findings: замечания проверки этого документа (Finding)
+        profile: профиль правил (None - профиль по умолчанию)
+        min_style_findings: сколько замечаний должно быть унаследовано от стиля,
+            чтобы исправлять стиль
+
+    Returns:
+        AutofixResult: исправленные стили, сколько абзацев переключено на
+        производные стили и сколько значений прямого форматирования снято
+    """
+    profile = get_profile(profile)
+    paragraphs = doc.paragraphs
+    usage = _collect_usage(paragraphs, findings, profile)
+
+    style_fixes = []
+    restyled = 0
+    for entry in usage.values():
+        element, inherited = entry.inherited.most_common(1)[0] if entry.inherited else (None, 0)
+        if inherited < min_style_findings:
+            continue
+        style = entry.style
+        targets = element_targets(element, profile)
+        properties = [prop for prop, target in targets.items()
+                      if target is not None and not _matches(prop, _style_value(style, prop), targets, profile)]
+        if not properties:
+            continue
+        fixed_paragraphs = {i for i, kind in entry.paragraphs.items() if kind == element}
+        # Стиль можно править на месте, только если им пользуются лишь исправляемые абзацы
+        fixed_elements = {paragraphs[i]._p for i in fixed_paragraphs}
+        exclusive = (all(p in fixed_elements for p in _style_users(doc, style))
+                     and not _has_derived_styles(doc, style))
+        if exclusive:
+            target_style, derived_from = style, None
+        elif element == "main_text":
+            # Стилем пользуются и другие абзацы - исправления в производный стиль
+            target_style, derived_from = _derived_style(doc, style), style.name
+            for i in fixed_paragraphs:
+                paragraphs[i].style = target_style
+            restyled += len(fixed_paragraphs)
+        else:
+            # Общий стиль заголовков переносить на производный не стоит: по имени
+            # стиля определяется уровень заголовка
+            continue
+        for prop in properties:
+            _set_style_value(target_style, prop, targets[prop])
+        style_fixes.append(StyleFix(style.name, element, inherited, tuple(properties), derived_from))
+
+    direct_removed = 0
+    for entry in usage.values():
+        for i, element in entry.paragraphs.items():
+            direct_removed += _strip_conflicting_direct(paragraphs[i], element_targets(element, profile), profile)
+    return AutofixResult(style_fixes, restyled, direct_removed, Counter())
+
+def _strip_conflicting_direct(para, targets, profile):
+    """
+    Снимает прямое форматирование, противоречащее профилю, если стиль абзаца
+    дает правильное значение. Возвращает число снятых значений.
+    """
+    style = para.style
+    removed = 0
+    for prop in (ALIGNMENT, FIRST_LINE_INDENT, LINE_SPACING):
+        value = _direct_value(para, None, prop)
+        if value is not None and not _matches(prop, value, targets, profile) and \
+                _matches(prop, _style_value(style, prop), targets, profile):
+            _clear_direct(para, None, prop)
+            removed += 1
+    for run in para.runs:
+        for prop in RUN_PROPERTIES:
+            value = _direct_value(para, run, prop)
+            if value is None or _matches(prop, value, targets, profile):
+                continue
+            inherited = _run_style_value(run, prop)
+            if inherited is None:
+                inherited = _style_value(style, prop)
+            # Снимаем, только если после этого значение из стиля будет правильным
+            if (inherited is not None or prop == BOLD) and _matches(prop, inherited, targets, profile):
+                _clear_direct(para, run, prop)
+                removed += 1
+    return removed
+
+
+def normalization_passes(profile):
+    """
+    Проходы нормализации прямого форматирования по профилю:
+    [(преобразование, типы абзацев, значение)], по проходу на каждое значение.
+    """
+    profile = get_profile(profile)
+    groups = {}
+    for element in FIXABLE_ELEMENTS:
+        targets = element_targets(element, profile)
+        for transform, prop in ((FORCE_FONT, FONT_NAME), (REMOVE_COLOR, FONT_COLOR), (SET_ALIGNMENT, ALIGNMENT)):
+            target = targets[prop]
+            if target is None:
+                continue
+            value = WD_ALIGN_PARAGRAPH.to_xml(target) if prop == ALIGNMENT else str(target)
+            groups.setdefault((transform, value), []).append(element)
+    return [(transform, kinds, value) for (transform, value), kinds in groups.items()]
+
+def autofix_file(input_path, output_path, profile=None, min_style_findings=MIN_STYLE_FINDINGS):
+    """
+    Проверяет документ, исправляет стили и прямое форматирование и сохраняет
+    исправленный документ. Неизмененные части (картинки и т.п.) копируются
+    без пересжатия.
+
+    Returns:
+        (AutofixResult, число замечаний до исправления)
+    """
+    findings = check_document_formatting(input_path, profile=profile)
+    doc = Document(input_path)
+    result = autofix_document(doc, findings, profile, min_style_findings)
+    part = doc.part
+    normalized = normalize_part(part, getattr(findings, "paragraph_kinds", {}), normalization_passes(profile))
+    modified = {part.partname, part._styles_part.partname}
+    save_docx(part.document, output_path, input_path, modified_parts=modified)
+    return result._replace(normalized=normalized), len(findings)
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    profile = None
+    if "--profile" in sys.argv:
+        profile = sys.argv[sys.argv.index("--profile") + 1]
+        args.remove(profile)
+    if not args:
+        print("Использование: python autofix.py <документ.docx> [исправленный.docx] [--profile имя]")
+        return
+    input_path = args[0]
+    output_path = args[1] if len(args) > 1 else f"{os.path.splitext(input_path)[0]}_fixed.docx"
+
+    result, before = autofix_file(input_path, output_path, profile)
+    after = len(check_document_formatting(output_path, profile=profile))
+    for fix in result.style_fixes:
+        where = f" -> производный стиль ({fix.derived_from}{DERIVED_STYLE_SUFFIX})" if fix.derived_from else ""
+        print(f"Стиль '{fix.style_name}' ({fix.element}, {fix.findings} замечаний): "
+              f"{', '.join(fix.properties)}{where}")
+    print(f"Абзацев переключено на производные стили: {result.paragraphs_restyled}")
+    print(f"Снято значений прямого форматирования: {result.direct_removed}")
+    for prop, count in result.normalized.items():
+        print(f"Исправлено прямого форматирования ({prop}): {count}")
+    print(f"Замечаний: {before} -> {after}")
+    print(f"Исправленный документ: {output_path}")
+
+if __name__ == "__main__":
+    main()
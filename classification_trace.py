@@ -0,0 +1,101 @@
+"""
+Трассировка классификации абзацев.
+
+Когда абзац определяется неправильно (например, элемент списка принят за
+заголовок раздела), полезно видеть, какие детекторы проверялись, какой из них
+сработал и какие признаки абзаца он при этом видел.
+
+Трассировка включается только явно: проверки принимают trace=None и каждая
+точка трассировки обернута в `if trace is not None`, поэтому без трассировки
+признаки не собираются и лишней работы нет.
+"""
+
+import json
+
+from formatting_utils import get_effective_alignment, get_first_line_indent_cm, get_run_bold_status
+
+# Сколько символов текста абзаца сохранять в трассировке
+TEXT_PREVIEW_LENGTH = 80
+
+
+def paragraph_features(para):
+    """Признаки абзаца, на которые смотрят детекторы типа абзаца."""
+    text = para.text.strip()
+    text_runs = [run for run in para.runs if run.text.strip()]
+    bold_runs = [run for run in text_runs if get_run_bold_status(run, para.style)]
+    numbering = None
+    if para._p.pPr is not None and para._p.pPr.numPr is not None:
+        num_pr = para._p.pPr.numPr
+        numbering = {
+            "num_id": num_pr.numId.val if num_pr.numId is not None else None,
+            "level": num_pr.ilvl.val if num_pr.ilvl is not None else None,
+        }
+    return {
+        "style": para.style.name if para.style is not None else None,
+        "length": len(text),
+        "is_upper": text.isupper(),
+        "ends_with_period": text.endswith("."),
+        "runs": len(text_runs),
+        "bold_runs": len(bold_runs),
+        "alignment": str(get_effective_alignment(para)),
+        "first_line_indent_cm": round(get_first_line_indent_cm(para), 2),
+        "numbering": numbering,
+    }
+
+
+class ClassificationTrace:
+    """
+    Журнал решений классификатора: одна запись на абзац.
+
+    Запись содержит признаки абзаца, путь по детекторам (в порядке проверки,
+    с результатом каждого), итоговый тип или причину пропуска, а также
+    заметки проверок (например, как был определен тип списка).
+    """
+
+    def __init__(self):
+        self.records = []
+        self._by_para = {}
+
+    def start(self, para_idx, para, **state):
+        """Начинает запись для абзаца; state - состояние обхода (раздел литературы и т.п.)."""
+        text = para.text.strip()
+        record = {
+            "para_idx": para_idx,
+            "text": text[:TEXT_PREVIEW_LENGTH],
+            "state": state,
+            "features": paragraph_features(para),
+            "path": [],
+            "kind": None,
+        }
+        self.records.append(record)
+        self._by_para[para_idx] = record
+        return record
+
+    def detector(self, para_idx, name, result):
+        """Отмечает, что детектор name проверялся и что он вернул."""
+        self._by_para[para_idx]["path"].append({"detector": name, "result": bool(result)})
+
+    def decide(self, para_idx, kind):
+        """Итоговый тип абзаца."""
+        self._by_para[para_idx]["kind"] = kind
+
+    def skip(self, para_idx, reason):
+        """Абзац не проверялся (до введения, внутри таблицы и т.п.)."""
+        self._by_para[para_idx]["skipped"] = reason
+
+    def note(self, para_idx, event, **values):
+        """Дополнительная информация от проверок абзаца."""
+        record = self._by_para.get(para_idx)
+        if record is None:
+            record = {"para_idx": para_idx, "path": [], "kind": None}
+            self.records.append(record)
+            self._by_para[para_idx] = record
+        record.setdefault("notes", []).append({"event": event, **values})
+
+    def write_jsonl(self, path):
+        """Сохраняет трассировку в JSONL: одна строка - один абзац."""
+        with open(path, "w", encoding="utf-8") as f:
+            for record in self.records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str))
+                f.write("\n")
+        return path
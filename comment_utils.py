@@ -1,11 +1,18 @@
+import json
+import re
+import threading
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from lxml import etree
 from docx import Document
+from docx.text.paragraph import Paragraph
 import zipfile
 import os
 import shutil
 from pathlib import Path
+from findings import ELEMENT_NAMES
+from docx_writer import COMMENT_EXTENSION_RELS, DEFAULT_COMPRESSION_LEVEL, save_docx
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
 
 def qn(tag):
     """
@@ -33,7 +40,338 @@ def is_paragraph_in_table(paragraph_element, namespaces):
         parent = parent.getparent()
     return False
 
-def add_comments_to_docx(input_path, output_path, comments_info):
+# Сколько примеров оставлять для нарушения, повторяющегося по всему документу
+DEFAULT_MAX_EXAMPLES = 3
+
+def aggregate_comments(findings, max_examples=DEFAULT_MAX_EXAMPLES, category_caps=None,
+                       default_category_cap=None):
+    """
+    Агрегирует замечания перед добавлением в документ.
+
+    1. Нарушение (код правила), которое повторяется больше чем в max_examples абзацах,
+       сворачивается в одно общее замечание со сводкой плюс max_examples примеров.
+    2. Для каждой категории (элемента документа) оставляется не больше
+       category_caps[категория] (или default_category_cap) замечаний.
+    3. Все оставшиеся замечания к одному абзацу объединяются в один комментарий.
+
+    Текст формируется только для замечаний, которые попали в результат.
+
+    Args:
+        findings: список объектов Finding
+        max_examples: сколько примеров оставлять для повторяющегося нарушения
+            (None - не сворачивать)
+        category_caps: словарь {категория: максимальное число замечаний},
+            категория - префикс кода правила ('main_text', 'section_heading', ...)
+        default_category_cap: ограничение для категорий, которых нет в category_caps
+            (None - без ограничения)
+
+    Returns:
+        list: список кортежей (paragraph_index, comment_text, author), не больше
+        одного на абзац (общие замечания с индексом < 0 не объединяются)
+    """
+    category_caps = category_caps or {}
+    general_comments = []
+    paragraph_findings = []
+    seen = set()
+    for finding in findings:
+        # Точные дубликаты не нужны ни в каком виде
+        if finding in seen:
+            continue
+        seen.add(finding)
+        if finding.para_idx < 0:
+            general_comments.append(tuple(finding))
+        else:
+            paragraph_findings.append(finding)
+
+    # Группируем замечания к абзацам по коду правила, сохраняя порядок появления
+    by_code = {}
+    for finding in paragraph_findings:
+        by_code.setdefault(finding.code, []).append(finding)
+
+    kept = []
+    for occurrences in by_code.values():
+        if max_examples is not None and len(occurrences) > max_examples:
+            paragraphs = {finding.para_idx for finding in occurrences}
+            general_comments.append((-1, f"[Сводка] {occurrences[0].message} "
+                                         f"Нарушение встречается {len(occurrences)} раз(а) в {len(paragraphs)} абзацах; "
+                                         f"комментарии добавлены только к первым {max_examples}.",
+                                     occurrences[0].author))
+            occurrences = sorted(occurrences, key=lambda f: f.para_idx)[:max_examples]
+        kept.extend(occurrences)
+
+    # Ограничение числа замечаний на категорию
+    kept.sort(key=lambda f: f.para_idx)
+    category_counts = {}
+    dropped_counts = {}
+    limited = []
+    for finding in kept:
+        category = finding.category
+        cap = category_caps.get(category, default_category_cap)
+        count = category_counts.get(category, 0)
+        if cap is not None and count >= cap:
+            dropped, _ = dropped_counts.get(category, (0, None))
+            dropped_counts[category] = (dropped + 1, finding.author)
+            continue
+        category_counts[category] = count + 1
+        limited.append(finding)
+    for category, (dropped, author) in dropped_counts.items():
+        category_name = ELEMENT_NAMES.get(category, category)
+        general_comments.append((-1, f"[Сводка] Ещё {dropped} замечаний категории «{category_name}» не показаны "
+                                     f"(ограничение: {category_caps.get(category, default_category_cap)}).",
+                                 author))
+
+    # Объединяем замечания к одному абзацу в один комментарий
+    merged = {}
+    for finding in limited:
+        merged.setdefault((finding.para_idx, finding.author), []).append(finding.message)
+    aggregated = [(paragraph_index, "\n".join(texts), author)
+                  for (paragraph_index, author), texts in merged.items()]
+
+    return general_comments + aggregated
+
+# Символы, которые нельзя записать в XML (управляющие, кроме табуляции и переводов строки)
+_INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _comment_paragraph(comment, text, with_annotation_ref):
+    """Абзац комментария в той же разметке, что создает python-docx."""
+    p = etree.SubElement(comment, qn('w:p'))
+    p_pr = etree.SubElement(p, qn('w:pPr'))
+    etree.SubElement(p_pr, qn('w:pStyle'), {qn('w:val'): 'CommentText'})
+    if with_annotation_ref:
+        r = etree.SubElement(p, qn('w:r'))
+        r_pr = etree.SubElement(r, qn('w:rPr'))
+        etree.SubElement(r_pr, qn('w:rStyle'), {qn('w:val'): 'CommentReference'})
+        etree.SubElement(r, qn('w:annotationRef'))
+    if text:
+        r = etree.SubElement(p, qn('w:r'))
+        t = etree.SubElement(r, qn('w:t'))
+        t.text = text
+        if text != text.strip():
+            t.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+
+def _comment_reference_run(comment_id):
+    r = etree.Element(qn('w:r'))
+    r_pr = etree.SubElement(r, qn('w:rPr'))
+    etree.SubElement(r_pr, qn('w:rStyle'), {qn('w:val'): 'CommentReference'})
+    etree.SubElement(r, qn('w:commentReference'), {qn('w:id'): str(comment_id)})
+    return r
+
+def add_comments_bulk(doc, comments):
+    """
+    Добавляет в документ сразу все комментарии.
+
+    doc.add_comment на каждый комментарий заново ищет часть comments.xml,
+    перебирает все существующие id и собирает элементы по одному - на тысячах
+    замечаний это самая медленная стадия. Здесь id выделяются одним диапазоном,
+    все w:comment дописываются в дерево comments.xml, а якоря
+    (w:commentRangeStart/w:commentRangeEnd/w:commentReference) расставляются
+    за один проход по абзацам с комментариями.
+
+    Args:
+        doc: документ docx
+        comments: список кортежей (абзац (Paragraph), текст комментария, автор)
+
+    Returns:
+        list: id добавленных комментариев в порядке comments
+
+    Raises:
+        TypeError: абзац, текст или автор комментария неправильного типа - в этом
+            случае документ не изменяется
+    """
+    for paragraph, text, author in comments:
+        if not isinstance(paragraph, Paragraph) or not isinstance(text, str) or not isinstance(author, str):
+            raise TypeError(f"Неправильный комментарий: {paragraph!r}, {text!r}, {author!r}")
+
+    comments_element = doc.part._comments_part.element
+    used_ids = [int(comment_id) for comment_id in comments_element.xpath('./w:comment/@w:id')]
+    first_id = max(used_ids, default=-1) + 1
+    date = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    # Комментарии собираются отдельно и попадают в comments.xml все вместе
+    new_comments = []
+    anchors = {}  # w:p -> id комментариев к нему в порядке добавления
+    comment_ids = []
+    for offset, (paragraph, text, author) in enumerate(comments):
+        comment_id = first_id + offset
+        comment = etree.Element(qn('w:comment'), {
+            qn('w:id'): str(comment_id), qn('w:author'): author, qn('w:initials'): '', qn('w:date'): date})
+        for line_number, line in enumerate(_INVALID_XML_CHARS.sub('', text).split('\n')):
+            _comment_paragraph(comment, line, line_number == 0)
+        new_comments.append(comment)
+        anchors.setdefault(paragraph._p, []).append(comment_id)
+        comment_ids.append(comment_id)
+    comments_element.extend(new_comments)
+
+    for p, ids in anchors.items():
+        runs = p.r_lst
+        if not runs:
+            runs = [p.add_r()]
+            runs[0].text = ' '
+        first_run, last_run = runs[0], runs[-1]
+        # Как при последовательных вызовах add_comment: каждый следующий диапазон
+        # заканчивается после ссылки на предыдущий комментарий
+        for comment_id in ids:
+            first_run.addprevious(etree.Element(qn('w:commentRangeStart'), {qn('w:id'): str(comment_id)}))
+            reference = _comment_reference_run(comment_id)
+            last_run.addnext(reference)
+            last_run.addnext(etree.Element(qn('w:commentRangeEnd'), {qn('w:id'): str(comment_id)}))
+            last_run = reference
+    return comment_ids
+
+_W_NS = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+# Якоря комментариев в тексте документа - все три вида одним выражением
+_ANCHORS_XPATH = etree.XPath('.//w:commentRangeStart | .//w:commentRangeEnd | .//w:commentReference',
+                             namespaces=_W_NS)
+_COMMENTS_BY_AUTHOR_XPATH = etree.XPath('./w:comment[@w:author = $author]', namespaces=_W_NS)
+_PARA_IDS_XPATH = etree.XPath(".//w:p/@*[local-name() = 'paraId']", namespaces=_W_NS)
+
+def _local_attr(element, name):
+    """Значение атрибута по локальному имени (w15:paraId, w16cid:paraId, ...)."""
+    for key, value in element.attrib.items():
+        if key.rpartition('}')[2] == name:
+            return value
+    return None
+
+def _clean_comment_extensions(doc, para_ids):
+    """
+    Убирает удаленные комментарии из частей, которые добавляет Word:
+    commentsExtended и commentsIds (по w14:paraId абзаца комментария) и
+    commentsExtensible (по durableId из commentsIds). У ответов на удаленные
+    комментарии снимается ссылка на родителя.
+    """
+    parts = {rel.reltype: rel.target_part for rel in doc.part.rels.values()
+             if rel.reltype in COMMENT_EXTENSION_RELS and not rel.is_external}
+    durable_ids = set()
+    # commentsIds обрабатывается первой: из нее берутся durableId для commentsExtensible
+    for reltype in sorted(parts, key=lambda reltype: COMMENT_EXTENSION_RELS.index(reltype)):
+        part = parts[reltype]
+        root = etree.fromstring(part.blob)
+        changed = False
+        for entry in list(root):
+            para_id, durable_id = _local_attr(entry, 'paraId'), _local_attr(entry, 'durableId')
+            if para_id in para_ids or (para_id is None and durable_id in durable_ids):
+                if durable_id:
+                    durable_ids.add(durable_id)
+                root.remove(entry)
+                changed = True
+            elif _local_attr(entry, 'paraIdParent') in para_ids:
+                for key in [key for key in entry.attrib if key.rpartition('}')[2] == 'paraIdParent']:
+                    del entry.attrib[key]
+                changed = True
+        if changed:
+            part._blob = etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+def remove_comments_by_author(doc, author):
+    """
+    Удаляет из документа все комментарии автора - например, наши замечания
+    из прошлой проверки, когда студент загружает исправленную работу.
+
+    Комментарии автора находятся одним XPath-запросом к comments.xml, их id
+    собираются в множество, после чего за один проход по тексту документа
+    удаляются якоря (w:commentRangeStart/w:commentRangeEnd/w:commentReference)
+    с этими id. Run, в котором кроме ссылки на комментарий ничего нет, удаляется целиком.
+
+    Args:
+        doc: документ docx
+        author: автор комментариев
+
+    Returns:
+        int: сколько комментариев удалено
+    """
+    # Часть comments.xml берем по связи: doc.part._comments_part создал бы пустую
+    comments_part = next((rel.target_part for rel in doc.part.rels.values()
+                          if rel.reltype == RT.COMMENTS and not rel.is_external), None)
+    if comments_part is None:
+        return 0
+    comments = _COMMENTS_BY_AUTHOR_XPATH(comments_part.element, author=author)
+    if not comments:
+        return 0
+
+    removed_ids = {comment.get(qn('w:id')) for comment in comments}
+    para_ids = {para_id for comment in comments for para_id in _PARA_IDS_XPATH(comment)}
+    for comment in comments:
+        comments_part.element.remove(comment)
+
+    reference_tag = qn('w:commentReference')
+    for anchor in _ANCHORS_XPATH(doc.element.body):
+        if anchor.get(qn('w:id')) not in removed_ids:
+            continue
+        parent = anchor.getparent()
+        parent.remove(anchor)
+        if anchor.tag == reference_tag and parent.tag == qn('w:r') and \
+                all(child.tag == qn('w:rPr') for child in parent):
+            parent.getparent().remove(parent)
+
+    if para_ids:
+        _clean_comment_extensions(doc, para_ids)
+    return len(removed_ids)
+
+def strip_prior_comments(path, author):
+    """
+    Удаляет комментарии автора из файла docx на месте.
+
+    Если в архиве нет части с комментариями, документ даже не открывается.
+    Переписываются только document.xml и части с комментариями, остальное
+    копируется без пересжатия (save_docx). При добавлении новых замечаний
+    отдельный проход не нужен - см. strip_author в add_comments_to_docx.
+
+    Returns:
+        int: сколько комментариев удалено (0 - файл не изменялся)
+    """
+    with zipfile.ZipFile(path) as archive:
+        if not any(name.lower().startswith('word/comments') for name in archive.namelist()):
+            return 0
+    doc = Document(path)
+    removed = remove_comments_by_author(doc, author)
+    if removed:
+        # save_docx копирует части из исходного файла - пишем рядом и подменяем
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            save_docx(doc, temp_path, path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return removed
+
+class DebugSidecar:
+    """
+    Отладочные записи добавления комментариев (включаются явно).
+
+    Каждая запись - словарь с полем event: 'document' (число абзацев и
+    комментариев), 'comment' (к какому абзацу привязан комментарий),
+    'out_of_range' (индекс за концом документа), 'stripped' (сколько прежних
+    комментариев удалено), 'error'. Записи сохраняются
+    в JSONL рядом с выходным файлом; write_in_background пишет их в отдельном
+    потоке, чтобы запись не задерживала ответ.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def add(self, event, **values):
+        self.records.append({"event": event, **values})
+
+    def write(self, path):
+        """Сохраняет записи в JSONL: одна строка - одна запись."""
+        with open(path, "w", encoding="utf-8") as f:
+            for record in self.records:
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write("\n")
+        return path
+
+    def write_in_background(self, path):
+        """Запускает запись в фоновом потоке и возвращает поток."""
+        thread = threading.Thread(target=self.write, args=(path,), name="comment-debug-sidecar")
+        thread.start()
+        return thread
+
+def debug_sidecar_path(output_path):
+    """Путь к файлу отладочных записей для документа с комментариями."""
+    return output_path + '.debug.jsonl'
+
+def add_comments_to_docx(input_path, output_path, comments_info, compression_level=DEFAULT_COMPRESSION_LEVEL,
+                         debug=None, strip_author=None):
     """
     Добавляет комментарии в DOCX документ
     
@@ -41,13 +379,20 @@ def add_comments_to_docx(input_path, output_path, comments_info):
         input_path: путь к исходному документу
         output_path: путь для сохранения документа с комментариями
         comments_info: список кортежей (paragraph_index, comment_text, author)
+        compression_level: уровень сжатия zlib (0-9) для измененных частей документа
+        debug: DebugSidecar для отладочных записей (None - без отладки). С отладкой
+            к тексту комментариев добавляется [Debug ID: ...]; сохраняет записи
+            вызывающий код (debug.write или debug.write_in_background)
+        strip_author: перед добавлением удалить комментарии этого автора (наши
+            замечания из прошлой проверки) - в том же проходе, без отдельного
+            сохранения документа (None - не удалять)
     """
     
     doc = Document(input_path)
-    
-   
-    debug_info = []
-    debug_info.append(f"Всего параграфов в документе: {len(doc.paragraphs)}")
+    if strip_author is not None:
+        removed = remove_comments_by_author(doc, strip_author)
+        if debug is not None:
+            debug.add("stripped", author=strip_author, comments=removed)
     
     # Сортируем комментарии по возрастанию индекса параграфа
     sorted_comments = sorted(comments_info, key=lambda x: x[0] if x[0] >= 0 else float('inf'))
@@ -57,29 +402,18 @@ def add_comments_to_docx(input_path, output_path, comments_info):
         -1: 0,  # Индекс -1 (сноски) -> первый параграф
     }
     
-    # Фильтруем параграфы, исключая те, которые находятся в таблицах
-    body_paragraphs = []
-    for i, para in enumerate(doc.paragraphs):
-        # Проверяем, не находится ли параграф в таблице
-        in_table = False
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    if para in cell.paragraphs:
-                        in_table = True
-                        break
-                if in_table:
-                    break
-            if in_table:
-                break
-        
-        if not in_table:
-            body_paragraphs.append(para)
+    # doc.paragraphs содержит только абзацы основного тела (абзацы таблиц в него не входят)
+    body_paragraphs = doc.paragraphs
+    if sorted_comments and not body_paragraphs:
+        raise ValueError("В документе нет абзацев, к которым можно привязать комментарии")
+    if debug is not None:
+        debug.add("document", paragraphs=len(body_paragraphs), comments=len(sorted_comments))
     
-    debug_info.append(f"Параграфов основного тела (не в таблицах): {len(body_paragraphs)}")
-    
-    # Добавляем комментарии
+    # Сначала находим абзац для каждого комментария, затем добавляем все комментарии разом
+    targets = []
+    anchored = set()
     for comment_index, (paragraph_index, comment_text, author) in enumerate(sorted_comments):
+        requested_index = paragraph_index
         if paragraph_index < 0:
             if paragraph_index in special_index_mapping:
                 paragraph_index = special_index_mapping[paragraph_index]
@@ -90,50 +424,33 @@ def add_comments_to_docx(input_path, output_path, comments_info):
             # Добавляем префикс к тексту комментария для общих комментариев
             if "[Общий комментарий] " not in comment_text:
                 comment_text = f"[Общий комментарий] {comment_text}"
-                
-            
-            target_para = doc.paragraphs[paragraph_index]
-        else:
-            
-            # Проверка на валидность индекса
-            if paragraph_index >= len(body_paragraphs):
-                debug_info.append(f"Ошибка: Индекс {paragraph_index} вне диапазона основного тела (всего {len(body_paragraphs)} параграфов)")
-                # Используем последний параграф основного тела, если индекс вне диапазона
-                paragraph_index = len(body_paragraphs) - 1
-            
-            
-            target_para = body_paragraphs[paragraph_index]
-        
-        # Добавляю ID параграфа для отладки
-        debug_id = f"P{paragraph_index}_C{comment_index}"
+        elif paragraph_index >= len(body_paragraphs):
+            # Используем последний параграф основного тела, если индекс вне диапазона
+            paragraph_index = len(body_paragraphs) - 1
+            if debug is not None:
+                debug.add("out_of_range", requested=requested_index, paragraph=paragraph_index)
         
-        # Добавляею информацию об отладке в текст комментария
-        full_comment_text = f"{comment_text} [Debug ID: {debug_id}]"
+        target_para = body_paragraphs[paragraph_index]
         
-        # Создаю здесь комментарий с использованием метода add_comment
-        try:
-            # Получаем все runs в параграфе
-            runs = target_para.runs
-            
-            if runs:
-                
-                comment = doc.add_comment(runs, full_comment_text, author)
-                debug_info.append(f"Комментарий добавлен: {debug_id} к параграфу {paragraph_index} через существующие runs")
-            else:
-                # Пришлось сделать так: если runs нет, создаем новый run
-                run = target_para.add_run(" ")
-                comment = doc.add_comment(run, full_comment_text, author)
-                debug_info.append(f"Комментарий добавлен: {debug_id} к параграфу {paragraph_index} через новый run")
-        except Exception as e:
-            # Если что-то пошло не так, добавляем информацию об ошибке в отладочный отчет
-            debug_info.append(f"Ошибка при добавлении комментария {debug_id}: {str(e)}")
-    
+        if debug is not None:
+            # ID для отладки: по нему комментарий в Word находится в отладочных записях
+            debug_id = f"P{paragraph_index}_C{comment_index}"
+            comment_text = f"{comment_text} [Debug ID: {debug_id}]"
+            anchor = "runs" if target_para._p.r_lst or target_para._p in anchored else "new_run"
+            anchored.add(target_para._p)
+            debug.add("comment", debug_id=debug_id, paragraph=paragraph_index, requested=requested_index,
+                      anchor=anchor, author=author)
+        targets.append((target_para, comment_text, author))
     
-    doc.save(output_path)
+    try:
+        add_comments_bulk(doc, targets)
+    except Exception as e:
+        # Документ без части комментариев не сохраняем - ошибка уходит вызывающему коду
+        if debug is not None:
+            debug.add("error", message=str(e))
+        raise
     
-    # Для создания отладочного файл
-    debug_path = output_path + '.debug.txt'
-    with open(debug_path, 'w', encoding='utf-8') as debug_file:
-        debug_file.write('\n'.join(debug_info))
+    # Неизмененные части (картинки, стили) копируются из исходника без пересжатия
+    save_docx(doc, output_path, input_path, compression_level=compression_level)
     
-    return output_path
\ No newline at end of file
+    return output_path
@@ -0,0 +1,382 @@
+"""
+Структура заголовков документа.
+
+Word строит оглавление по уровням структуры абзацев (w:outlineLvl), которые
+задаются прямо в абзаце или в его стиле (в том числе через basedOn). Здесь
+уровни вычисляются один раз для всех стилей, после чего уровень каждого
+абзаца определяется без повторного разбора стилей.
+
+Номер заголовка бывает набран в тексте ("1.2 Методы") или нарисован Word
+по списку из numbering.xml - тогда в тексте абзаца его нет, и номер
+вычисляется здесь же (ListNumbering). Из заголовков при обходе абзацев
+строится дерево (DocumentOutline); нумерация проверяется по стеку счетчиков
+по мере добавления заголовков, а готовое дерево используют другие правила
+(например, сверка содержания).
+"""
+
+import re
+
+from docx.oxml.ns import qn
+
+from findings import Finding
+
+_HEADING_STYLE_NAME = re.compile(r"^(?:heading|заголовок)\s*(\d)$", re.IGNORECASE)
+# Номер, набранный в начале заголовка: "1", "1.", "1.2", "1.2."
+_TYPED_NUMBER = re.compile(r"^(\d+(?:\.\d+)*)\.?\s+")
+_NUMBER_LABEL = re.compile(r"^(\d+(?:\.\d+)*)\.?$")
+_LEVEL_PLACEHOLDER = re.compile(r"%([1-9])")
+# Буквы, которыми Word нумерует списки russianUpper (без Ё, Й, Ъ, Ы, Ь)
+_RUSSIAN_LETTERS = "АБВГДЕЖЗИКЛМНОПРСТУФХЦЧШЩЭЮЯ"
+_ROMAN = ((1000, "M"), (900, "CM"), (500, "D"), (400, "CD"), (100, "C"), (90, "XC"),
+          (50, "L"), (40, "XL"), (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I"))
+
+
+def _outline_value(p_pr):
+    """Уровень из w:outlineLvl (с 1); 0 - уровень задан, но это основной текст; None - не задан."""
+    if p_pr is None:
+        return None
+    outline = p_pr.find(qn("w:outlineLvl"))
+    if outline is None or not outline.get(qn("w:val"), "").isdigit():
+        return None
+    level = int(outline.get(qn("w:val")))
+    return level + 1 if level < 9 else 0
+
+def style_outline_levels(doc):
+    """
+    Уровень заголовка (с 1) для стилей абзацев с учетом наследования (basedOn).
+    Стили без уровня в результат не попадают.
+    """
+    styles = {}
+    for style in doc.styles.element.iterchildren(qn("w:style")):
+        if style.get(qn("w:type")) == "paragraph":
+            styles[style.get(qn("w:styleId"))] = style
+
+    resolved = {}
+
+    def resolve(style_id, seen=()):
+        if style_id in resolved:
+            return resolved[style_id]
+        style = styles.get(style_id)
+        if style is None or style_id in seen:
+            return None
+        level = _outline_value(style.find(qn("w:pPr")))
+        if level is None:
+            name = style.find(qn("w:name"))
+            match = _HEADING_STYLE_NAME.match(name.get(qn("w:val"), "")) if name is not None else None
+            if match:
+                level = int(match.group(1))
+        if level is None:
+            based_on = style.find(qn("w:basedOn"))
+            if based_on is not None:
+                level = resolve(based_on.get(qn("w:val")), seen + (style_id,))
+        resolved[style_id] = level
+        return level
+
+    return {style_id: level for style_id in styles if (level := resolve(style_id))}
+
+def paragraph_outline_level(p, style_levels):
+    """Уровень заголовка абзаца (w:p) или None, если абзац не заголовок."""
+    p_pr = p.find(qn("w:pPr"))
+    level = _outline_value(p_pr)
+    if level is not None:
+        return level or None
+    style = p_pr.find(qn("w:pStyle")) if p_pr is not None else None
+    return style_levels.get(style.get(qn("w:val"))) if style is not None else None
+
+def paragraph_outline_levels(doc):
+    """Уровни заголовков абзацев основной части: {индекс абзаца: уровень}."""
+    style_levels = style_outline_levels(doc)
+    levels = {}
+    for i, p in enumerate(doc.element.body.iterchildren(qn("w:p"))):
+        level = paragraph_outline_level(p, style_levels)
+        if level is not None:
+            levels[i] = level
+    return levels
+
+
+def _format_counter(value, number_format):
+    """Значение счетчика в формате уровня списка (w:numFmt)."""
+    if number_format in ("upperLetter", "lowerLetter"):
+        text = chr(ord("A") + (value - 1) % 26) * ((value - 1) // 26 + 1)
+    elif number_format in ("russianUpper", "russianLower"):
+        text = _RUSSIAN_LETTERS[(value - 1) % len(_RUSSIAN_LETTERS)] * ((value - 1) // len(_RUSSIAN_LETTERS) + 1)
+    elif number_format in ("upperRoman", "lowerRoman"):
+        text = ""
+        for arabic, roman in _ROMAN:
+            count, value = divmod(value, arabic)
+            text += roman * count
+    elif number_format == "decimalZero":
+        text = f"{value:02d}"
+    else:
+        text = str(value)
+    return text.lower() if number_format.startswith("lower") or number_format == "russianLower" else text
+
+
+class ListNumbering:
+    """
+    Номера, которые Word рисует у абзацев со списочной нумерацией (w:numPr).
+
+    Счетчики общие для всех списков с одним w:abstractNum, поэтому render()
+    нужно вызывать для всех абзацев документа по порядку (это делает list_number_labels).
+    """
+
+    def __init__(self, doc):
+        self.levels = {}           # abstractNumId -> {ilvl: (start, numFmt, lvlText)}
+        self.nums = {}             # numId -> (abstractNumId, {ilvl: startOverride})
+        self.style_numbering = {}  # styleId -> (numId, ilvl)
+        self.level_styles = {}     # (abstractNumId, styleId) -> ilvl уровня с w:pStyle
+        self.counters = {}         # abstractNumId -> [значение или None по уровням]
+        self.started = set()       # numId, для которых уже применены startOverride
+        try:
+            numbering = doc.part.numbering_part.element
+        except (KeyError, NotImplementedError):
+            return
+        self._read_styles(doc)
+        links = {}  # abstractNumId -> имя стиля нумерации (w:numStyleLink)
+        for abstract in numbering.iterchildren(qn("w:abstractNum")):
+            abstract_id = abstract.get(qn("w:abstractNumId"))
+            link = abstract.find(qn("w:numStyleLink"))
+            if link is not None:
+                links[abstract_id] = link.get(qn("w:val"))
+            self.levels[abstract_id] = {}
+            for lvl in abstract.iterchildren(qn("w:lvl")):
+                self.levels[abstract_id][lvl.get(qn("w:ilvl"))] = self._read_level(lvl)
+                style = lvl.find(qn("w:pStyle"))
+                if style is not None:
+                    self.level_styles[(abstract_id, style.get(qn("w:val")))] = lvl.get(qn("w:ilvl"))
+        for num in numbering.iterchildren(qn("w:num")):
+            abstract_id = num.find(qn("w:abstractNumId"))
+            if abstract_id is None:
+                continue
+            overrides = {}
+            for override in num.iterchildren(qn("w:lvlOverride")):
+                start = override.find(qn("w:startOverride"))
+                if start is not None:
+                    overrides[override.get(qn("w:ilvl"))] = int(start.get(qn("w:val")))
+            self.nums[num.get(qn("w:numId"))] = (abstract_id.get(qn("w:val")), overrides)
+        # Список, оформленный стилем нумерации, берет уровни из списка этого стиля
+        for abstract_id, style_id in links.items():
+            num_id, _ = self.style_numbering.get(style_id, (None, None))
+            target = self.nums.get(num_id, (None,))[0]
+            if target is not None and target != abstract_id:
+                for num_id, (linked, overrides) in list(self.nums.items()):
+                    if linked == abstract_id:
+                        self.nums[num_id] = (target, overrides)
+
+    @staticmethod
+    def _read_level(lvl):
+        def value(tag, default):
+            element = lvl.find(qn(tag))
+            return element.get(qn("w:val"), default) if element is not None else default
+        return int(value("w:start", "1")), value("w:numFmt", "decimal"), value("w:lvlText", "")
+
+    def _read_styles(self, doc):
+        """numPr стилей абзацев и стилей нумерации с учетом basedOn."""
+        styles = {style.get(qn("w:styleId")): style for style in doc.styles.element.iterchildren(qn("w:style"))}
+
+        def resolve(style_id, seen=()):
+            style = styles.get(style_id)
+            if style is None or style_id in seen:
+                return None
+            num_pr = style.find(f"{qn('w:pPr')}/{qn('w:numPr')}")
+            if num_pr is not None:
+                num_id = num_pr.find(qn("w:numId"))
+                ilvl = num_pr.find(qn("w:ilvl"))
+                return (num_id.get(qn("w:val")) if num_id is not None else None,
+                        ilvl.get(qn("w:val")) if ilvl is not None else None)
+            based_on = style.find(qn("w:basedOn"))
+            return resolve(based_on.get(qn("w:val")), seen + (style_id,)) if based_on is not None else None
+
+        for style_id in styles:
+            numbering = resolve(style_id)
+            if numbering is not None and numbering[0] is not None:
+                self.style_numbering[style_id] = numbering
+
+    def _paragraph_numbering(self, p):
+        """(numId, ilvl) абзаца: из w:numPr абзаца или его стиля; None - без нумерации."""
+        p_pr = p.find(qn("w:pPr"))
+        if p_pr is None:
+            return None
+        style = p_pr.find(qn("w:pStyle"))
+        style_id = style.get(qn("w:val")) if style is not None else None
+        num_id, ilvl = self.style_numbering.get(style_id, (None, None))
+        num_pr = p_pr.find(qn("w:numPr"))
+        if num_pr is not None:
+            direct_num = num_pr.find(qn("w:numId"))
+            direct_ilvl = num_pr.find(qn("w:ilvl"))
+            num_id = direct_num.get(qn("w:val")) if direct_num is not None else num_id
+            ilvl = direct_ilvl.get(qn("w:val")) if direct_ilvl is not None else ilvl
+        if num_id is None or num_id == "0" or num_id not in self.nums:
+            return None
+        if ilvl is None:
+            # Уровень не указан - ищем уровень списка, привязанный к стилю абзаца (w:lvl/w:pStyle)
+            ilvl = self.level_styles.get((self.nums[num_id][0], style_id), "0")
+        return num_id, ilvl
+
+    def render(self, p):
+        """Продвигает счетчики для абзаца (w:p) и возвращает его номер ('1.2.') или None."""
+        numbering = self._paragraph_numbering(p)
+        if numbering is None:
+            return None
+        num_id, ilvl = numbering
+        abstract_id, overrides = self.nums[num_id]
+        levels = self.levels.get(abstract_id, {})
+        if ilvl not in levels:
+            return None
+        counters = self.counters.setdefault(abstract_id, [None] * 9)
+        if num_id not in self.started:
+            self.started.add(num_id)
+            for level, start in overrides.items():
+                if level.isdigit() and int(level) < 9:
+                    counters[int(level)] = start - 1
+        index = int(ilvl)
+        start, number_format, text = levels[ilvl]
+        counters[index] = start if counters[index] is None else counters[index] + 1
+        # Более глубокие уровни начинаются заново
+        for deeper in range(index + 1, 9):
+            counters[deeper] = None
+        if number_format in ("bullet", "none"):
+            return None
+
+        def placeholder(match):
+            level = int(match.group(1)) - 1
+            level_start, level_format, _ = levels.get(str(level), (1, "decimal", ""))
+            value = counters[level] if counters[level] is not None else level_start
+            return _format_counter(value, level_format)
+
+        return _LEVEL_PLACEHOLDER.sub(placeholder, text)
+
+
+def list_number_labels(doc):
+    """Номера списочной нумерации абзацев основной части: {индекс абзаца: номер}."""
+    numbering = ListNumbering(doc)
+    labels = {}
+    if not numbering.nums:
+        return labels
+    body = doc.element.body
+    para_idx = -1
+    # Абзацы в таблицах тоже продвигают счетчики, но в результат не попадают
+    for p in body.iter(qn("w:p")):
+        top_level = p.getparent() is body
+        if top_level:
+            para_idx += 1
+        label = numbering.render(p)
+        if top_level and label:
+            labels[para_idx] = label
+    return labels
+
+
+def split_heading_number(text, rendered=None):
+    """
+    Номер и текст заголовка: номер, набранный в тексте, или номер,
+    нарисованный списком (rendered). Номер - кортеж чисел или None.
+    """
+    text = " ".join(text.replace("\xa0", " ").split())
+    match = _TYPED_NUMBER.match(text + " ")
+    if match:
+        return tuple(int(part) for part in match.group(1).split(".")), text[match.end():].strip()
+    match = _NUMBER_LABEL.match(rendered.strip()) if rendered else None
+    if match:
+        return tuple(int(part) for part in match.group(1).split(".")), text
+    return None, text
+
+def format_heading_number(number):
+    return ".".join(str(part) for part in number) if number else ""
+
+
+class OutlineNode:
+    """Заголовок в дереве: индекс абзаца, уровень, номер (кортеж или None), текст и подзаголовки."""
+
+    def __init__(self, para_idx, level, number, title):
+        self.para_idx = para_idx
+        self.level = level
+        self.number = number
+        self.title = title
+        self.children = []
+
+    @property
+    def label(self):
+        """Номер в виде '1.2' ('' - заголовок без номера)."""
+        return format_heading_number(self.number)
+
+    def __repr__(self):
+        return f"OutlineNode({self.para_idx}, {self.level}, {self.label!r}, {self.title!r})"
+
+
+class DocumentOutline:
+    """
+    Дерево заголовков документа и проверка их нумерации.
+
+    Заголовки добавляются по порядку при обходе абзацев. Нумерация
+    проверяется по стеку счетчиков: после "1.2" ожидается "1.3", "1.2.1"
+    или "2"; пропуски, повторы и номера, которые не вписываются в иерархию
+    ("1.1.1" сразу после "1", "2.1" внутри раздела 1), попадают в замечания.
+
+    Пример:
+        outline = DocumentOutline()
+        outline.add(i, 2, para.text, labels.get(i), comments, author)
+        for node in outline.nodes: ...
+    """
+
+    def __init__(self):
+        self.roots = []
+        self.nodes = []
+        self._path = []      # открытые заголовки от корня до текущего
+        self._counters = []  # номер последнего нумерованного заголовка
+        self._seen = set()
+
+    def add(self, para_idx, level, text, rendered=None, comments_list=None, author=None):
+        """
+        Добавляет заголовок в дерево и проверяет его номер.
+
+        Args:
+            para_idx: индекс абзаца
+            level: уровень по стилю или типу абзаца (у нумерованных заголовков
+                уровень определяется глубиной номера)
+            text: текст абзаца
+            rendered: номер, нарисованный списком (list_number_labels), или None
+            comments_list: список для замечаний о нумерации (None - не проверять)
+            author: имя автора комментариев
+
+        Returns:
+            OutlineNode
+        """
+        number, title = split_heading_number(text, rendered)
+        node = OutlineNode(para_idx, len(number) if number else level, number, title)
+        while self._path and self._path[-1].level >= node.level:
+            self._path.pop()
+        (self._path[-1].children if self._path else self.roots).append(node)
+        self._path.append(node)
+        self.nodes.append(node)
+        if number is not None:
+            if comments_list is not None:
+                self._check_number(number, para_idx, comments_list, author)
+            self._counters = list(number)
+            self._seen.add(number)
+        return node
+
+    def restart_numbering(self):
+        """Нумерация начинается заново (например, внутри приложения)."""
+        self._counters = []
+        self._seen = set()
+
+    def _check_number(self, number, para_idx, comments_list, author):
+        counters = self._counters
+        depth = len(number)
+        label = format_heading_number(number)
+        if depth > len(counters) + 1 or list(number[:-1]) != counters[:depth - 1]:
+            # Пропущен уровень или номер не продолжает текущий раздел
+            comments_list.append(Finding("heading.numbering_depth", para_idx,
+                                         (label, format_heading_number(counters) or "нет"), author))
+        elif number in self._seen:
+            comments_list.append(Finding("heading.duplicate_number", para_idx, (label,), author))
+        else:
+            expected = counters[:depth - 1] + [counters[depth - 1] + 1] if len(counters) >= depth else counters + [1]
+            if list(number) != expected:
+                comments_list.append(Finding("heading.numbering", para_idx,
+                                             (format_heading_number(expected), label), author))
+
+    def headings(self, start_idx=0, max_level=None):
+        """Заголовки в порядке документа, начиная с абзаца start_idx и не глубже max_level."""
+        return [node for node in self.nodes
+                if node.para_idx >= start_idx and (max_level is None or node.level <= max_level)]
@@ -0,0 +1,212 @@
+"""
+Сохранение документа с комментариями без пересжатия неизмененных частей.
+
+doc.save() заново сериализует и сжимает все части пакета, в том числе
+мегабайты картинок, которые при добавлении замечаний не меняются. Здесь
+неизмененные части копируются из исходного архива как есть - сжатыми
+байтами вместе с CRC и размерами, а заново пишутся только измененные
+части (document.xml, comments.xml), [Content_Types].xml и связи
+(.rels) - время сохранения зависит от объема измененного XML, а не от
+размера пакета.
+
+Переписываемые части сжимаются параллельно в пуле потоков (zlib отпускает
+GIL на время сжатия), затем архив собирается последовательно в исходном
+порядке записей. Уровень сжатия настраивается: меньше - быстрее, но
+файл больше.
+
+Архив собирается вручную (zipfile не умеет копировать сжатые данные без
+распаковки). Если копировать нельзя - исходник не zip, запись поверх
+исходника, архив больше 4 ГБ (нужен ZIP64) - документ сохраняется обычным
+doc.save().
+"""
+
+import os
+import struct
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+
+# Уровень сжатия zlib для переписываемых частей (6 - как у zipfile по умолчанию)
+DEFAULT_COMPRESSION_LEVEL = 6
+# Меньше этого объема части сжимаются в текущем потоке: запуск пула дороже сжатия
+PARALLEL_MIN_SIZE = 256 * 1024
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_LOCAL_SIGNATURE = 0x04034b50
+_CENTRAL_SIGNATURE = 0x02014b50
+_END_SIGNATURE = 0x06054b50
+
+_DATA_DESCRIPTOR_FLAG = 0x08
+_UTF8_FLAG = 0x800
+_ZIP_LIMIT = 0xFFFFFFFF
+_MAX_ENTRIES = 0xFFFF
+
+# Части, которые Word добавляет к comments.xml (в порядке зависимости:
+# commentsExtensible ссылается на durableId из commentsIds)
+COMMENT_EXTENSION_RELS = (
+    "http://schemas.microsoft.com/office/2016/09/relationships/commentsIds",
+    "http://schemas.microsoft.com/office/2011/relationships/commentsExtended",
+    "http://schemas.microsoft.com/office/2018/08/relationships/commentsExtensible",
+)
+
+
+class _Entry:
+    """Запись архива: имя, сжатые данные и поля заголовков."""
+
+    def __init__(self, name, data, crc, file_size, method, flags, date_time,
+                 create_version=20, create_system=0, external_attr=0):
+        self.name = name
+        self.data = data
+        self.crc = crc
+        self.file_size = file_size
+        self.method = method
+        self.flags = flags
+        self.date_time = date_time
+        self.create_version = create_version
+        self.create_system = create_system
+        self.external_attr = external_attr
+
+
+def _dos_date_time(date_time):
+    year, month, day, hour, minute, second = date_time[:6]
+    return (max(year, 1980) - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+def _raw_entry(source, zinfo):
+    """Запись исходного архива со сжатыми данными без распаковки."""
+    source.seek(zinfo.header_offset)
+    header = _LOCAL_HEADER.unpack(source.read(_LOCAL_HEADER.size))
+    name_length, extra_length = header[9], header[10]
+    source.seek(name_length + extra_length, os.SEEK_CUR)
+    data = source.read(zinfo.compress_size)
+    # Размеры и CRC пишем прямо в заголовок, дескриптор данных после записи не нужен
+    flags = zinfo.flag_bits & ~_DATA_DESCRIPTOR_FLAG
+    if not zinfo.filename.isascii():
+        flags |= _UTF8_FLAG  # имя записывается в UTF-8
+    return _Entry(zinfo.filename, data, zinfo.CRC, zinfo.file_size, zinfo.compress_type, flags,
+                  zinfo.date_time, zinfo.create_version, zinfo.create_system, zinfo.external_attr)
+
+def _deflate_entry(name, blob, level, date_time):
+    """Новая запись: blob сжимается deflate с заданным уровнем."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    data = compressor.compress(blob) + compressor.flush()
+    flags = 0 if name.isascii() else _UTF8_FLAG
+    return _Entry(name, data, zlib.crc32(blob), len(blob), zipfile.ZIP_DEFLATED, flags, date_time)
+
+def _deflate_entries(jobs, level, date_time, max_workers=None):
+    """
+    Сжимает части [(имя, blob)]; большие - параллельно в пуле потоков.
+    Возвращает записи в том же порядке.
+    """
+    if len(jobs) < 2 or sum(len(blob) for _, blob in jobs) < PARALLEL_MIN_SIZE:
+        return [_deflate_entry(name, blob, level, date_time) for name, blob in jobs]
+    workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda job: _deflate_entry(job[0], job[1], level, date_time), jobs))
+
+def _write_zip(output_path, entries):
+    """Записывает архив; False - архиву нужен ZIP64, ничего не записано."""
+    offset = 0
+    for entry in entries:
+        offset += _LOCAL_HEADER.size + len(entry.name.encode("utf-8")) + len(entry.data)
+    if (len(entries) > _MAX_ENTRIES or offset > _ZIP_LIMIT
+            or any(entry.file_size > _ZIP_LIMIT for entry in entries)):
+        return False
+
+    central = []
+    offset = 0
+    with open(output_path, "wb") as output:
+        for entry in entries:
+            name = entry.name.encode("utf-8")
+            version = 20 if entry.method == zipfile.ZIP_DEFLATED else 10
+            date, dos_time = _dos_date_time(entry.date_time)
+            output.write(_LOCAL_HEADER.pack(_LOCAL_SIGNATURE, version, entry.flags, entry.method, dos_time, date,
+                                            entry.crc, len(entry.data), entry.file_size, len(name), 0))
+            output.write(name)
+            output.write(entry.data)
+            central.append(_CENTRAL_HEADER.pack(
+                _CENTRAL_SIGNATURE, entry.create_system << 8 | entry.create_version, version, entry.flags,
+                entry.method, dos_time, date, entry.crc, len(entry.data), entry.file_size, len(name),
+                0, 0, 0, 0, entry.external_attr, offset) + name)
+            offset += _LOCAL_HEADER.size + len(name) + len(entry.data)
+        central_directory = b"".join(central)
+        output.write(central_directory)
+        output.write(_END_RECORD.pack(_END_SIGNATURE, 0, 0, len(entries), len(entries),
+                                      len(central_directory), offset, 0))
+    return True
+
+
+def modified_part_names(doc):
+    """
+    Части, которые меняются при работе с комментариями: document.xml, comments.xml
+    и части Word с дополнительными сведениями о комментариях.
+    """
+    names = {doc.part.partname}
+    for rel in doc.part.rels.values():
+        if (rel.reltype == RT.COMMENTS or rel.reltype in COMMENT_EXTENSION_RELS) and not rel.is_external:
+            names.add(rel.target_part.partname)
+    return names
+
+def save_docx(doc, output_path, source_path, modified_parts=None, compression_level=DEFAULT_COMPRESSION_LEVEL,
+              max_workers=None):
+    """
+    Сохраняет документ, копируя неизмененные части из исходного файла без пересжатия.
+
+    Args:
+        doc: документ docx, открытый из source_path
+        output_path: путь для сохранения
+        source_path: путь к исходному файлу
+        modified_parts: имена измененных частей (PackURI, '/word/document.xml');
+            None - document.xml и comments.xml (modified_part_names). Части,
+            которых нет в исходном архиве, записываются всегда
+        compression_level: уровень сжатия zlib (0-9) для переписываемых частей
+        max_workers: число потоков для сжатия (None - по числу ядер)
+    """
+    if not zipfile.is_zipfile(source_path) or (
+            os.path.exists(output_path) and os.path.samefile(source_path, output_path)):
+        doc.save(output_path)
+        return
+    package = doc.part.package
+    modified = modified_part_names(doc) if modified_parts is None else set(modified_parts)
+    now = time.localtime(time.time())[:6]
+
+    with zipfile.ZipFile(source_path) as source_zip, open(source_path, "rb") as source:
+        source_entries = {zinfo.filename: zinfo for zinfo in source_zip.infolist()}
+        parts = list(package.iter_parts())
+        for part in parts:
+            part.before_marshal()
+
+        # В entries - готовые записи или индекс части в jobs, которую еще нужно сжать.
+        # XML сериализуется здесь же, в пул уходит только сжатие
+        entries, jobs = [], []
+
+        def rewrite(name, blob):
+            entries.append(len(jobs))
+            jobs.append((name, blob))
+
+        def entry(name, modified_part, blob_factory):
+            zinfo = source_entries.get(name)
+            if modified_part or zinfo is None:
+                rewrite(name, blob_factory())
+            else:
+                entries.append(_raw_entry(source, zinfo))
+
+        # Порядок записей тот же, что у doc.save(): типы содержимого, связи пакета, части
+        rewrite(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+        rewrite(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+        for part in parts:
+            modified_part = part.partname in modified or part.partname.membername not in source_entries
+            entry(part.partname.membername, modified_part, lambda: part.blob)
+            if len(part.rels):
+                entry(part.partname.rels_uri.membername, modified_part, lambda: part.rels.xml)
+
+    deflated = _deflate_entries(jobs, compression_level, now, max_workers)
+    entries = [deflated[item] if isinstance(item, int) else item for item in entries]
+    if not _write_zip(output_path, entries):
+        doc.save(output_path)
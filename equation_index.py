@@ -0,0 +1,92 @@
+"""
+Формулы (OMML) и их нумерация.
+
+Формула, вынесенная в отдельный абзац (m:oMathPara или m:oMath без текста
+вокруг), - не основной текст: к ней не применяются требования к отступу
+и выравниванию абзаца. Номер формулы пишется справа в круглых скобках:
+"(1)" или по главам "(2.3)", обычно после табуляции.
+
+Формулы собираются в индекс во время основного обхода абзацев, и нумерация
+проверяется сразу, по мере добавления формул.
+"""
+
+import re
+from collections import namedtuple
+
+from docx.oxml.ns import qn
+
+from findings import Finding
+
+# Формула: индекс абзаца и номер (None - формула без номера; иначе кортеж (глава, номер)
+# или (номер,) для сквозной нумерации)
+Equation = namedtuple("Equation", ["para_idx", "number"])
+
+_MATH_TAGS = (qn("m:oMathPara"), qn("m:oMath"))
+_LETTER = re.compile(r"[A-Za-zА-Яа-яЁё]")
+# Номер формулы в конце абзаца: "(1)" или "(2.3)"
+_EQUATION_NUMBER = re.compile(r"\((\d+)(?:\.(\d+))?\)$")
+
+
+def is_equation_paragraph(para):
+    """
+    Абзац с вынесенной формулой: содержит m:oMathPara или m:oMath, а кроме
+    формулы в нем нет слов (только номер, табуляции и знаки препинания).
+    Формулы внутри предложения остаются основным текстом.
+    """
+    if next(para._p.iterchildren(*_MATH_TAGS), None) is None:
+        return False
+    return not _LETTER.search(para.text)
+
+
+class EquationIndex:
+    """Формулы документа в порядке следования и проверка их номеров."""
+
+    def __init__(self):
+        self.equations = []
+        self._last_number = None
+
+    def add(self, para, para_idx, comments_list, author):
+        """
+        Добавляет формулу и проверяет формат ее номера и последовательность нумерации.
+
+        Args:
+            para: абзац с формулой (is_equation_paragraph)
+            para_idx: индекс абзаца в документе
+            comments_list: список для добавления комментариев
+            author: имя автора комментариев
+        """
+        # Текст абзаца без самой формулы: python-docx не включает в него m:r.
+        # Знаки препинания после формулы ("," перед "где ...") номером не считаются
+        tail = para.text.strip().strip(" \t.,;")
+        number = None
+        if tail:
+            match = _EQUATION_NUMBER.search(tail)
+            if match is None or tail[:match.start()].strip(" \t.,;"):
+                comments_list.append(Finding("equation.number_format", para_idx, (tail,), author))
+            else:
+                number = (int(match.group(1)), int(match.group(2))) if match.group(2) else (int(match.group(1)),)
+                if "\t" not in para.text:
+                    comments_list.append(Finding("equation.number_position", para_idx, (match.group(),), author))
+                self._check_sequence(number, para_idx, comments_list, author)
+        self.equations.append(Equation(para_idx, number))
+
+    def _check_sequence(self, number, para_idx, comments_list, author):
+        """Сквозная нумерация: 1, 2, 3; по главам: номер внутри главы начинается с 1."""
+        last = self._last_number
+        if len(number) == 1:
+            expected = (last[0] + 1,) if last is not None and len(last) == 1 else (1,)
+        elif last is not None and len(last) == 2 and number[0] <= last[0]:
+            # Та же глава (глава не может идти назад) - следующий номер в ней
+            expected = (last[0], last[1] + 1)
+        else:
+            # Новая глава: главы без формул можно пропускать
+            expected = (number[0], 1)
+
+        if number != expected:
+            comments_list.append(Finding("equation.numbering", para_idx,
+                                         (_format_number(expected), _format_number(number)), author))
+        self._last_number = number
+
+
+def _format_number(number):
+    return "(" + ".".join(str(part) for part in number) + ")"
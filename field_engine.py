@@ -0,0 +1,189 @@
+"""
+Вычисление полей SEQ и REF, которыми нумеруют подписи.
+
+Если подписи пронумерованы полями Word ("Рисунок {SEQ Рисунок}"), в тексте
+абзаца лежит результат поля на момент последнего обновления - он может быть
+устаревшим, а у w:fldSimple python-docx текст поля вообще не показывает.
+Здесь поля вычисляются заново за один проход по разметке документа:
+
+- SEQ: счетчик по идентификатору, с ключами \\r n (начать с n), \\c (повторить
+  текущее значение) и \\s n (начинать заново после заголовка уровня n -
+  нумерация по главам);
+- REF: значение берется из закладки - если закладка охватывает поле SEQ,
+  ссылка должна показывать его номер.
+
+Обрабатываются и составные поля (w:fldChar/w:instrText, в том числе
+вложенные), и простые (w:fldSimple). Поле STYLEREF с номером главы не
+вычисляется: для проверок достаточно номера внутри главы.
+"""
+
+import re
+from collections import namedtuple
+
+from docx.oxml.ns import qn
+
+from document_outline import paragraph_outline_level, style_outline_levels
+
+# Поле SEQ: идентификатор, вычисленный номер, номер из сохраненного результата
+# (None - не число) и начата ли на этом поле нумерация заново (\r или \s)
+SeqField = namedtuple("SeqField", ["identifier", "value", "cached", "restarted"])
+# Поле REF: закладка, сохраненный результат и поле SEQ внутри закладки
+# (None - в закладке нет SEQ); found - существует ли закладка
+RefField = namedtuple("RefField", ["bookmark", "cached", "target", "found"])
+
+_SEQ_INSTRUCTION = re.compile(r'^\s*SEQ\s+("[^"]+"|\S+)(.*)$', re.IGNORECASE)
+_REF_INSTRUCTION = re.compile(r'^\s*REF\s+("[^"]+"|\S+)', re.IGNORECASE)
+_SWITCH = re.compile(r"\\([a-z])\s*(\d+)?", re.IGNORECASE)
+_NUMBER = re.compile(r"\d+")
+
+_P, _FLD_CHAR, _INSTR_TEXT, _T, _FLD_SIMPLE, _BOOKMARK_START, _BOOKMARK_END = _FIELD_TAGS = (
+    qn("w:p"), qn("w:fldChar"), qn("w:instrText"), qn("w:t"), qn("w:fldSimple"),
+    qn("w:bookmarkStart"), qn("w:bookmarkEnd"))
+
+
+def cached_number(text):
+    """Последнее число в сохраненном результате поля ('Рисунок 3' -> 3)."""
+    numbers = _NUMBER.findall(text)
+    return int(numbers[-1]) if numbers else None
+
+
+class FieldIndex:
+    """
+    Вычисленные поля документа по абзацам основной части.
+
+    seq - {индекс абзаца: [SeqField]}, refs - [(индекс абзаца, RefField)].
+    Индексы абзацев совпадают с doc.paragraphs; поля внутри таблиц
+    учитываются в счетчиках, но к абзацам не привязываются.
+    """
+
+    def __init__(self):
+        self.seq = {}
+        self.refs = []
+        # имя закладки -> первое поле SEQ внутри нее (None - закладка без SEQ)
+        self.bookmarks = {}
+
+    def caption_field(self, para_idx, identifiers):
+        """Первое поле SEQ абзаца с одним из идентификаторов (в нижнем регистре) или None."""
+        for field in self.seq.get(para_idx, ()):
+            if field.identifier.lower() in identifiers:
+                return field
+        return None
+
+
+class _FieldEvaluator:
+    """Состояние обхода: счетчики SEQ, открытые поля и закладки."""
+
+    def __init__(self, style_levels):
+        self.index = FieldIndex()
+        self.style_levels = style_levels
+        self.counters = {}         # идентификатор -> текущее значение
+        self.counter_marks = {}    # идентификатор -> заголовки, после которых значение считалось
+        self.heading_counts = [0] * 9
+        self.open_fields = []      # стек составных полей: [инструкция, результат, идет результат]
+        self.open_bookmarks = {}   # w:id -> имя
+        self.pending_refs = []     # (индекс абзаца, закладка, сохраненный результат)
+
+    def heading(self, level):
+        self.heading_counts[level - 1] += 1
+
+    def seq(self, instruction, cached, para_idx):
+        match = _SEQ_INSTRUCTION.match(instruction)
+        identifier = match.group(1).strip('"')
+        key = identifier.lower()
+        value = self.counters.get(key, 0)
+        switches = {name.lower(): number for name, number in _SWITCH.findall(match.group(2))}
+        restarted = False
+
+        # \s n: после нового заголовка уровня n и выше нумерация начинается заново
+        if "s" in switches:
+            level = int(switches["s"] or 1)
+            mark = tuple(self.heading_counts[:level])
+            if self.counter_marks.get(key, mark) != mark:
+                value = 0
+                restarted = True
+            self.counter_marks[key] = mark
+        if "r" in switches and switches["r"]:
+            value = int(switches["r"])
+            restarted = True
+        elif "c" not in switches:
+            value += 1
+        self.counters[key] = value
+
+        field = SeqField(identifier, value, cached_number(cached), restarted)
+        if para_idx is not None:
+            self.index.seq.setdefault(para_idx, []).append(field)
+        for name in self.open_bookmarks.values():
+            if self.index.bookmarks.get(name) is None:
+                self.index.bookmarks[name] = field
+
+    def field(self, instruction, cached, para_idx):
+        """Вычисляет завершенное поле по его инструкции."""
+        if _SEQ_INSTRUCTION.match(instruction):
+            self.seq(instruction, cached, para_idx)
+            return
+        match = _REF_INSTRUCTION.match(instruction)
+        if match and para_idx is not None:
+            self.pending_refs.append((para_idx, match.group(1).strip('"'), cached))
+
+    def finish(self):
+        """Ссылки разрешаются после обхода: закладка может стоять дальше ссылки."""
+        for para_idx, bookmark, cached in self.pending_refs:
+            found = bookmark in self.index.bookmarks
+            self.index.refs.append((para_idx, RefField(bookmark, cached, self.index.bookmarks.get(bookmark), found)))
+        return self.index
+
+
+def evaluate_fields(doc):
+    """
+    Вычисляет поля SEQ и REF документа за один проход по разметке.
+
+    Args:
+        doc: документ docx
+
+    Returns:
+        FieldIndex
+    """
+    body = doc.element.body
+    evaluator = _FieldEvaluator(style_outline_levels(doc))
+    para_idx = -1
+    current_para = None  # индекс абзаца основной части, внутри которого идет обход
+
+    for element in body.iter(*_FIELD_TAGS):
+        tag = element.tag
+        if tag == _P:
+            if element.getparent() is body:
+                para_idx += 1
+                current_para = para_idx
+            else:
+                current_para = None
+            level = paragraph_outline_level(element, evaluator.style_levels)
+            if level is not None:
+                evaluator.heading(level)
+        elif tag == _FLD_CHAR:
+            kind = element.get(qn("w:fldCharType"))
+            if kind == "begin":
+                evaluator.open_fields.append([[], [], False])
+            elif kind == "separate" and evaluator.open_fields:
+                evaluator.open_fields[-1][2] = True
+            elif kind == "end" and evaluator.open_fields:
+                instruction, result, _ = evaluator.open_fields.pop()
+                evaluator.field("".join(instruction), "".join(result), current_para)
+        elif tag == _INSTR_TEXT:
+            if evaluator.open_fields and not evaluator.open_fields[-1][2]:
+                evaluator.open_fields[-1][0].append(element.text or "")
+        elif tag == _T:
+            # Текст идет в результат всех открытых полей, которые уже дошли до результата
+            for field in evaluator.open_fields:
+                if field[2]:
+                    field[1].append(element.text or "")
+        elif tag == _FLD_SIMPLE:
+            cached = "".join(t.text or "" for t in element.iter(_T))
+            evaluator.field(element.get(qn("w:instr"), ""), cached, current_para)
+        elif tag == _BOOKMARK_START:
+            name = element.get(qn("w:name"))
+            evaluator.open_bookmarks[element.get(qn("w:id"))] = name
+            evaluator.index.bookmarks.setdefault(name, None)
+        elif tag == _BOOKMARK_END:
+            evaluator.open_bookmarks.pop(element.get(qn("w:id")), None)
+
+    return evaluator.finish()
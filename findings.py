@@ -0,0 +1,326 @@
+"""
+Структурированные замечания проверки и каталог текстов сообщений.
+
+Проверки больше не собирают готовые строки: каждое замечание - это Finding
+с кодом правила, уровнем серьезности, индексом абзаца и кортежем аргументов.
+Текст сообщения строится из каталога MESSAGES только тогда, когда он
+действительно нужен (при выводе в документ или отчет), поэтому замечания,
+отброшенные агрегацией или фильтрацией, вообще не форматируются.
+"""
+
+from functools import partial
+
+DEFAULT_AUTHOR = "Norm Control"
+
+# --- Уровни серьезности ---
+ERROR = "error"
+WARNING = "warning"
+INFO = "info"
+
+SEVERITY_LABELS = {
+    ERROR: "Ошибка",
+    WARNING: "Предупреждение",
+    INFO: "Информация",
+}
+
+# Названия элементов документа для общих правил (шрифт, выравнивание, отступы)
+ELEMENT_NAMES = {
+    "main_text": "Основной текст",
+    "main_heading": "Основной заголовок",
+    "section_heading": "Заголовок раздела",
+    "subsection_heading": "Заголовок подраздела",
+}
+
+
+class Finding:
+    """
+    Одно замечание проверки.
+
+    Для совместимости со старым кодом замечание можно распаковать как кортеж
+    (paragraph_index, comment_text, author) - текст при этом формируется из каталога.
+    """
+
+    __slots__ = ("code", "severity", "para_idx", "args", "author")
+
+    def __init__(self, code, para_idx, args=(), author=DEFAULT_AUTHOR):
+        self.code = code
+        self.severity = MESSAGES[code][0]
+        self.para_idx = para_idx
+        self.args = args
+        self.author = author
+
+    @property
+    def category(self):
+        """Категория правила - часть кода до точки ('main_text.font' -> 'main_text')."""
+        return self.code.partition(".")[0]
+
+    @property
+    def message(self):
+        """Текст замечания, сформированный из каталога сообщений."""
+        return render_message(self.code, self.args)
+
+    def __iter__(self):
+        return iter((self.para_idx, self.message, self.author))
+
+    def __eq__(self, other):
+        if not isinstance(other, Finding):
+            return NotImplemented
+        return (self.code, self.para_idx, self.args, self.author) == \
+               (other.code, other.para_idx, other.args, other.author)
+
+    def __hash__(self):
+        return hash((self.code, self.para_idx, self.args, self.author))
+
+    def __repr__(self):
+        return f"Finding({self.code!r}, {self.para_idx!r}, {self.args!r})"
+
+
+def render_message(code, args=()):
+    """Формирует текст сообщения по коду правила и аргументам."""
+    template = MESSAGES[code][1]
+    if callable(template):
+        return template(*args)
+    return template.format(*args)
+
+
+# --- Сообщения, которые собираются из нескольких частей ---
+
+def _render_font_errors(element_name, font_names, expected_font, sizes, expected_size_pt, not_bold, colors):
+    final_errors = []
+    if font_names:
+        name_errors = ", ".join(f"шрифт '{name}'" for name in font_names)
+        final_errors.append(f"{name_errors} вместо '{expected_font}'")
+    if sizes:
+        size_errors = dict.fromkeys(f"размер {size_pt:.0f}пт" for size_pt in sizes)
+        final_errors.append(f"{', '.join(size_errors)} вместо {expected_size_pt:g}пт")
+    if not_bold:
+        final_errors.append("не полужирный")
+    if colors:
+        final_errors.append(f"{', '.join(f'цвет {color}' for color in colors)} вместо черного")
+    return f"Ошибка ({element_name}): {'; '.join(final_errors)}."
+
+def _render_page_margins(margin_errors):
+    parts = [f"{side} поле (ожидается: {expected:g} мм, текущее: {actual:.1f} мм)"
+             for side, expected, actual in margin_errors]
+    return f"Ошибка: Неправильные поля страницы: {', '.join(parts)}"
+
+def _render_citation_format(invalid_citations):
+    return (f"Ошибка: Неправильный формат цитирования: {', '.join(invalid_citations)}. "
+            f"Должно быть [N] или [N, с. X]")
+
+def _render_time_budget(time_budget, skipped):
+    return (f"Предупреждение: Проверка остановлена по истечении лимита времени "
+            f"({time_budget} с). Не проверено: {', '.join(skipped)}.")
+
+def _element_messages(element, name):
+    """Общие сообщения о шрифте, выравнивании и отступах для элемента документа."""
+    return {
+        f"{element}.font_unchecked": (WARNING, f"Предупреждение ({name}): Не удалось проверить форматирование шрифта "
+                                               f"(отсутствуют 'runs' при наличии текста)"),
+        f"{element}.font": (ERROR, partial(_render_font_errors, name)),
+        f"{element}.alignment": (ERROR, f"Ошибка ({name}): Выравнивание должно быть {{0}} (текущее: {{1}})."),
+        f"{element}.first_line_indent": (ERROR, f"Ошибка ({name}): Отступ первой строки должен быть {{0:g}} см "
+                                                f"(текущий: {{1:.2f}} см)."),
+        f"{element}.no_first_line_indent": (ERROR, f"Ошибка ({name}): Не должно быть отступа первой строки "
+                                                   f"(текущий: {{0:.2f}} см)."),
+        f"{element}.trailing_period": (ERROR, f"Ошибка ({name}): Не должно быть точки в конце."),
+        f"{element}.title_trailing_period": (ERROR, f"Ошибка ({name}): Не должно быть точки в конце текстовой части заголовка."),
+        f"{element}.spacing_after": (ERROR, f"Ошибка ({name}): После заголовка должен быть отступ "
+                                            f"(пустая строка или настройка интервала)."),
+    }
+
+
+# --- Каталог сообщений: код правила -> (серьезность, шаблон или функция) ---
+MESSAGES = {}
+for _element, _name in ELEMENT_NAMES.items():
+    MESSAGES.update(_element_messages(_element, _name))
+
+MESSAGES.update({
+    # Общие
+    "check.failed": (ERROR, "Ошибка при проверке форматирования: {0}"),
+    "check.time_budget": (WARNING, _render_time_budget),
+
+    # Поля страницы
+    "page.margins": (ERROR, _render_page_margins),
+    "page.margins_failed": (ERROR, "Ошибка при проверке полей страницы: {0}"),
+
+    # Основной текст
+    "main_text.line_spacing": (ERROR, "Ошибка (Основной текст): Междустрочный интервал должен быть {0:g} (текущий: {1:.2f})."),
+
+    # Заголовки разделов и подразделов
+    "section_heading.number_format": (ERROR, "Ошибка (Заголовок раздела): Номер раздела должен быть в формате "
+                                             "'N. Название' или 'N Название', где N - число."),
+    "section_heading.number_without_dot": (WARNING, "Предупреждение (Заголовок раздела): Рекомендуется использовать "
+                                                    "формат 'N. Название' с точкой после номера."),
+    "section_heading.new_page": (ERROR, "Ошибка (Заголовок раздела): Заголовок раздела должен начинаться с новой страницы."),
+    "subsection_heading.number_format": (ERROR, "Ошибка (Заголовок подраздела): Номер подраздела должен быть в формате "
+                                                "'N.M' (например, '1.1 Название'), без точки после номера."),
+    "subsection_heading.number_trailing_dot": (ERROR, "Ошибка (Заголовок подраздела): После номера подраздела "
+                                                      "(например, '{0}') не должно быть точки."),
+    "subsection_heading.spacing_after": (ERROR, "Ошибка (Заголовок подраздела): После подзаголовка должен быть отступ "
+                                                "(пустая строка или настройка интервала)"),
+    "main_heading.spacing_after": (ERROR, "Ошибка (Основной заголовок): После заголовка должен быть отступ "
+                                          "(пустая строка или настройка интервала)"),
+
+    # Заголовки приложений
+    "appendix_heading.new_page": (ERROR, "Ошибка: Приложение должно начинаться с новой страницы"),
+    "appendix_heading.alignment": (ERROR, "Ошибка: Заголовок приложения должен быть выровнен по центру"),
+    "appendix_heading.case": (ERROR, "Ошибка: Заголовок приложения должен быть в верхнем регистре ({0})"),
+    "appendix_heading.first_line_indent": (ERROR, "Ошибка: Заголовок приложения не должен иметь отступ первой строки"),
+    "appendix_heading.bold": (ERROR, "Ошибка: Заголовок приложения должен быть полужирным"),
+    "appendix_heading.font_name": (ERROR, "Ошибка: Неправильный шрифт заголовка приложения. Ожидается: {0}. Текущий: {1}"),
+    "appendix_heading.font_size": (ERROR, "Ошибка: Неправильный размер шрифта заголовка приложения. "
+                                          "Ожидается: {0:g} пт. Текущий: {1} пт"),
+    "appendix_heading.trailing_period": (ERROR, "Ошибка: Заголовок приложения не должен заканчиваться точкой"),
+    "appendix_heading.spacing_after": (ERROR, "Ошибка: После заголовка приложения должен быть отступ "
+                                              "(пустая строка или настройка интервала)"),
+
+    # Рисунки и подписи к ним
+    "figure.summary": (INFO, "Информация: В документе найдено {0} рисунков и {1} подписей к рисункам."),
+    "figure.missing_captions": (ERROR, "Ошибка: В документе {0} рисунков, но только {1} подписей. "
+                                       "{2} рисунок(ов) без подписи."),
+    "figure.extra_captions": (ERROR, "Ошибка: В документе {0} подписей к рисункам, но только {1} рисунков. "
+                                     "{2} лишних подписей."),
+    "figure.no_caption": (ERROR, "Ошибка: Рисунок в параграфе {0} не имеет подписи или она расположена слишком далеко"),
+    "figure.caption_far": (WARNING, "Предупреждение: Подпись к рисунку в параграфе {0} расположена слишком далеко "
+                                    "(через {1} параграфов)"),
+    "figure.alignment": (ERROR, "Ошибка: Рисунок должен быть выровнен по центру, а не {0}"),
+    "figure.alignment_unknown": (ERROR, "Ошибка: Рисунок должен быть выровнен по центру"),
+    "figure_caption.alignment": (ERROR, "Ошибка: Подпись к рисунку должна быть выровнена по центру"),
+    "figure.too_wide": (ERROR, "Ошибка: Рисунок выходит за границы области текста: ширина {0:.1f} см "
+                               "при ширине области текста {1:.1f} см"),
+    "figure.low_resolution": (WARNING, "Предупреждение: Низкое разрешение рисунка: {0:.0f} точек на дюйм при выводе "
+                                       "({2}x{3} пикселей), рекомендуется не менее {1:g}"),
+    "figure_caption.stale_number": (WARNING, "Предупреждение: Номер рисунка в подписи устарел: показан {0}, "
+                                             "по полю SEQ должен быть {1}. Обновите поля (Ctrl+A, F9)"),
+    "figure_caption.claimed_twice": (WARNING, "Предупреждение: Подпись к рисунку {0} относится сразу к двум рисункам "
+                                              "(в параграфах {1} и {2}). У каждого рисунка должна быть своя подпись"),
+    "figure_caption.numbered_alignment": (ERROR, "Ошибка: Подпись к рисунку {0} должна быть выровнена по центру, а не {1}"),
+    "figure_caption.font_name": (ERROR, "Ошибка: Неправильный шрифт подписи к рисунку. Ожидается: {0}. Текущий: {1}"),
+    "figure_caption.font_size": (ERROR, "Ошибка: Неправильный размер шрифта подписи к рисунку. "
+                                        "Ожидается: {0:g} пт. Текущий: {1} пт"),
+    "figure_caption.font_color": (ERROR, "Ошибка: Цвет шрифта подписи к рисунку должен быть черным"),
+    "figure_caption.format": (ERROR, "Ошибка: Неправильный формат подписи к рисунку. Должно быть 'Рисунок N – Название'"),
+    "figure_caption.trailing_period": (ERROR, "Ошибка: Подпись к рисунку не должна заканчиваться точкой"),
+    "figure_caption.numbering": (ERROR, "Ошибка: Нарушена последовательность нумерации рисунков. "
+                                        "Ожидается: Рисунок {0}, фактически: Рисунок {1}"),
+
+    # Таблицы и их заголовки
+    "table.summary": (INFO, "Информация: В документе найдено {0} таблиц и {1} заголовков к таблицам."),
+    "table.missing_titles": (ERROR, "Ошибка: В документе {0} таблиц, но только {1} заголовков. "
+                                    "{2} таблица(ц) без заголовка."),
+    "table.extra_titles": (ERROR, "Ошибка: В документе {0} заголовков таблиц, но только {1} таблиц. "
+                                  "{2} лишних заголовков."),
+    "table.title_far": (ERROR, "Ошибка: Заголовок таблицы должен быть размещен непосредственно перед таблицей "
+                               "(на расстоянии не более 1-2 параграфов)"),
+    "table_title.stale_number": (WARNING, "Предупреждение: Номер таблицы в заголовке устарел: показан {0}, "
+                                          "по полю SEQ должен быть {1}. Обновите поля (Ctrl+A, F9)"),
+    "table.no_title": (ERROR, "Ошибка: Таблица не имеет заголовка. Добавьте заголовок в формате "
+                              "'Таблица N - Название таблицы'"),
+    "table_text.font_name": (ERROR, "Ошибка: Неправильный шрифт текста в таблице {0}. Ожидается: {1}. Текущий: {2} "
+                                    "(ячеек: {3}, первая - строка {4}, столбец {5})"),
+    "table_text.font_size": (ERROR, "Ошибка: Неправильный размер шрифта текста в таблице {0}. Ожидается: {1:g} пт. "
+                                    "Текущий: {2:g} пт (ячеек: {3}, первая - строка {4}, столбец {5})"),
+    "table_text.font_color": (ERROR, "Ошибка: Цвет текста в таблице {0} должен быть черным "
+                                     "(ячеек: {3}, первая - строка {4}, столбец {5})"),
+    "table_text.line_spacing": (ERROR, "Ошибка: Неправильный межстрочный интервал в таблице {0}. Ожидается: {1:g}. "
+                                       "Текущий: {2:g} (ячеек: {3}, первая - строка {4}, столбец {5})"),
+    "table_title.alignment": (ERROR, "Ошибка: Заголовок таблицы должен быть выровнен по левому краю"),
+    "table_title.numbered_alignment": (ERROR, "Ошибка: Заголовок таблицы {0} должен быть выровнен по левому краю, а не {1}"),
+    "table_title.first_line_indent": (ERROR, "Ошибка: У заголовка таблицы не должно быть отступа первой строки. "
+                                             "Текущий: {0:.2f} см"),
+    "table_title.font_name": (ERROR, "Ошибка: Неправильный шрифт заголовка таблицы. Ожидается: {0}. Текущий: {1}"),
+    "table_title.font_size": (ERROR, "Ошибка: Неправильный размер шрифта заголовка таблицы. "
+                                     "Ожидается: {0:g} пт. Текущий: {1} пт"),
+    "table_title.font_color": (ERROR, "Ошибка: Цвет шрифта заголовка таблицы должен быть черным"),
+    "table_title.format": (ERROR, "Ошибка: Неправильный формат заголовка таблицы. Должно быть 'Таблица N – Название'"),
+    "table_title.trailing_period": (ERROR, "Ошибка: Заголовок таблицы не должен заканчиваться точкой"),
+    "table_title.numbering": (ERROR, "Ошибка: Нарушена последовательность нумерации таблиц. "
+                                     "Ожидается: Таблица {0}, фактически: Таблица {1}"),
+    "table_title.no_table": (ERROR, "Ошибка: Заголовок таблицы {0} не соответствует ни одной таблице "
+                                    "или таблица расположена слишком далеко"),
+
+    # Элементы списков
+    "list_item.semicolon_expected": (ERROR, "Ошибка: Элемент списка должен заканчиваться точкой с запятой (;), "
+                                            "так как за ним следует другой элемент списка"),
+    "list_item.period_instead_of_semicolon": (ERROR, "Ошибка: Элемент списка должен заканчиваться точкой с запятой (;), "
+                                                     "а не точкой, так как за ним следует другой элемент списка"),
+    "list_item.last_semicolon": (ERROR, "Ошибка: Последний элемент списка должен заканчиваться точкой (.), "
+                                        "а не точкой с запятой"),
+    "list_item.period_expected": (ERROR, "Ошибка: Элемент списка должен заканчиваться точкой (.)"),
+    "list_item.missing_bullet_marker": (ERROR, "Ошибка: Элемент списка не содержит правильного маркера. "
+                                               "Для маркированного списка требуется маркер '- '"),
+    "list_item.missing_number_marker": (ERROR, "Ошибка: Элемент списка не содержит правильного маркера. "
+                                               "Для нумерованного списка требуется формат '1)' или 'а)' и т.п."),
+    "list_item.missing_marker": (ERROR, "Ошибка: Элемент списка не содержит правильного маркера. "
+                                        "Требуется: для маркированного списка - '- ', для нумерованного - '1)' или 'а)' и т.п."),
+    "list_item.bullet_marker": (ERROR, "Ошибка: Неправильный маркер маркированного списка. "
+                                       "Должен быть только маркер '- ' (дефис с пробелом)"),
+    "list_item.number_marker": (ERROR, "Ошибка: Неправильный маркер нумерованного списка. "
+                                       "Допустимый формат: '1)' или 'а)' с пробелом после"),
+    "list_item.bullet_start": (ERROR, "Ошибка: Элемент маркированного списка должен начинаться с '- ' (дефис с пробелом)"),
+    "list_item.number_start": (ERROR, "Ошибка: Элемент нумерованного списка должен начинаться с '1)' или 'а)' с пробелом после"),
+    "list_item.marker_format": (ERROR, "Ошибка: Неправильный формат маркера элемента списка. "
+                                       "Требуется: для маркированного списка - '- ', для нумерованного - '1)' или 'а)' и т.п."),
+
+    # Список литературы
+    "bibliography_item.number_format": (ERROR, "Ошибка: Элемент библиографии должен начинаться с номера и точки. "
+                                               "Пример: '1. Иванов И.И.'"),
+    "bibliography_item.first_line_indent": (ERROR, "Ошибка: Неправильный отступ первой строки элемента библиографии. "
+                                                   "Ожидается: {0:g} см. Текущий: {1:.2f} см"),
+    "bibliography_item.alignment": (ERROR, "Ошибка: Элемент библиографии должен быть выровнен по ширине, а не {0}"),
+    "bibliography_item.no_year": (ERROR, "Ошибка: Отсутствует год издания в библиографической записи."),
+    "bibliography_item.trailing_period": (ERROR, "Ошибка: Библиографическая запись должна заканчиваться точкой."),
+    "bibliography.numbering": (ERROR, "Ошибка: Неправильная нумерация библиографической записи. "
+                                      "Ожидается: {0}. Текущий: {1}"),
+    "bibliography.missing_number": (ERROR, "Ошибка: Библиографическая запись должна начинаться с номера и точки "
+                                           "(ожидается: '{0}. ')"),
+
+    # Сноски
+    "footnote.font_name": (ERROR, "Ошибка: Неправильный шрифт сноски #{0}. Ожидается: {1}. Текущий: {2}"),
+    "footnote.font_size": (ERROR, "Ошибка: Неправильный размер шрифта сноски #{0}. Ожидается: {1:g}-{2:g} пт. "
+                                  "Текущий: {3} пт"),
+    "footnote.font_color": (ERROR, "Ошибка: Цвет шрифта сноски #{0} должен быть черным"),
+    "footnote.line_spacing": (ERROR, "Ошибка: Неправильный межстрочный интервал сноски #{0}. "
+                                     "Ожидается: {1:.1f}. Текущий: {2}"),
+    "footnote.unchecked": (WARNING, "Предупреждение: Не удалось проверить сноски. {0}"),
+
+    # Ссылки на источники в тексте
+    "citation.format": (ERROR, _render_citation_format),
+    "citation.dangling_reference": (ERROR, "Ошибка: Ссылка на источник [{0}], которого нет в списке литературы "
+                                           "(упоминаний: {1})"),
+
+    # Формулы
+    "equation.number_format": (ERROR, "Ошибка: Номер формулы должен быть записан арабскими цифрами в круглых скобках "
+                                      "справа от формулы, например (1) или (2.3). Текущий: '{0}'"),
+    "equation.number_position": (WARNING, "Предупреждение: Номер формулы {0} должен стоять у правого края строки "
+                                          "(отделите его от формулы табуляцией)"),
+    "equation.numbering": (ERROR, "Ошибка: Нарушена последовательность нумерации формул. Ожидается: {0}, "
+                                  "фактически: {1}"),
+
+    # Нумерация заголовков
+    "heading.numbering": (ERROR, "Ошибка: Нарушена последовательность нумерации заголовков. Ожидается: {0}, "
+                                 "фактически: {1}"),
+    "heading.duplicate_number": (ERROR, "Ошибка: Номер заголовка {0} уже использован"),
+    "heading.numbering_depth": (ERROR, "Ошибка: Номер заголовка {0} не соответствует иерархии разделов "
+                                       "(предыдущий номер: {1})"),
+
+    # Содержание
+    "toc.missing_entry": (ERROR, "Ошибка: Заголовок '{0}' отсутствует в содержании"),
+    "toc.extra_entry": (ERROR, "Ошибка: Пункт содержания '{0}' не соответствует ни одному заголовку документа"),
+    "toc.mismatched_entry": (ERROR, "Ошибка: Пункт содержания '{0}' не совпадает с заголовком в тексте: '{1}'. "
+                                    "Обновите содержание"),
+
+    # Перекрестные ссылки (поля REF)
+    "reference.broken": (ERROR, "Ошибка: Перекрестная ссылка '{1}' ведет на несуществующую закладку {0}. "
+                                "После обновления полей Word покажет 'Источник ссылки не найден'"),
+    "reference.stale_number": (WARNING, "Предупреждение: Перекрестная ссылка '{0}' устарела: {1} сейчас имеет номер {2}. "
+                                        "Обновите поля (Ctrl+A, F9)"),
+
+    # Ссылки на рисунки, таблицы и источники
+    "figure.unreferenced": (WARNING, "Предупреждение: В тексте нет ссылки на рисунок {0}"),
+    "figure.dangling_reference": (ERROR, "Ошибка: Ссылка на рисунок {0}, которого нет в документе (упоминаний: {1})"),
+    "table.unreferenced": (WARNING, "Предупреждение: В тексте нет ссылки на таблицу {0}"),
+    "table.dangling_reference": (ERROR, "Ошибка: Ссылка на таблицу {0}, которой нет в документе (упоминаний: {1})"),
+    "bibliography.unreferenced": (WARNING, "Предупреждение: В тексте нет ссылки на источник {0} из списка литературы"),
+})
@@ -0,0 +1,77 @@
+"""
+Выгрузка замечаний в JSON и NDJSON.
+
+Внешним системам (например, LMS) документ с комментариями не нужен - им
+нужен список нарушений. Здесь результат проверки (CheckResult) превращается
+в записи с адресом абзаца, кодом правила, уровнем серьезности, текстом
+сообщения и фрагментом текста абзаца. Документ при этом не переписывается,
+так что такая проверка стоит только разбора и самих проверок.
+
+Формат записи:
+    {"paragraph": 12, "code": "main_text.font", "category": "main_text",
+     "severity": "error", "message": "...", "excerpt": "..."}
+paragraph - индекс абзаца основного тела (как в doc.paragraphs), null - замечание
+ко всему документу. JSON - объект со списком findings и признаком неполной
+проверки, NDJSON - одна запись на строку.
+"""
+
+import json
+
+# Сколько символов текста абзаца выводить в excerpt
+EXCERPT_LENGTH = 120
+
+# Поддерживаемые форматы и их MIME-типы
+FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def excerpt(text, length=EXCERPT_LENGTH):
+    """Фрагмент текста абзаца: пробелы схлопнуты, длинный текст обрезан с многоточием."""
+    text = " ".join(text.split())
+    return text if len(text) <= length else text[:length - 1].rstrip() + "…"
+
+def finding_record(finding, paragraph_texts=None):
+    """
+    Запись для выгрузки по одному замечанию.
+
+    Args:
+        finding: Finding
+        paragraph_texts: {индекс абзаца: текст} (CheckResult.paragraph_texts)
+    """
+    text = (paragraph_texts or {}).get(finding.para_idx)
+    return {
+        "paragraph": finding.para_idx if finding.para_idx >= 0 else None,
+        "code": finding.code,
+        "category": finding.category,
+        "severity": finding.severity,
+        "message": finding.message,
+        "excerpt": excerpt(text) if text else None,
+    }
+
+def findings_records(result):
+    """Записи по всем замечаниям результата проверки в порядке абзацев."""
+    texts = getattr(result, "paragraph_texts", None)
+    findings = sorted(result, key=lambda finding: finding.para_idx if finding.para_idx >= 0 else float("inf"))
+    return [finding_record(finding, texts) for finding in findings]
+
+def findings_to_json(result):
+    """Результат проверки одним JSON-объектом."""
+    records = findings_records(result)
+    return json.dumps({
+        "partial": getattr(result, "is_partial", False),
+        "skipped": getattr(result, "skipped", []),
+        "count": len(records),
+        "findings": records,
+    }, ensure_ascii=False)
+
+def findings_to_ndjson(result):
+    """Результат проверки в NDJSON: одна строка - одно замечание."""
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in findings_records(result))
+
+def dump_findings(result, fmt):
+    """Сериализует результат проверки в формат fmt ('json' или 'ndjson')."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    return findings_to_json(result) if fmt == "json" else findings_to_ndjson(result)
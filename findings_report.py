@@ -0,0 +1,119 @@
+"""
+HTML-отчет по замечаниям проверки.
+
+Страница результата показывает только число замечаний, а отчет перечисляет
+сами замечания по разделам документа с фрагментами текста абзацев - их можно
+посмотреть, не скачивая документ.
+
+После проверки рядом с результатом сохраняется снимок (<файл>.findings.json):
+записи замечаний (findings_export) и разделы документа. Отчет строится из
+снимка по мере отдачи клиенту: шаблон рендерится потоком, группы замечаний
+выдает генератор, поэтому даже на тысячах замечаний страница не собирается в
+одну большую строку. Отданный отчет одновременно пишется в кэш
+(<файл>.report.html), и повторные запросы отдают готовый файл.
+"""
+
+import json
+import os
+import uuid
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import groupby
+
+from findings_export import findings_records
+
+SNAPSHOT_SUFFIX = ".findings.json"
+REPORT_SUFFIX = ".report.html"
+
+# Сколько кусков шаблона копить перед отправкой клиенту
+STREAM_BUFFER_SIZE = 64
+
+# Группа отчета: заголовок группы, индекс абзаца заголовка (None - без раздела) и записи замечаний
+ReportGroup = namedtuple("ReportGroup", ["title", "para_idx", "findings"])
+
+GENERAL_GROUP_TITLE = "Документ в целом"
+PREAMBLE_GROUP_TITLE = "До первого раздела"
+
+
+def write_snapshot(result, path):
+    """
+    Сохраняет снимок результата проверки для отчета и сбрасывает кэш
+    отчета, построенный по прошлому снимку.
+    """
+    snapshot = {
+        "partial": result.is_partial,
+        "skipped": result.skipped,
+        "sections": [list(section) for section in result.sections],
+        "findings": findings_records(result),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    report_path = report_cache_path(path)
+    if os.path.exists(report_path):
+        os.remove(report_path)
+    return path
+
+def load_snapshot(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def report_cache_path(snapshot_path):
+    """Путь к кэшу отчета для снимка."""
+    return snapshot_path[:-len(SNAPSHOT_SUFFIX)] + REPORT_SUFFIX
+
+def group_by_section(findings, sections):
+    """
+    Раскладывает замечания по разделам документа.
+
+    Args:
+        findings: записи замечаний в порядке абзацев, общие (paragraph = None) - в конце
+        sections: [(индекс абзаца заголовка, номер, текст)] в порядке документа
+
+    Yields:
+        ReportGroup: сначала общие замечания, затем разделы по порядку
+    """
+    general = [record for record in findings if record["paragraph"] is None]
+    if general:
+        yield ReportGroup(GENERAL_GROUP_TITLE, None, general)
+
+    starts = [section[0] for section in sections]
+    located = (record for record in findings if record["paragraph"] is not None)
+    for position, records in groupby(located, key=lambda record: bisect_right(starts, record["paragraph"])):
+        if position == 0:
+            yield ReportGroup(PREAMBLE_GROUP_TITLE, None, list(records))
+        else:
+            para_idx, label, title = sections[position - 1]
+            yield ReportGroup(f"{label} {title}".strip(), para_idx, list(records))
+
+def stream_report(template, snapshot, cache_path, **context):
+    """
+    Рендерит отчет потоком и одновременно пишет его в кэш.
+
+    Кэш пишется во временный файл и появляется под своим именем только
+    после полной отдачи - оборванный клиентом отчет в кэш не попадает.
+
+    Args:
+        template: шаблон Jinja (templates/report.html)
+        snapshot: снимок из load_snapshot
+        cache_path: путь к кэшу отчета
+        context: дополнительные переменные шаблона
+
+    Yields:
+        str: куски HTML
+    """
+    stream = template.stream(partial=snapshot["partial"], skipped=snapshot["skipped"],
+                             finding_count=len(snapshot["findings"]),
+                             groups=group_by_section(snapshot["findings"], snapshot["sections"]), **context)
+    stream.enable_buffering(STREAM_BUFFER_SIZE)
+    temp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+    completed = False
+    try:
+        with open(temp_path, "w", encoding="utf-8") as cache:
+            for chunk in stream:
+                cache.write(chunk)
+                yield chunk
+        os.replace(temp_path, cache_path)
+        completed = True
+    finally:
+        if not completed and os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,139 @@
+"""
+Нормализация прямого форматирования document.xml преобразованиями XSLT.
+
+Неправильное прямое форматирование (шрифт в rFonts отдельных runs, цвет,
+выравнивание абзаца) исправлять через объекты python-docx долго: на каждый
+run создаются обертки и выполняются отдельные операции с XML. Здесь каждое
+исправление - заранее скомпилированное преобразование lxml.etree.XSLT,
+которое проходит document.xml целиком за один проход в libxslt.
+
+Какие абзацы исправлять, решает классификатор проверки: перед
+преобразованиями абзацам основного тела ставится временный атрибут с типом
+абзаца (CheckResult.paragraph_kinds), преобразования меняют только абзацы
+нужных типов, после всех проходов атрибут снимается.
+
+Меняются только значения, которые заданы прямо и отличаются от нужного;
+то, что абзац наследует от стиля, не трогается - это исправляется в стилях
+(autofix).
+"""
+
+from collections import Counter
+
+from lxml import etree
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+NAMESPACES = {"w": W_NS}
+
+# Временный атрибут с типом абзаца. Без пространства имен: объявление
+# пространства имен осталось бы на каждом абзаце и после снятия атрибута
+MARKER_ATTR = "normcontrol-kind"
+
+# Абзац ближайшего w:p-предка помечен одним из типов $kinds (" main_text section_heading ")
+_MARKED = f"contains($kinds, concat(' ', ancestor::w:p[1]/@{MARKER_ATTR}, ' '))"
+
+_STYLESHEET = """<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform"
+                xmlns:w="{w_ns}" exclude-result-prefixes="w">
+  <xsl:param name="kinds"/>
+  <xsl:param name="value"/>
+  <xsl:template match="@*|node()">
+    <xsl:copy><xsl:apply-templates select="@*|node()"/></xsl:copy>
+  </xsl:template>
+  <xsl:template match="{path}">
+    <xsl:choose>
+      <xsl:when test="{condition}">{action}</xsl:when>
+      <xsl:otherwise><xsl:copy-of select="."/></xsl:otherwise>
+    </xsl:choose>
+  </xsl:template>
+</xsl:stylesheet>"""
+
+
+class Transform:
+    """
+    Скомпилированное преобразование: элементы path, для которых выполняется
+    condition в помеченных абзацах, заменяются результатом action (фрагмент
+    XSLT). В condition и action доступны параметры $kinds и $value.
+    """
+
+    def __init__(self, name, path, condition, action):
+        self.name = name
+        condition = f"{_MARKED} and ({condition})"
+        stylesheet = _STYLESHEET.format(w_ns=W_NS, path=path, condition=condition, action=action)
+        self._xslt = etree.XSLT(etree.XML(stylesheet))
+        self._count = etree.XPath(f"count(//{path}[{condition}])", namespaces=NAMESPACES)
+
+    def __call__(self, tree, kinds, value):
+        """
+        Применяет преобразование к дереву с помеченными абзацами.
+
+        Returns:
+            (новое дерево, число исправленных элементов); если исправлять
+            нечего, возвращается исходное дерево
+        """
+        kinds = f" {' '.join(kinds)} "
+        changed = int(self._count(tree, kinds=kinds, value=value))
+        if not changed:
+            return tree, 0
+        return self._xslt(tree, kinds=etree.XSLT.strparam(kinds), value=etree.XSLT.strparam(value)), changed
+
+
+# Шрифт runs: ascii/hAnsi = $value, тема шрифта (она важнее явного имени) снимается
+FORCE_FONT = Transform(
+    "font_name", "w:r/w:rPr/w:rFonts",
+    "@w:asciiTheme or @w:hAnsiTheme or (@w:ascii and @w:ascii != $value) or (@w:hAnsi and @w:hAnsi != $value)",
+    f"""<xsl:copy>
+          <xsl:copy-of select="@*[not(namespace-uri() = '{W_NS}'
+                                      and (local-name() = 'asciiTheme' or local-name() = 'hAnsiTheme'))]"/>
+          <xsl:attribute name="w:ascii"><xsl:value-of select="$value"/></xsl:attribute>
+          <xsl:attribute name="w:hAnsi"><xsl:value-of select="$value"/></xsl:attribute>
+        </xsl:copy>""")
+
+# Цвет runs, отличный от $value (RRGGBB) и от автоматического, снимается - цвет берется из стиля
+REMOVE_COLOR = Transform(
+    "font_color", "w:r/w:rPr/w:color",
+    "@w:val != 'auto' and translate(@w:val, 'abcdef', 'ABCDEF') != $value",
+    "")
+
+# Выравнивание абзаца (w:jc), заданное прямо, меняется на $value
+SET_ALIGNMENT = Transform(
+    "alignment", "w:p/w:pPr/w:jc",
+    "@w:val != $value",
+    """<xsl:copy>
+          <xsl:copy-of select="@*"/>
+          <xsl:attribute name="w:val"><xsl:value-of select="$value"/></xsl:attribute>
+        </xsl:copy>""")
+
+
+def normalize_part(part, paragraph_kinds, passes):
+    """
+    Нормализует прямое форматирование основной части документа.
+
+    После преобразований у части новый корневой элемент: объекты python-docx,
+    полученные до вызова (doc, абзацы, runs), к нему не относятся - документ
+    нужно заново получить через part.document.
+
+    Args:
+        part: часть документа (doc.part)
+        paragraph_kinds: {индекс абзаца в doc.paragraphs: тип абзаца}
+        passes: проходы [(Transform, типы абзацев, значение)] в порядке применения
+
+    Returns:
+        Counter: {имя преобразования: число исправленных элементов}
+    """
+    root = part.element
+    paragraphs = root.body.p_lst
+    for i, kind in paragraph_kinds.items():
+        if 0 <= i < len(paragraphs):
+            paragraphs[i].set(MARKER_ATTR, kind)
+
+    tree = root.getroottree()
+    changed = Counter()
+    for transform, kinds, value in passes:
+        tree, count = transform(tree, kinds, value)
+        if count:
+            changed[transform.name] += count
+
+    new_root = tree.getroot()
+    etree.strip_attributes(new_root, MARKER_ATTR)
+    if new_root is not root:
+        part._element = new_root
+    return changed
@@ -1,16 +1,33 @@
 from docx import Document
-from docx.shared import Pt, Mm, Cm, RGBColor
+from docx.text.paragraph import Paragraph
+from docx.shared import Pt, Mm, Cm, Emu, Length, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import nsmap, qn
+from lxml import etree
+from collections import namedtuple
+from functools import cache
 import re
+import bisect
 import difflib
+import time
 
+from findings import Finding
+from image_inspector import MediaInspector, VECTOR_FORMATS
+from rule_profiles import get_profile
+from table_walker import iter_table_cells, iter_cell_paragraphs
+from reference_index import FIGURE, TABLE, SOURCE, build_reference_index
+from text_layer import TextLayer
+from field_engine import evaluate_fields, cached_number
+from equation_index import EquationIndex, is_equation_paragraph
+from document_outline import DocumentOutline, list_number_labels, paragraph_outline_levels
+from table_of_contents import extract_toc_entries, collect_headings, compare_toc
 from formatting_utils import (
     get_effective_first_line_indent_obj,
     get_effective_alignment,
-    get_first_line_indent_cm,
+    get_first_line_indent_emu,
     get_run_font_name,
-    get_run_font_size_pt,
+    get_run_font_size_emu,
     get_run_font_color_rgb,
     get_run_bold_status
 )
@@ -24,6 +41,50 @@ STRUCTURAL_HEADINGS_KEYWORDS = [
 HEADING_1_STYLE_NAMES = ["heading 1", "заголовок 1", "header 1", "title 1"]
 HEADING_2_STYLE_NAMES = ["heading 2", "заголовок 2", "header 2", "title 2"]
 
+# --- Результат проверки и ограничение по времени ---
+
+class CheckResult(list):
+    """
+    Результат проверки документа.
+
+    Это обычный список кортежей (paragraph_index, comment_text, author), поэтому
+    старый код, который просто перебирает комментарии, продолжает работать.
+    Дополнительно хранит список пропущенных частей проверки (skipped), если
+    проверка была остановлена по истечении лимита времени, тексты абзацев,
+    к которым есть замечания (paragraph_texts), и разделы документа (sections:
+    кортежи (индекс абзаца заголовка, номер, текст)) - для выгрузки и отчета
+    без повторного разбора документа. paragraph_kinds - типы абзацев, которые
+    определил классификатор ({индекс абзаца: 'main_text', 'section_heading', ...}).
+    """
+
+    def __init__(self, comments=(), skipped=None, paragraph_texts=None, sections=None, paragraph_kinds=None):
+        super().__init__(comments)
+        self.skipped = list(skipped) if skipped else []
+        self.paragraph_texts = paragraph_texts or {}
+        self.sections = list(sections) if sections else []
+        self.paragraph_kinds = paragraph_kinds or {}
+
+    @property
+    def is_partial(self):
+        """True, если часть абзацев или правил не была проверена."""
+        return bool(self.skipped)
+
+class CheckDeadline:
+    """
+    Ограничение времени проверки.
+
+    Args:
+        time_budget: лимит в секундах (None - без ограничения)
+    """
+
+    def __init__(self, time_budget=None):
+        self.time_budget = time_budget
+        self.expires_at = time.monotonic() + time_budget if time_budget is not None else None
+
+    def expired(self):
+        """Проверяет, истек ли отведенный на проверку лимит времени."""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
 # --- Утилиты определения типа элемента ---
 
 def get_paragraph_style_name(para):
@@ -58,12 +119,8 @@ def is_appendix_heading_type(para_text_upper_stripped):
 
 def is_in_table(para, doc):
     """Моя функция для проверки, находится ли параграф в таблице."""
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                if para in cell.paragraphs:
-                    return True
-    return False
+    # Достаточно подняться по предкам абзаца до ячейки w:tc
+    return any(ancestor.tag == qn("w:tc") for ancestor in para._p.iterancestors())
 
 def is_main_heading(para):
     """Решил сделать такую проверку для заголовков основных разделов."""
@@ -518,66 +575,71 @@ def has_spacing_after(para, next_para=None):
 
 # --- Функции проверки форматирования ---
 
-def check_font_formatting_for_runs(para, para_idx, comments_list, author, element_name,
-                                   expected_font="Times New Roman", expected_size_pt=14,
-                                   must_be_bold=False, expected_color_rgb=RGBColor(0,0,0)):
-    """Общая функция для проверки шрифта, размера, жирности и цвета для всех runs абзаца."""
+def check_font_formatting_for_runs(para, para_idx, comments_list, author, element,
+                                   profile=None, must_be_bold=False):
+    """
+    Общая функция для проверки шрифта, размера, жирности и цвета для всех runs абзаца.
+
+    element - код элемента документа ('main_text', 'section_heading' и т.д.),
+    от него зависит код замечания ('main_text.font').
+    Ожидаемые шрифт, размер и цвет берутся из профиля правил.
+    """
+    profile = get_profile(profile)
     if not para.runs and para.text.strip():
-        comments_list.append((para_idx, f"Предупреждение ({element_name}): Не удалось проверить форматирование шрифта (отсутствуют 'runs' при наличии текста)", author))
+        comments_list.append(Finding(f"{element}.font_unchecked", para_idx, (), author))
         return
 
-    # Собираем ошибки по всем runs, чтобы не дублировать сообщения для одного абзаца
-    font_name_errors = set()
-    font_size_errors = set()
-    bold_errors = set()
-    color_errors = set()
+    # Собираем ошибки по всем runs, чтобы не дублировать сообщения для одного абзаца.
+    # Словари вместо множеств - чтобы порядок значений в сообщении был стабильным
+    font_name_errors = {}
+    font_size_errors = {}
+    bold_error = False
+    color_errors = {}
 
     for run in para.runs:
         if not run.text.strip(): continue
 
         # Шрифт
         font_name = get_run_font_name(run, para.style)
-        if font_name and font_name != expected_font:
-            font_name_errors.add(f"шрифт '{font_name}'")
+        if font_name and font_name != profile.font_name:
+            font_name_errors[font_name] = None
         
-        # Размер
-        size_pt = get_run_font_size_pt(run, para.style)
-        if size_pt is not None and abs(size_pt - expected_size_pt) > 0.1:
-            font_size_errors.add(f"размер {size_pt:.0f}пт")
+        # Размер (в EMU, сравниваем целые числа)
+        size = get_run_font_size_emu(run, para.style)
+        if size is not None and abs(size - profile.font_size) > profile.font_size_tolerance:
+            font_size_errors[size.pt] = None
 
         # Жирность
         is_bold = get_run_bold_status(run, para.style)
         if is_bold is None: is_bold = False 
         if must_be_bold and not is_bold:
-            bold_errors.add("не полужирный")
+            bold_error = True
 
         # Цвет
         color_rgb = get_run_font_color_rgb(run, para.style)
-        if color_rgb is not None and color_rgb != expected_color_rgb:
-            color_errors.add(f"цвет {color_rgb}")
+        if color_rgb is not None and color_rgb != profile.font_color:
+            color_errors[color_rgb] = None
             
-    # Формируем итоговое сообщение об ошибке, если есть
-    final_errors = []
-    if font_name_errors: final_errors.append(f"{', '.join(font_name_errors)} вместо '{expected_font}'")
-    if font_size_errors: final_errors.append(f"{', '.join(font_size_errors)} вместо {expected_size_pt}пт")
-    if bold_errors: final_errors.append(f"{', '.join(bold_errors)}")
-    if color_errors: final_errors.append(f"{', '.join(color_errors)} вместо черного")
-
-    if final_errors:
-        comments_list.append((para_idx, f"Ошибка ({element_name}): {'; '.join(final_errors)}.", author))
+    # Одно замечание на абзац, текст формируется из каталога при выводе
+    if font_name_errors or font_size_errors or bold_error or color_errors:
+        comments_list.append(Finding(f"{element}.font", para_idx,
+                                     (tuple(font_name_errors), profile.font_name,
+                                      tuple(font_size_errors), profile.font_size.pt,
+                                      bold_error, tuple(color_errors)), author))
 
-def check_structural_or_appendix_heading_format(para, para_idx, comments_list, author, element_name):
+def check_structural_or_appendix_heading_format(para, para_idx, comments_list, author, element, profile=None):
     """Проверка для СТРУКТУРНЫХ заголовков и ПРИЛОЖЕНИЙ."""
-    # Правила: 14 пт, черный, полужирный, по центру, без отступа первой строки
-    check_font_formatting_for_runs(para, para_idx, comments_list, author, element_name, must_be_bold=True)
+    profile = get_profile(profile)
+    # Правила: шрифт профиля, черный, полужирный, по центру, без отступа первой строки
+    check_font_formatting_for_runs(para, para_idx, comments_list, author, element, profile, must_be_bold=True)
 
     alignment = get_effective_alignment(para)
     if alignment != WD_ALIGN_PARAGRAPH.CENTER:
-        comments_list.append((para_idx, f"Ошибка ({element_name}): Выравнивание должно быть по центру (текущее: {alignment}).", author))
+        comments_list.append(Finding(f"{element}.alignment", para_idx, ("по центру", alignment), author))
 
-    first_line_indent_cm = get_first_line_indent_cm(para)
-    if abs(first_line_indent_cm) > 0.01: # Отступ должен быть строго 0 (или очень близок к нему)
-        comments_list.append((para_idx, f"Ошибка ({element_name}): Не должно быть отступа первой строки (текущий: {first_line_indent_cm:.2f} см).", author))
+    first_line_indent = get_first_line_indent_emu(para)
+    if abs(first_line_indent) > profile.heading_no_indent_tolerance: # Отступ должен быть строго 0 (или очень близок к нему)
+        comments_list.append(Finding(f"{element}.no_first_line_indent", para_idx, (first_line_indent.cm,), author))
     
     # Точка в конце (только для простых заголовков без точки в самом названии)
     stripped_text_upper = para.text.strip().upper()
@@ -585,206 +647,219 @@ def check_structural_or_appendix_heading_format(para, para_idx, comments_list, a
     known_headings_with_possible_dot = ["СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ.", "СПИСОК ИСПОЛЬЗОВАННОЙ ЛИТЕРАТУРЫ."] # Маловероятно, но для примера
     if stripped_text_upper.endswith('.') and stripped_text_upper not in known_headings_with_possible_dot:
         # Дополнительная проверка, что это не "ПРИЛОЖЕНИЕ А."
-        if not (element_name.startswith("Заголовок приложения") and stripped_text_upper.startswith("ПРИЛОЖЕНИЕ")):
-             comments_list.append((para_idx, f"Ошибка ({element_name}): Не должно быть точки в конце.", author))
-
-def check_page_margins(section, comments_list, author):
-    """Check document margins."""
-    # Expected margins in mm
-    expected_left = 30
-    expected_right = 15
-    expected_top = 20
-    expected_bottom = 20
-    
-    # Get actual margins in mm
+        if not (element == "appendix_heading" and stripped_text_upper.startswith("ПРИЛОЖЕНИЕ")):
+             comments_list.append(Finding(f"{element}.trailing_period", para_idx, (), author))
+
+def check_page_margins(section, comments_list, author, profile=None):
+    """Check document margins against the rule profile."""
+    profile = get_profile(profile)
     try:
-        left_margin = section.left_margin.mm if section.left_margin else 0
-        right_margin = section.right_margin.mm if section.right_margin else 0
-        top_margin = section.top_margin.mm if section.top_margin else 0
-        bottom_margin = section.bottom_margin.mm if section.bottom_margin else 0
+        # Actual margins in EMU, in the same order as profile.page_margins
+        actual_margins = (section.left_margin, section.right_margin, section.top_margin, section.bottom_margin)
         
         # Check each margin with some tolerance
         margin_errors = []
-        if abs(left_margin - expected_left) > 1:
-            margin_errors.append(f"левое поле (ожидается: {expected_left} мм, текущее: {left_margin:.1f} мм)")
-        
-        if abs(right_margin - expected_right) > 1:
-            margin_errors.append(f"правое поле (ожидается: {expected_right} мм, текущее: {right_margin:.1f} мм)")
-        
-        if abs(top_margin - expected_top) > 1:
-            margin_errors.append(f"верхнее поле (ожидается: {expected_top} мм, текущее: {top_margin:.1f} мм)")
-        
-        if abs(bottom_margin - expected_bottom) > 1:
-            margin_errors.append(f"нижнее поле (ожидается: {expected_bottom} мм, текущее: {bottom_margin:.1f} мм)")
+        for (side, expected), actual in zip(profile.page_margins, actual_margins):
+            actual = actual or Mm(0)
+            if abs(actual - expected) > profile.margin_tolerance:
+                margin_errors.append((side, expected.mm, actual.mm))
         
         # Add error message if any margins are incorrect
         if margin_errors:
-            comments_list.append((-1, f"Ошибка: Неправильные поля страницы: {', '.join(margin_errors)}", author))
+            comments_list.append(Finding("page.margins", -1, (tuple(margin_errors),), author))
     except Exception as e:
-        comments_list.append((-1, f"Ошибка при проверке полей страницы: {str(e)}", author))
+        comments_list.append(Finding("page.margins_failed", -1, (str(e),), author))
+
+def get_text_width(section):
+    """Ширина области текста раздела в EMU: ширина страницы без левого и правого полей."""
+    return Emu((section.page_width or 0) - (section.left_margin or 0) - (section.right_margin or 0))
 
-def check_main_heading_format(para, para_idx, doc, comments_list, author, next_para=None):
+def check_main_heading_format(para, para_idx, doc, comments_list, author, next_para=None, profile=None):
     """Check main headings like ВВЕДЕНИЕ, ЗАКЛЮЧЕНИЕ etc."""
     # Используем общую функцию для структурных заголовков
-    check_structural_or_appendix_heading_format(para, para_idx, comments_list, author, "Основной заголовок")
+    check_structural_or_appendix_heading_format(para, para_idx, comments_list, author, "main_heading", profile)
     
     # Дополнительно проверяем отступ после заголовка
     if next_para and not is_empty_paragraph(next_para) and not has_spacing_after(para, next_para):
-        comments_list.append((para_idx, f"Ошибка (Основной заголовок): После заголовка должен быть отступ (пустая строка или настройка интервала)", author))
+        comments_list.append(Finding("main_heading.spacing_after", para_idx, (), author))
 
-def check_section_heading_format(para, para_idx, doc, comments_list, author, next_para=None):
-    """Check formatting of section headings (1. Heading or 1 Heading)."""
-    element_name = "Заголовок раздела"
-    # Правила: 14 пт, черный, полужирный, по левому краю, отступ первой строки 1.25 см
-    check_font_formatting_for_runs(para, para_idx, comments_list, author, element_name, must_be_bold=True)
+def _heading_text_with_number(para, number_label):
+    """Текст заголовка вместе с номером: номер списка добавляется, только если в тексте номера нет."""
+    text = para.text.strip()
+    if number_label and not re.match(r"\d", text):
+        return f"{number_label.strip()} {text}"
+    return text
+
+def check_section_heading_format(para, para_idx, doc, comments_list, author, next_para=None, profile=None,
+                                 number_label=None):
+    """
+    Check formatting of section headings (1. Heading or 1 Heading).
+    number_label - номер, который Word рисует по списку (list_number_labels), если в тексте его нет.
+    """
+    element = "section_heading"
+    profile = get_profile(profile)
+    # Правила: шрифт профиля, черный, полужирный, по левому краю, отступ первой строки из профиля
+    check_font_formatting_for_runs(para, para_idx, comments_list, author, element, profile, must_be_bold=True)
 
     alignment = get_effective_alignment(para)
     if alignment != WD_ALIGN_PARAGRAPH.LEFT:
-        comments_list.append((para_idx, f"Ошибка ({element_name}): Выравнивание должно быть по левому краю (текущее: {alignment}).", author))
+        comments_list.append(Finding(f"{element}.alignment", para_idx, ("по левому краю", alignment), author))
 
-    first_line_indent_cm = get_first_line_indent_cm(para)
-    if abs(first_line_indent_cm - 1.25) > 0.1:
-        comments_list.append((para_idx, f"Ошибка ({element_name}): Отступ первой строки должен быть 1.25 см (текущий: {first_line_indent_cm:.2f} см).", author))
+    first_line_indent = get_first_line_indent_emu(para)
+    if abs(first_line_indent - profile.heading_first_line_indent) > profile.heading_indent_tolerance:
+        comments_list.append(Finding(f"{element}.first_line_indent", para_idx,
+                                     (profile.heading_first_line_indent.cm, first_line_indent.cm), author))
     
     # Проверка формата номера "N." или "N "
-    format_with_dot = re.match(r"^\d{1,2}\.\s+", para.text.strip())
-    format_without_dot = re.match(r"^\d{1,2}\s+", para.text.strip())
+    heading_text = _heading_text_with_number(para, number_label)
+    format_with_dot = re.match(r"^\d{1,2}\.\s+", heading_text)
+    format_without_dot = re.match(r"^\d{1,2}\s+", heading_text)
     
     if not format_with_dot and not format_without_dot:
-        comments_list.append((para_idx, f"Ошибка ({element_name}): Номер раздела должен быть в формате 'N. Название' или 'N Название', где N - число.", author))
+        comments_list.append(Finding(f"{element}.number_format", para_idx, (), author))
     elif format_without_dot:
         # Предупреждение, если используется формат без точки после номера
-        comments_list.append((para_idx, f"Предупреждение ({element_name}): Рекомендуется использовать формат 'N. Название' с точкой после номера.", author))
+        comments_list.append(Finding(f"{element}.number_without_dot", para_idx, (), author))
     
     # Точка в конце текстовой части заголовка
-    text_content = para.text.strip()
+    text_content = heading_text
     if format_with_dot:
         text_content = text_content[len(format_with_dot.group(0)):].strip()
     elif format_without_dot:
         text_content = text_content[len(format_without_dot.group(0)):].strip()
         
     if text_content.endswith('.'):
-        comments_list.append((para_idx, f"Ошибка ({element_name}): Не должно быть точки в конце текстовой части заголовка.", author))
+        comments_list.append(Finding(f"{element}.title_trailing_period", para_idx, (), author))
 
     # Проверка новой страницы
     if not is_paragraph_on_new_page(doc, para_idx):
-        comments_list.append((para_idx, f"Ошибка ({element_name}): Заголовок раздела должен начинаться с новой страницы.", author))
+        comments_list.append(Finding(f"{element}.new_page", para_idx, (), author))
         
     # Проверка отступа после заголовка
     if next_para and not is_empty_paragraph(next_para) and not has_spacing_after(para, next_para):
-        comments_list.append((para_idx, f"Ошибка ({element_name}): После заголовка должен быть отступ (пустая строка или настройка интервала).", author))
+        comments_list.append(Finding(f"{element}.spacing_after", para_idx, (), author))
 
-def check_subsection_heading_format(para, para_idx, comments_list, author, next_para=None):
-    """Check formatting of subsection headings (1.1 Heading without period)."""
-    element_name = "Заголовок подраздела"
-    # Правила: 14 пт, черный, полужирный, по левому краю, отступ первой строки 1.25 см
-    check_font_formatting_for_runs(para, para_idx, comments_list, author, element_name, must_be_bold=True)
+def check_subsection_heading_format(para, para_idx, comments_list, author, next_para=None, profile=None,
+                                    number_label=None):
+    """
+    Check formatting of subsection headings (1.1 Heading without period).
+    number_label - номер, который Word рисует по списку (list_number_labels), если в тексте его нет.
+    """
+    element = "subsection_heading"
+    profile = get_profile(profile)
+    # Правила: шрифт профиля, черный, полужирный, по левому краю, отступ первой строки из профиля
+    check_font_formatting_for_runs(para, para_idx, comments_list, author, element, profile, must_be_bold=True)
 
     alignment = get_effective_alignment(para)
     if alignment != WD_ALIGN_PARAGRAPH.LEFT:
-        comments_list.append((para_idx, f"Ошибка ({element_name}): Выравнивание должно быть по левому краю (текущее: {alignment}).", author))
+        comments_list.append(Finding(f"{element}.alignment", para_idx, ("по левому краю", alignment), author))
 
-    first_line_indent_cm = get_first_line_indent_cm(para)
-    if abs(first_line_indent_cm - 1.25) > 0.1:
-        comments_list.append((para_idx, f"Ошибка ({element_name}): Отступ первой строки должен быть 1.25 см (текущий: {first_line_indent_cm:.2f} см).", author))
+    first_line_indent = get_first_line_indent_emu(para)
+    if abs(first_line_indent - profile.heading_first_line_indent) > profile.heading_indent_tolerance:
+        comments_list.append(Finding(f"{element}.first_line_indent", para_idx,
+                                     (profile.heading_first_line_indent.cm, first_line_indent.cm), author))
     
     # Проверка формата номера "N.M" (без точки в конце номера)
-    format_correct = re.match(r"^(\d+(\.\d+)+)\s+", para.text.strip()) # Без точки в конце номера (правильно)
-    format_incorrect = re.match(r"^(\d+(\.\d+)+)\.\s+", para.text.strip()) # С точкой в конце номера (неправильно)
+    heading_text = _heading_text_with_number(para, number_label)
+    format_correct = re.match(r"^(\d+(\.\d+)+)\s+", heading_text) # Без точки в конце номера (правильно)
+    format_incorrect = re.match(r"^(\d+(\.\d+)+)\.\s+", heading_text) # С точкой в конце номера (неправильно)
     
     if not format_correct and not format_incorrect:
-        comments_list.append((para_idx, f"Ошибка ({element_name}): Номер подраздела должен быть в формате 'N.M' (например, '1.1 Название'), без точки после номера.", author))
+        comments_list.append(Finding(f"{element}.number_format", para_idx, (), author))
     elif format_incorrect:
         # Если найден формат с точкой после номера, это ошибка
-        comments_list.append((para_idx, f"Ошибка ({element_name}): После номера подраздела (например, '{format_incorrect.group(1)}') не должно быть точки.", author))
+        comments_list.append(Finding(f"{element}.number_trailing_dot", para_idx, (format_incorrect.group(1),), author))
     
     # Точка в конце текстовой части заголовка
-    text_content = para.text.strip()
+    text_content = heading_text
     if format_correct:
         text_content = text_content[len(format_correct.group(0)):].strip()
     elif format_incorrect:
         text_content = text_content[len(format_incorrect.group(0)):].strip()
         
     if text_content.endswith('.'):
-        comments_list.append((para_idx, f"Ошибка ({element_name}): Не должно быть точки в конце текстовой части заголовка.", author))
+        comments_list.append(Finding(f"{element}.title_trailing_period", para_idx, (), author))
     
     # Проверка отступа после заголовка
     if next_para and not is_empty_paragraph(next_para) and not has_spacing_after(para, next_para):
-        comments_list.append((para_idx, f"Ошибка ({element_name}): После подзаголовка должен быть отступ (пустая строка или настройка интервала)", author))
+        comments_list.append(Finding(f"{element}.spacing_after", para_idx, (), author))
 
-def check_figure_caption_format(para, para_idx, comments_list, author):
+def check_figure_caption_format(para, para_idx, comments_list, author, profile=None):
     """Check formatting of figure captions."""
+    profile = get_profile(profile)
     # Check alignment (center)
     if hasattr(para, 'paragraph_format') and para.paragraph_format and hasattr(para.paragraph_format, 'alignment') and para.paragraph_format.alignment:
         if para.paragraph_format.alignment != WD_ALIGN_PARAGRAPH.CENTER:
-            comments_list.append((para_idx, "Ошибка: Подпись к рисунку должна быть выровнена по центру", author))
+            comments_list.append(Finding("figure_caption.alignment", para_idx, (), author))
     
     # Check font properties
     for run in para.runs:
-        if hasattr(run, 'font') and run.font and hasattr(run.font, 'name') and run.font.name and run.font.name != "Times New Roman":
-            comments_list.append((para_idx, f"Ошибка: Неправильный шрифт подписи к рисунку. Ожидается: Times New Roman. Текущий: {run.font.name}", author))
+        if hasattr(run, 'font') and run.font and hasattr(run.font, 'name') and run.font.name and run.font.name != profile.font_name:
+            comments_list.append(Finding("figure_caption.font_name", para_idx, (profile.font_name, run.font.name), author))
             break
         
-        if hasattr(run, 'font') and run.font and hasattr(run.font, 'size') and run.font.size and run.font.size.pt != 14:
-            comments_list.append((para_idx, f"Ошибка: Неправильный размер шрифта подписи к рисунку. Ожидается: 14 пт. Текущий: {run.font.size.pt} пт", author))
+        if hasattr(run, 'font') and run.font and hasattr(run.font, 'size') and run.font.size and run.font.size != profile.font_size:
+            comments_list.append(Finding("figure_caption.font_size", para_idx, (profile.font_size.pt, run.font.size.pt), author))
             break
             
         # Check font color
         if (hasattr(run, 'font') and run.font and hasattr(run.font, 'color') and 
             run.font.color and hasattr(run.font.color, 'rgb') and run.font.color.rgb):
-            if run.font.color.rgb != RGBColor(0, 0, 0):
-                comments_list.append((para_idx, f"Ошибка: Цвет шрифта подписи к рисунку должен быть черным", author))
+            if run.font.color.rgb != profile.font_color:
+                comments_list.append(Finding("figure_caption.font_color", para_idx, (), author))
                 break
                     
     # Check format (Рисунок N – Title)
     pattern = r"^Рисунок\s+\d+\s*[-–]\s*.+$"
     if not re.match(pattern, para.text.strip()):
-        comments_list.append((para_idx, "Ошибка: Неправильный формат подписи к рисунку. Должно быть 'Рисунок N – Название'", author))
+        comments_list.append(Finding("figure_caption.format", para_idx, (), author))
     
     # Check period at end
     if para.text.strip().endswith('.'):
-        comments_list.append((para_idx, "Ошибка: Подпись к рисунку не должна заканчиваться точкой", author))
+        comments_list.append(Finding("figure_caption.trailing_period", para_idx, (), author))
 
-def check_table_title_format(para, para_idx, comments_list, author):
+def check_table_title_format(para, para_idx, comments_list, author, profile=None):
     """Check formatting of table titles."""
+    profile = get_profile(profile)
     # Check alignment (left)
     if hasattr(para, 'paragraph_format') and para.paragraph_format and hasattr(para.paragraph_format, 'alignment') and para.paragraph_format.alignment:
         if para.paragraph_format.alignment != WD_ALIGN_PARAGRAPH.LEFT:
-            comments_list.append((para_idx, "Ошибка: Заголовок таблицы должен быть выровнен по левому краю", author))
+            comments_list.append(Finding("table_title.alignment", para_idx, (), author))
     
     # Check no first line indent
     if hasattr(para, 'paragraph_format') and para.paragraph_format and hasattr(para.paragraph_format, 'first_line_indent') and para.paragraph_format.first_line_indent:
-        if para.paragraph_format.first_line_indent.cm > 0.1:
-            comments_list.append((para_idx, f"Ошибка: У заголовка таблицы не должно быть отступа первой строки. Текущий: {para.paragraph_format.first_line_indent.cm:.2f} см", author))
+        if para.paragraph_format.first_line_indent > profile.caption_no_indent_tolerance:
+            comments_list.append(Finding("table_title.first_line_indent", para_idx, (para.paragraph_format.first_line_indent.cm,), author))
     
     # Check font properties
     for run in para.runs:
-        if hasattr(run, 'font') and run.font and hasattr(run.font, 'name') and run.font.name and run.font.name != "Times New Roman":
-            comments_list.append((para_idx, f"Ошибка: Неправильный шрифт заголовка таблицы. Ожидается: Times New Roman. Текущий: {run.font.name}", author))
+        if hasattr(run, 'font') and run.font and hasattr(run.font, 'name') and run.font.name and run.font.name != profile.font_name:
+            comments_list.append(Finding("table_title.font_name", para_idx, (profile.font_name, run.font.name), author))
             break
                     
-        if hasattr(run, 'font') and run.font and hasattr(run.font, 'size') and run.font.size and run.font.size.pt != 14:
-            comments_list.append((para_idx, f"Ошибка: Неправильный размер шрифта заголовка таблицы. Ожидается: 14 пт. Текущий: {run.font.size.pt} пт", author))
+        if hasattr(run, 'font') and run.font and hasattr(run.font, 'size') and run.font.size and run.font.size != profile.font_size:
+            comments_list.append(Finding("table_title.font_size", para_idx, (profile.font_size.pt, run.font.size.pt), author))
             break
                     
         # Check font color
         if (hasattr(run, 'font') and run.font and hasattr(run.font, 'color') and 
             run.font.color and hasattr(run.font.color, 'rgb') and run.font.color.rgb):
-            if run.font.color.rgb != RGBColor(0, 0, 0):
-                comments_list.append((para_idx, f"Ошибка: Цвет шрифта заголовка таблицы должен быть черным", author))
+            if run.font.color.rgb != profile.font_color:
+                comments_list.append(Finding("table_title.font_color", para_idx, (), author))
             break
     
     # Check format (Таблица N – Title)
     pattern = r"^Таблица\s+\d+\s*[-–]\s*.+$"
     if not re.match(pattern, para.text.strip()):
-        comments_list.append((para_idx, "Ошибка: Неправильный формат заголовка таблицы. Должно быть 'Таблица N – Название'", author))
+        comments_list.append(Finding("table_title.format", para_idx, (), author))
     
     # Check period at end
     if para.text.strip().endswith('.'):
-        comments_list.append((para_idx, "Ошибка: Заголовок таблицы не должен заканчиваться точкой", author))
+        comments_list.append(Finding("table_title.trailing_period", para_idx, (), author))
 
-def check_list_item_format(para, para_idx, comments_list, author, doc_paragraphs=None, current_para_idx=None):
-    """Check formatting of list items."""
+def check_list_item_format(para, para_idx, comments_list, author, doc_paragraphs=None, current_para_idx=None,
+                           trace=None):
+    """Check formatting of list items (trace - ClassificationTrace для отладки определения типа списка)."""
     # Проверка формата элемента списка
     text = para.text.strip()
     
@@ -806,16 +881,16 @@ def check_list_item_format(para, para_idx, comments_list, author, doc_paragraphs
     # Если следующий параграф не элемент списка, то текущий должен заканчиваться точкой (.)
     if is_next_para_list_item:
         if not text.endswith(';'):
-            comments_list.append((current_para_idx, "Ошибка: Элемент списка должен заканчиваться точкой с запятой (;), так как за ним следует другой элемент списка", author))
+            comments_list.append(Finding("list_item.semicolon_expected", current_para_idx, (), author))
         if text.endswith('.'):
-            comments_list.append((current_para_idx, "Ошибка: Элемент списка должен заканчиваться точкой с запятой (;), а не точкой, так как за ним следует другой элемент списка", author))
+            comments_list.append(Finding("list_item.period_instead_of_semicolon", current_para_idx, (), author))
     else:
         # Последний элемент списка должен заканчиваться точкой
         if not text.endswith('.') and not text.endswith('!') and not text.endswith('?'):
             if text.endswith(';'):
-                comments_list.append((current_para_idx, "Ошибка: Последний элемент списка должен заканчиваться точкой (.), а не точкой с запятой", author))
+                comments_list.append(Finding("list_item.last_semicolon", current_para_idx, (), author))
             else:
-                comments_list.append((current_para_idx, "Ошибка: Элемент списка должен заканчиваться точкой (.)", author))
+                comments_list.append(Finding("list_item.period_expected", current_para_idx, (), author))
     
     # Проверяем, является ли элемент встроенным списком Word
     is_native_list = False
@@ -979,53 +1054,46 @@ def check_list_item_format(para, para_idx, comments_list, author, doc_paragraphs
                         list_type = "bulleted"
                         list_type_source = "absolute_default"
             
-            # Вывод отладочной информации
-            print(f"--- Тип элемента списка: {list_type} (источник: {list_type_source})")
-            if context_info:
-                print("--- Контекстная информация:")
-                for info in context_info:
-                    print(f"    * {info}")
+            # Отладочная информация - только при включенной трассировке
+            if trace is not None:
+                trace.note(current_para_idx, "list_type", list_type=list_type, source=list_type_source,
+                           context=context_info)
             
             # Для элементов между номерными списками явно устанавливаем тип на нумерованный
             if is_numbered_by_context and not has_any_marker and style_name == "list paragraph":
                 list_type = "numbered"
                 list_type_source = "context_override"
-                print("    * ПРИМЕНЕНО: Переопределение типа на нумерованный на основе контекста")
+                if trace is not None:
+                    trace.note(current_para_idx, "list_type_override", list_type=list_type, source=list_type_source)
             
             # Если это параграф списка без видимого маркера в тексте
             if style_name == "list paragraph" and not has_any_marker:
                 # Определяем требуемый формат в зависимости от типа списка
                 if list_type == "bulleted":
-                    comments_list.append((current_para_idx, f"Ошибка: Элемент списка не содержит правильного маркера. "
-                                         f"Для маркированного списка требуется маркер '- '", author))
+                    comments_list.append(Finding("list_item.missing_bullet_marker", current_para_idx, (), author))
                 elif list_type == "numbered":
-                    comments_list.append((current_para_idx, f"Ошибка: Элемент списка не содержит правильного маркера. "
-                                         f"Для нумерованного списка требуется формат '1)' или 'а)' и т.п.", author))
+                    comments_list.append(Finding("list_item.missing_number_marker", current_para_idx, (), author))
                 else:
-                    comments_list.append((current_para_idx, f"Ошибка: Элемент списка не содержит правильного маркера. "
-                                         f"Требуется: для маркированного списка - '- ', для нумерованного - '1)' или 'а)' и т.п.", author))
+                    comments_list.append(Finding("list_item.missing_marker", current_para_idx, (), author))
             else:
                 # Для списков с видимыми маркерами проверяем соответствие типу
                 if has_bullet_marker:
                     # Проверяем маркер маркированного списка
                     if not visible_text.startswith('- '):
-                        comments_list.append((current_para_idx, "Ошибка: Неправильный маркер маркированного списка. "
-                                             "Должен быть только маркер '- ' (дефис с пробелом)", author))
+                        comments_list.append(Finding("list_item.bullet_marker", current_para_idx, (), author))
                 elif has_number_marker or has_letter_marker:
                     # Проверяем маркер нумерованного списка
                     if not re.match(r"^\d+\)\s+", visible_text) and not re.match(r"^[а-яА-Я]\)\s+", visible_text):
-                        comments_list.append((current_para_idx, "Ошибка: Неправильный маркер нумерованного списка. "
-                                             "Допустимый формат: '1)' или 'а)' с пробелом после", author))
+                        comments_list.append(Finding("list_item.number_marker", current_para_idx, (), author))
                 # Если нет явного маркера, но это встроенный список - проверяем тип списка по атрибутам
                 elif list_type == "bulleted":
-                    comments_list.append((current_para_idx, "Ошибка: Элемент маркированного списка должен начинаться с '- ' (дефис с пробелом)", author))
+                    comments_list.append(Finding("list_item.bullet_start", current_para_idx, (), author))
                 elif list_type == "numbered":
-                    comments_list.append((current_para_idx, "Ошибка: Элемент нумерованного списка должен начинаться с '1)' или 'а)' с пробелом после", author))
+                    comments_list.append(Finding("list_item.number_start", current_para_idx, (), author))
         except Exception as e:
             # В случае ошибки при анализе маркеров добавим сообщение о возможной проблеме
             if style_name == "list paragraph":
-                comments_list.append((current_para_idx, "Ошибка: Неправильный формат маркера элемента списка. "
-                                     "Требуется: для маркированного списка - '- ', для нумерованного - '1)' или 'а)' и т.п.", author))
+                comments_list.append(Finding("list_item.marker_format", current_para_idx, (), author))
     else:
         # Для ручных списков проверка соответствия правильным форматам маркеров
         valid_markers = [
@@ -1061,12 +1129,12 @@ def check_list_item_format(para, para_idx, comments_list, author, doc_paragraphs
         
         return False
 
-def check_bibliography_item_format(para, para_idx, comments_list, author):
+def check_bibliography_item_format(para, para_idx, comments_list, author, profile=None):
     """
     Проверяет форматирование элемента библиографии (списка литературы).
     
     Элементы библиографии должны:
-    - Иметь отступ первой строки 1.25 см
+    - Иметь отступ первой строки из профиля правил (1.25 см по ГОСТ)
     - Выравнивание по ширине
     - Иметь правильный номер и формат
     
@@ -1075,10 +1143,12 @@ def check_bibliography_item_format(para, para_idx, comments_list, author):
         para_idx: Индекс параграфа
         comments_list: Список для добавления комментариев
         author: Автор комментариев
+        profile: Профиль правил (None - профиль по умолчанию)
     """
     # Пропускаем пустые параграфы
     if not para.text.strip():
         return
+    profile = get_profile(profile)
     
     # Дополнительная проверка, что это действительно элемент библиографии
     text = para.text.strip()
@@ -1111,7 +1181,7 @@ def check_bibliography_item_format(para, para_idx, comments_list, author):
             if (not re.search(r"\[\d+\]", text) and 
                 not "цитирования" in text.lower() and
                 not "библиографическ" in text.lower()):
-                comments_list.append((para_idx, "Ошибка: Элемент библиографии должен начинаться с номера и точки. Пример: '1. Иванов И.И.'", author))
+                comments_list.append(Finding("bibliography_item.number_format", para_idx, (), author))
         else:
             # Проверка содержимого записи на соответствие ГОСТ
             item_text = bib_format_match.group(2)
@@ -1123,16 +1193,19 @@ def check_bibliography_item_format(para, para_idx, comments_list, author):
         check_gost_bibliography_compliance(clean_text, para_idx, comments_list, author)
     
     # Проверка отступа первой строки с учетом стилей
-    effective_indent = get_first_line_indent_cm(para)
+    effective_indent = get_first_line_indent_emu(para)
+    expected_indent = profile.bibliography_first_line_indent
     # Для встроенных списков отступ может быть другим из-за особенностей форматирования Word
     if has_numbering:
         # Для встроенных списков допускаем больший диапазон отступов
-        if effective_indent < 0 or effective_indent > 2.5:
-            comments_list.append((para_idx, f"Ошибка: Неправильный отступ первой строки элемента библиографии. Ожидается: 1.25 см. Текущий: {effective_indent:.2f} см", author))
+        if effective_indent < 0 or effective_indent > profile.bibliography_numbered_max_indent:
+            comments_list.append(Finding("bibliography_item.first_line_indent", para_idx,
+                                         (expected_indent.cm, effective_indent.cm), author))
     else:
         # Для обычных параграфов строгая проверка
-        if abs(effective_indent - 1.25) > 0.1:
-            comments_list.append((para_idx, f"Ошибка: Неправильный отступ первой строки элемента библиографии. Ожидается: 1.25 см. Текущий: {effective_indent:.2f} см", author))
+        if abs(effective_indent - expected_indent) > profile.bibliography_indent_tolerance:
+            comments_list.append(Finding("bibliography_item.first_line_indent", para_idx,
+                                         (expected_indent.cm, effective_indent.cm), author))
     
     # Проверка выравнивания
     if hasattr(para, 'paragraph_format') and para.paragraph_format:
@@ -1146,7 +1219,7 @@ def check_bibliography_item_format(para, para_idx, comments_list, author):
             elif effective_alignment == WD_ALIGN_PARAGRAPH.CENTER:
                 alignment_str = "по центру"
             
-            comments_list.append((para_idx, f"Ошибка: Элемент библиографии должен быть выровнен по ширине, а не {alignment_str}", author))
+            comments_list.append(Finding("bibliography_item.alignment", para_idx, (alignment_str,), author))
 
 def check_gost_bibliography_compliance(text, para_idx, comments_list, author):
     """
@@ -1183,7 +1256,7 @@ def check_gost_bibliography_compliance(text, para_idx, comments_list, author):
     # 1. Год издания (должен быть как минимум один год, обычно в конце)
     year_pattern = r"\b(19|20)\d{2}\b"
     if not re.search(year_pattern, text):
-        comments_list.append((para_idx, "Ошибка: Отсутствует год издания в библиографической записи.", author))
+        comments_list.append(Finding("bibliography_item.no_year", para_idx, (), author))
     
     # 2. Название издания (должно быть выделено, обычно после автора)
     # Сложно проверить без доступа к форматированию отдельных частей текста
@@ -1198,62 +1271,118 @@ def check_gost_bibliography_compliance(text, para_idx, comments_list, author):
     # 4. Проверка окончания
     # Библиографическая запись должна заканчиваться точкой
     if not text.strip().endswith("."):
-        comments_list.append((para_idx, "Ошибка: Библиографическая запись должна заканчиваться точкой.", author))
+        comments_list.append(Finding("bibliography_item.trailing_period", para_idx, (), author))
 
-def check_footnote_format(footnote, footnote_idx, comments_list, author):
+def check_footnote_format(footnote, footnote_idx, comments_list, author, profile=None):
     """Check formatting of footnotes."""
+    profile = get_profile(profile)
     # Check each paragraph in footnote
     try:
         for para_idx, para in enumerate(footnote.paragraphs):
             # Check font properties
             for run in para.runs:
-                if hasattr(run, 'font') and run.font and hasattr(run.font, 'name') and run.font.name and run.font.name != "Times New Roman":
-                    comments_list.append((-1, f"Ошибка: Неправильный шрифт сноски #{footnote_idx+1}. Ожидается: Times New Roman. Текущий: {run.font.name}", author))
+                if hasattr(run, 'font') and run.font and hasattr(run.font, 'name') and run.font.name and run.font.name != profile.font_name:
+                    comments_list.append(Finding("footnote.font_name", -1, (footnote_idx+1, profile.font_name, run.font.name), author))
                     break
                     
                 # Check font size (10 or 12 pt)
                 if hasattr(run, 'font') and run.font and hasattr(run.font, 'size') and run.font.size:
-                    size_pt = run.font.size.pt
-                    if size_pt < 10 or size_pt > 12:
-                        comments_list.append((-1, f"Ошибка: Неправильный размер шрифта сноски #{footnote_idx+1}. Ожидается: 10-12 пт. Текущий: {size_pt} пт", author))
+                    size = run.font.size
+                    if size < profile.footnote_min_size or size > profile.footnote_max_size:
+                        comments_list.append(Finding("footnote.font_size", -1,
+                                                     (footnote_idx+1, profile.footnote_min_size.pt,
+                                                      profile.footnote_max_size.pt, size.pt), author))
                     break
                     
                 # Check font color
                 if (hasattr(run, 'font') and run.font and hasattr(run.font, 'color') and 
                     run.font.color and hasattr(run.font.color, 'rgb') and run.font.color.rgb):
-                    if run.font.color.rgb != RGBColor(0, 0, 0):
-                        comments_list.append((-1, f"Ошибка: Цвет шрифта сноски #{footnote_idx+1} должен быть черным", author))
+                    if run.font.color.rgb != profile.font_color:
+                        comments_list.append(Finding("footnote.font_color", -1, (footnote_idx+1,), author))
                     break
                     
             # Check line spacing (1.0, single)
             if hasattr(para, 'paragraph_format') and para.paragraph_format and hasattr(para.paragraph_format, 'line_spacing') and para.paragraph_format.line_spacing:
-                if abs(para.paragraph_format.line_spacing - 1.0) > 0.01:
-                    comments_list.append((-1, f"Ошибка: Неправильный межстрочный интервал сноски #{footnote_idx+1}. Ожидается: 1.0. Текущий: {para.paragraph_format.line_spacing}", author))
+                if abs(para.paragraph_format.line_spacing - profile.footnote_line_spacing) > profile.footnote_line_spacing_tolerance:
+                    comments_list.append(Finding("footnote.line_spacing", -1,
+                                                 (footnote_idx+1, profile.footnote_line_spacing,
+                                                  para.paragraph_format.line_spacing), author))
     except Exception as e:
         # Silently handle errors in footnote processing
         pass
 
-def check_in_text_citations(doc_paragraphs, start_idx, comments_list, author):
-    """Check in-text citations format."""
-    citation_pattern = r'\[\d+(,\s*с\.\s*\d+)?\]'
-    invalid_citation_pattern = r'\[\s+\d+|\d+\s+\]|\[\d+\s+,|\[\d+,\s+[^с]|\[\d+,\sс\s\.\s*\d+\]|\[\d+,\s*с\s+\.\s*\d+\]'
+# Неправильно оформленные ссылки на источники: лишние пробелы внутри скобок, "с ." и т.п.
+INVALID_CITATION_PATTERN = re.compile(
+    r'\[\s+\d+|\d+\s+\]|\[\d+\s+,|\[\d+,\s+[^с]|\[\d+,\sс\s\.\s*\d+\]|\[\d+,\s*с\s+\.\s*\d+\]')
+
+def check_in_text_citations(doc_paragraphs, start_idx, comments_list, author, text_layer=None):
+    """
+    Check in-text citations format.
+
+    Поиск идет одним проходом по всему тексту документа (TextLayer),
+    найденные ссылки собираются по абзацам - одно замечание на абзац.
+    """
+    if text_layer is None:
+        text_layer = TextLayer(doc_paragraphs)
     
-    for i, para in enumerate(doc_paragraphs):
-        # Skip paragraphs before introduction
-        if i < start_idx:
-            continue
-            
-        # Skip if paragraph is empty
-        if not para.text.strip():
-            continue
-        
-        # Check for invalid citation formats
-        invalid_citations = re.findall(invalid_citation_pattern, para.text)
-        if invalid_citations:
-            comments_list.append((i, f"Ошибка: Неправильный формат цитирования: {', '.join(invalid_citations)}. Должно быть [N] или [N, с. X]", author))
+    # Paragraphs before introduction are skipped: search starts at start_idx
+    invalid_citations = {}
+    for i, match in text_layer.finditer(INVALID_CITATION_PATTERN, max(start_idx, 0)):
+        invalid_citations.setdefault(i, []).append(match.group())
+    
+    for i, citations in invalid_citations.items():
+        comments_list.append(Finding("citation.format", i, (tuple(citations),), author))
+
+def check_cross_references(doc_paragraphs, start_idx, figure_captions, table_titles, bibliography_items,
+                           comments_list, author, text_layer=None):
+    """
+    Проверяет, что на каждый рисунок, таблицу и источник есть ссылка в тексте
+    и что каждая ссылка ведет на существующий рисунок, таблицу или источник.
+
+    Текст просматривается один раз (см. reference_index), после чего подписи,
+    заголовки таблиц и записи списка литературы сверяются с индексом по номеру.
+    Висячие ссылки проверяются, только если в документе найдены элементы
+    этого вида - иначе об их отсутствии уже сообщают другие проверки.
 
-def check_appendix_heading_format(para, para_idx, doc, comments_list, author, next_para=None):
+    Args:
+        doc_paragraphs: список параграфов документа
+        start_idx: индекс абзаца, с которого ищутся ссылки (ВВЕДЕНИЕ)
+        figure_captions: подписи из find_figure_captions
+        table_titles: заголовки из find_table_titles
+        bibliography_items: записи из find_bibliography_entries
+        comments_list: список для добавления комментариев
+        author: имя автора комментариев
+        text_layer: TextLayer абзацев документа (None - собрать заново)
+    """
+    # Подписи и записи списка литературы сами по себе ссылками не считаются
+    skip = [i for i, _, _ in figure_captions] + [i for i, _, _ in table_titles] + [i for i, *_ in bibliography_items]
+    index = build_reference_index(doc_paragraphs, start_idx, skip, text_layer)
+    # Запись без номера в тексте считаем источником с номером по порядку в списке
+    sources = [(i, num if num > 0 else position) for position, (i, num, *_) in enumerate(bibliography_items, start=1)]
+
+    # (вид ссылки, код "нет ссылки", код "ссылка в никуда", номер -> абзац первого элемента с этим номером)
+    targets = (
+        (FIGURE, "figure.unreferenced", "figure.dangling_reference",
+         {num: i for i, num, _ in reversed(figure_captions)}),
+        (TABLE, "table.unreferenced", "table.dangling_reference",
+         {num: i for i, num, _ in reversed(table_titles)}),
+        (SOURCE, "bibliography.unreferenced", "citation.dangling_reference",
+         {num: i for i, num in reversed(sources)}),
+    )
+    for kind, unreferenced_code, dangling_code, elements in targets:
+        # Элементы без ссылок
+        for number, para_idx in sorted(elements.items(), key=lambda item: item[1]):
+            if not index.references(kind, number):
+                comments_list.append(Finding(unreferenced_code, para_idx, (number,), author))
+        # Ссылки на несуществующие элементы: одно замечание на номер, у первого упоминания
+        if elements:
+            for number, positions in index.items(kind):
+                if number not in elements:
+                    comments_list.append(Finding(dangling_code, positions[0], (number, len(positions)), author))
+
+def check_appendix_heading_format(para, para_idx, doc, comments_list, author, next_para=None, profile=None):
     """Check formatting of appendix headings (ПРИЛОЖЕНИЕ А)."""
+    profile = get_profile(profile)
     # Определяем ожидаемый формат
     expected_format = "ПРИЛОЖЕНИЕ " + para.text.strip().upper()[-1]
     if expected_format.endswith('.'):
@@ -1261,12 +1390,12 @@ def check_appendix_heading_format(para, para_idx, doc, comments_list, author, ne
 
     # Check new page
     if not is_paragraph_on_new_page(doc, para_idx):
-        comments_list.append((para_idx, "Ошибка: Приложение должно начинаться с новой страницы", author))
+        comments_list.append(Finding("appendix_heading.new_page", para_idx, (), author))
     
     # Check alignment (center)
     if hasattr(para, 'paragraph_format') and para.paragraph_format and hasattr(para.paragraph_format, 'alignment'):
         if para.paragraph_format.alignment and para.paragraph_format.alignment != WD_ALIGN_PARAGRAPH.CENTER:
-            comments_list.append((para_idx, "Ошибка: Заголовок приложения должен быть выровнен по центру", author))
+            comments_list.append(Finding("appendix_heading.alignment", para_idx, (), author))
     
     # Check case (all uppercase)
     cleaned_text = para.text.strip()
@@ -1274,104 +1403,146 @@ def check_appendix_heading_format(para, para_idx, doc, comments_list, author, ne
         cleaned_text = cleaned_text[:-1]
         
     if cleaned_text.upper() != cleaned_text:
-        comments_list.append((para_idx, f"Ошибка: Заголовок приложения должен быть в верхнем регистре ({expected_format})", author))
+        comments_list.append(Finding("appendix_heading.case", para_idx, (expected_format,), author))
     
     # Check first line indent (0 cm)
     if hasattr(para, 'paragraph_format') and para.paragraph_format and hasattr(para.paragraph_format, 'first_line_indent'):
-        if para.paragraph_format.first_line_indent and para.paragraph_format.first_line_indent.cm > 0.1:
-            comments_list.append((para_idx, "Ошибка: Заголовок приложения не должен иметь отступ первой строки", author))
+        if para.paragraph_format.first_line_indent and para.paragraph_format.first_line_indent > profile.caption_no_indent_tolerance:
+            comments_list.append(Finding("appendix_heading.first_line_indent", para_idx, (), author))
     
     # Check font properties
     for run in para.runs:
         # Check bold
         if hasattr(run, 'bold') and not run.bold:
-            comments_list.append((para_idx, "Ошибка: Заголовок приложения должен быть полужирным", author))
+            comments_list.append(Finding("appendix_heading.bold", para_idx, (), author))
             break
         
         # Check font name
-        if hasattr(run, 'font') and run.font and hasattr(run.font, 'name') and run.font.name and run.font.name != "Times New Roman":
-            comments_list.append((para_idx, f"Ошибка: Неправильный шрифт заголовка приложения. Ожидается: Times New Roman. Текущий: {run.font.name}", author))
+        if hasattr(run, 'font') and run.font and hasattr(run.font, 'name') and run.font.name and run.font.name != profile.font_name:
+            comments_list.append(Finding("appendix_heading.font_name", para_idx, (profile.font_name, run.font.name), author))
             break
         
         # Check font size
-        if hasattr(run, 'font') and run.font and hasattr(run.font, 'size') and run.font.size and run.font.size.pt != 14:
-            comments_list.append((para_idx, f"Ошибка: Неправильный размер шрифта заголовка приложения. Ожидается: 14 пт. Текущий: {run.font.size.pt} пт", author))
+        if hasattr(run, 'font') and run.font and hasattr(run.font, 'size') and run.font.size and run.font.size != profile.font_size:
+            comments_list.append(Finding("appendix_heading.font_size", para_idx, (profile.font_size.pt, run.font.size.pt), author))
             break
     
     # Check period at end
     if para.text.strip().endswith('.'):
-        comments_list.append((para_idx, "Ошибка: Заголовок приложения не должен заканчиваться точкой", author))
+        comments_list.append(Finding("appendix_heading.trailing_period", para_idx, (), author))
     
     # Check for spacing after heading
     if next_para and not is_empty_paragraph(next_para) and not has_spacing_after(para, next_para):
-        comments_list.append((para_idx, "Ошибка: После заголовка приложения должен быть отступ (пустая строка или настройка интервала)", author))
+        comments_list.append(Finding("appendix_heading.spacing_after", para_idx, (), author))
+
+# Ссылка на рисунок в документе:
+#   kind - 'drawing' (DrawingML, w:drawing) или 'vml' (w:pict / w:object с v:imagedata)
+#   placement - 'inline', 'anchor' (обтекание) или None для VML
+#   rel_id - идентификатор связи с файлом изображения (r:embed / r:id), если есть
+#   width, height - размеры в EMU (None, если не указаны)
+ImageRef = namedtuple("ImageRef", ["kind", "placement", "rel_id", "width", "height"])
+
+# Пространства имен для поиска рисунков: у python-docx нет VML и markup compatibility
+_IMAGE_NAMESPACES = {
+    **nsmap,
+    "mc": "http://schemas.openxmlformats.org/markup-compatibility/2006",
+    "v": "urn:schemas-microsoft-com:vml",
+}
+
+# Все рисунки основной части документа за один проход XPath:
+# DrawingML (inline и anchor) и VML-изображения, которые не вложены в w:drawing.
+# Содержимое mc:Fallback пропускаем - это запасная копия того же рисунка из mc:Choice
+_IMAGES_XPATH = etree.XPath(
+    "./w:p//w:drawing[not(ancestor::mc:Fallback)]"
+    " | ./w:p//v:imagedata[not(ancestor::mc:Fallback) and not(ancestor::w:drawing)]",
+    namespaces=_IMAGE_NAMESPACES)
+_DRAWING_EXTENT_XPATH = etree.XPath("./wp:inline/wp:extent | ./wp:anchor/wp:extent", namespaces=_IMAGE_NAMESPACES)
+_DRAWING_BLIP_XPATH = etree.XPath(".//a:blip", namespaces=_IMAGE_NAMESPACES)
+# Размер VML-фигуры задается в атрибуте style: "width:120pt;height:80.5pt"
+# Число вида 72, 1.5 или .5; испорченное значение ("." или "1.2.3") не совпадает - размер пропускается
+_VML_SIZE_PATTERN = re.compile(r"(width|height)\s*:\s*(\d*\.?\d+)(?![\d.])\s*(pt|in|cm|mm|px)?", re.IGNORECASE)
+_VML_UNIT_EMU = {"pt": 12700, "in": 914400, "cm": 360000, "mm": 36000, "px": 9525, None: 12700}
+
+def _drawing_image_ref(drawing):
+    """ImageRef для w:drawing: тип размещения, размеры из wp:extent и ссылка на файл."""
+    placement = None
+    width = height = None
+    extents = _DRAWING_EXTENT_XPATH(drawing)
+    if extents:
+        extent = extents[0]
+        placement = etree.QName(extent.getparent()).localname
+        width = int(extent.get("cx")) if extent.get("cx") else None
+        height = int(extent.get("cy")) if extent.get("cy") else None
+    blips = _DRAWING_BLIP_XPATH(drawing)
+    rel_id = (blips[0].get(qn("r:embed")) or blips[0].get(qn("r:link"))) if blips else None
+    return ImageRef("drawing", placement, rel_id, width, height)
+
+def _vml_image_ref(imagedata):
+    """ImageRef для v:imagedata: размеры берутся из style родительской фигуры."""
+    sizes = {}
+    shape = imagedata.getparent()
+    for name, value, unit in _VML_SIZE_PATTERN.findall(shape.get("style", "") if shape is not None else ""):
+        sizes[name.lower()] = int(float(value) * _VML_UNIT_EMU[unit.lower() or None])
+    return ImageRef("vml", None, imagedata.get(qn("r:id")), sizes.get("width"), sizes.get("height"))
 
 def find_images_in_document(doc):
     """
     Находит все рисунки в документе и их позиции.
     
+    Рисунки ищутся одним скомпилированным XPath по телу документа: w:drawing
+    (и встроенные, и с обтеканием) и VML-изображения (v:imagedata в w:pict
+    или w:object). Файлы изображений при этом не читаются.
+    
     Args:
         doc: документ docx
         
     Returns:
-        list: список кортежей (paragraph_index, image_index)
+        list: список кортежей (paragraph_index, ImageRef) в порядке следования
+        в документе; если в абзаце несколько рисунков, абзац встречается несколько раз
     """
-    images = []
+    body = doc.element.body
+    # Индексы абзацев тела документа - те же, что у doc.paragraphs
+    paragraph_indexes = {p: i for i, p in enumerate(body.iterchildren(qn("w:p")))}
     
-    # Метод 1: Проверяем InlineShapes в каждом параграфе
-    for i, para in enumerate(doc.paragraphs):
-        has_image = False
-        
-        # Проверяем наличие InlineShapes в параграфе
-        for run in para.runs:
-            if hasattr(run, '_r') and run._r is not None:
-                # Проверяем каждый run на наличие inline shape (XML-подход)
-                if run._r.findall('.//wp:inline', namespaces={'wp': 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'}):
-                    has_image = True
-                    break
-                    
-        # Также можем проверить напрямую элементы параграфа (другой подход)
-        if hasattr(para, '_element') and para._element is not None:
-            drawings = para._element.findall('.//w:drawing', 
-                      namespaces={'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'})
-            if drawings:
-                has_image = True
-        
-        if has_image:
-            images.append((i, None))  # None вместо конкретного индекса изображения
-    
-    # Метод 2: Используем document.inline_shapes (если доступно)
-    if hasattr(doc, 'inline_shapes') and doc.inline_shapes:
-        # Для каждого изображения ищем, в каком параграфе оно находится
-        for shape_idx, shape in enumerate(doc.inline_shapes):
-            if shape.type == 3:  # WD_INLINE_SHAPE.PICTURE
-                # К сожалению, нет прямого способа определить, в каком параграфе находится shape
-                # Этот код только для реализации идеи, но реально он не выполнится
-                pass
-    
-    # Добавляем отладочную информацию
-    #print(f"DEBUG: Найдено {len(images)} изображений в документе")
+    images = []
+    for element in _IMAGES_XPATH(body):
+        # Поднимаемся до абзаца верхнего уровня, в котором находится рисунок
+        paragraph = element.getparent()
+        while paragraph.getparent() is not body:
+            paragraph = paragraph.getparent()
+        if etree.QName(element).localname == "drawing":
+            image_ref = _drawing_image_ref(element)
+        else:
+            image_ref = _vml_image_ref(element)
+        images.append((paragraph_indexes[paragraph], image_ref))
     
     return images
 
-def check_image_captions(doc, comments_list, author):
+# Идентификаторы полей SEQ, которыми нумеруют рисунки и таблицы (в нижнем регистре)
+FIGURE_SEQ_IDENTIFIERS = {"рисунок", "рис", "рис.", "figure", "fig"}
+TABLE_SEQ_IDENTIFIERS = {"таблица", "табл", "табл.", "table"}
+
+def find_figure_captions(doc_paragraphs, fields=None):
     """
-    Проверяет соответствие рисунков и их подписей, последовательность нумерации.
+    Находит подписи к рисункам и их номера.
     
     Args:
-        doc: документ docx
-        comments_list: список для добавления комментариев
-        author: имя автора комментариев
+        doc_paragraphs: список параграфов документа
+        fields: FieldIndex из evaluate_fields - если подпись пронумерована полем SEQ,
+            берется вычисленный номер, а не устаревший текст (None - только по тексту)
+        
+    Returns:
+        list: список кортежей (индекс параграфа, номер рисунка, параграф)
     """
-    # Найти все рисунки в документе
-    images = find_images_in_document(doc)
-    
-    # Найти все подписи к рисункам
     captions = []
     
     # Используем функцию is_figure_caption для поиска подписей
-    for i, para in enumerate(doc.paragraphs):
-        if is_figure_caption(para):
+    for i, para in enumerate(doc_paragraphs):
+        seq = fields.caption_field(i, FIGURE_SEQ_IDENTIFIERS) if fields is not None else None
+        # Номер в поле w:fldSimple в текст абзаца не попадает ("Рисунок  – Схема") -
+        # такую подпись узнаем по полю SEQ и слову "Рисунок" в начале
+        if is_figure_caption(para) or (
+                seq is not None and re.match(r"^(?:Рисунок|Рис\.|Fig\.|Figure)", para.text.strip(), re.IGNORECASE)):
             # Извлекаем номер рисунка из подписи
             text = para.text.strip()
             # Пробуем разные шаблоны для извлечения номера
@@ -1394,52 +1565,93 @@ def check_image_captions(doc, comments_list, author):
                 if match3:
                     caption_num = int(match3.group(1))
             
+            # Номер из поля SEQ: в тексте может быть устаревший результат поля
+            # или его нет вовсе (w:fldSimple)
+            if seq is not None:
+                caption_num = seq.value
+            
             if caption_num is not None:
                 captions.append((i, caption_num, para))  # Сохраняем сам параграф для анализа выравнивания
                 #print(f"DEBUG: Найдена подпись к рисунку {caption_num} в параграфе {i}: '{para.text}'")
     
+    return captions
+
+def check_image_captions(doc, comments_list, author, captions=None, fields=None):
+    """
+    Проверяет соответствие рисунков и их подписей, последовательность нумерации.
+    
+    Args:
+        doc: документ docx
+        comments_list: список для добавления комментариев
+        author: имя автора комментариев
+        captions: подписи из find_figure_captions (None - найти заново)
+        fields: FieldIndex из evaluate_fields (None - поля не учитываются)
+    """
+    # Найти все рисунки в документе. Несколько рисунков в одном абзаце - это
+    # один рисунок с одной подписью, поэтому группируем их по абзацам
+    image_paragraphs = {}
+    for para_idx, image_ref in find_images_in_document(doc):
+        image_paragraphs.setdefault(para_idx, []).append(image_ref)
+    images = list(image_paragraphs.items())
+    
+    # Найти все подписи к рисункам
+    if captions is None:
+        captions = find_figure_captions(doc.paragraphs, fields)
+    
     #print(f"DEBUG: Найдено {len(captions)} подписей к рисункам")
     
     # Добавить общий комментарий о количестве рисунков и подписей, независимо от их соответствия
     if len(images) > 0 or len(captions) > 0:
-        comments_list.append((-1, f"Информация: В документе найдено {len(images)} рисунков и {len(captions)} подписей к рисункам.", author))
+        comments_list.append(Finding("figure.summary", -1, (len(images), len(captions)), author))
     
     # Проверить соответствие количества рисунков и подписей
     if len(images) != len(captions) and len(images) > 0:
         diff = abs(len(images) - len(captions))
         if len(images) > len(captions):
-            comments_list.append((-1, f"Ошибка: В документе {len(images)} рисунков, но только {len(captions)} подписей. {diff} рисунок(ов) без подписи.", author))
+            comments_list.append(Finding("figure.missing_captions", -1, (len(images), len(captions), diff), author))
         else:
-            comments_list.append((-1, f"Ошибка: В документе {len(captions)} подписей к рисункам, но только {len(images)} рисунков. {diff} лишних подписей.", author))
+            comments_list.append(Finding("figure.extra_captions", -1, (len(captions), len(images), diff), author))
     
     # Проверить последовательность нумерации
     if captions:
         expected_num = 1
         for i, num, _ in captions:
+            # Поле SEQ с \r или \s (нумерация по главам) начинает нумерацию заново
+            seq = fields.caption_field(i, FIGURE_SEQ_IDENTIFIERS) if fields is not None else None
+            if seq is not None and seq.restarted:
+                expected_num = num
             if num != expected_num:
-                comments_list.append((i, f"Ошибка: Нарушена последовательность нумерации рисунков. Ожидается: Рисунок {expected_num}, фактически: Рисунок {num}", author))
+                comments_list.append(Finding("figure_caption.numbering", i, (expected_num, num), author))
             expected_num += 1
     
-    # Проверить, что после каждого рисунка следует подпись
+    # Проверить, что после каждого рисунка следует подпись.
+    # Рисунки и подписи уже упорядочены по положению в документе, поэтому
+    # сопоставляем их одним проходом двумя указателями
     if images and captions:
+        caption_pos = 0
+        # Индекс подписи -> абзац рисунка, который ее уже занял
+        claimed_captions = {}
         for img_idx, _ in images:
-            caption_found = False
-            nearest_caption_idx = -1
-            nearest_caption_distance = float('inf')
+            # Ближайшая подпись после рисунка - первая подпись с большим индексом
+            while caption_pos < len(captions) and captions[caption_pos][0] <= img_idx:
+                caption_pos += 1
+            if caption_pos == len(captions):
+                comments_list.append(Finding("figure.no_caption", img_idx, (img_idx,), author))
+                continue
             
-            # Ищем ближайшую подпись после рисунка
-            for caption_idx, caption_num, _ in captions:
-                if caption_idx > img_idx and caption_idx - img_idx < nearest_caption_distance:
-                    nearest_caption_distance = caption_idx - img_idx
-                    nearest_caption_idx = caption_idx
-                    if nearest_caption_distance <= 5:  # Увеличиваем максимальное расстояние до 5 параграфов
-                        caption_found = True
-                        break
-                    
-            if not caption_found:
-                comments_list.append((img_idx, f"Ошибка: Рисунок в параграфе {img_idx} не имеет подписи или она расположена слишком далеко", author))
-            elif nearest_caption_distance > 3:
-                comments_list.append((img_idx, f"Предупреждение: Подпись к рисунку в параграфе {img_idx} расположена слишком далеко (через {nearest_caption_distance} параграфов)", author))
+            caption_idx, caption_num, _ = captions[caption_pos]
+            nearest_caption_distance = caption_idx - img_idx
+            if nearest_caption_distance > 5:  # Подпись дальше 5 параграфов уже не считается подписью этого рисунка
+                comments_list.append(Finding("figure.no_caption", img_idx, (img_idx,), author))
+                continue
+            if nearest_caption_distance > 3:
+                comments_list.append(Finding("figure.caption_far", img_idx, (img_idx, nearest_caption_distance), author))
+            
+            if caption_idx in claimed_captions:
+                comments_list.append(Finding("figure_caption.claimed_twice", caption_idx,
+                                             (caption_num, claimed_captions[caption_idx], img_idx), author))
+            else:
+                claimed_captions[caption_idx] = img_idx
     
     # Проверить выравнивание параграфов с рисунками
     for img_idx, _ in images:
@@ -1452,9 +1664,9 @@ def check_image_captions(doc, comments_list, author):
                 elif para.paragraph_format.alignment == WD_ALIGN_PARAGRAPH.JUSTIFY:
                     actual_alignment = "по ширине"
                 
-                comments_list.append((img_idx, f"Ошибка: Рисунок должен быть выровнен по центру, а не {actual_alignment}", author))
+                comments_list.append(Finding("figure.alignment", img_idx, (actual_alignment,), author))
         else:
-            comments_list.append((img_idx, f"Ошибка: Рисунок должен быть выровнен по центру", author))
+            comments_list.append(Finding("figure.alignment_unknown", img_idx, (), author))
     
     # Проверить выравнивание подписей к рисункам
     for i, num, para in captions:
@@ -1467,10 +1679,114 @@ def check_image_captions(doc, comments_list, author):
                 elif para.paragraph_format.alignment == WD_ALIGN_PARAGRAPH.JUSTIFY:
                     actual_alignment = "по ширине"
                 
-                comments_list.append((i, f"Ошибка: Подпись к рисунку {num} должна быть выровнена по центру, а не {actual_alignment}", author))
+                comments_list.append(Finding("figure_caption.numbered_alignment", i, (num, actual_alignment), author))
         else:
             # Если не удалось определить выравнивание, предполагаем выравнивание по левому краю (по умолчанию)
-            comments_list.append((i, f"Ошибка: Подпись к рисунку {num} должна быть выровнена по центру, а не по левому краю", author))
+            comments_list.append(Finding("figure_caption.numbered_alignment", i, (num, "по левому краю"), author))
+
+def check_image_sizes(doc, media, comments_list, author, profile=None):
+    """
+    Проверяет, что рисунки помещаются в область текста и имеют достаточное разрешение.
+    
+    Размер рисунка на странице берется из разметки (wp:extent или style VML),
+    размер в пикселях - из заголовка файла изображения, без декодирования.
+    
+    Args:
+        doc: документ docx
+        media: MediaInspector для архива этого документа
+        comments_list: список для добавления комментариев
+        author: имя автора комментариев
+        profile: профиль правил (None - профиль по умолчанию)
+    """
+    profile = get_profile(profile)
+    images = find_images_in_document(doc)
+    if not images:
+        return
+    
+    # Ширина области текста для каждого раздела. Раздел заканчивается абзацем
+    # с w:sectPr, последний раздел описан в конце тела документа
+    text_widths = [get_text_width(section) for section in doc.sections]
+    section_ends = [i for i, p in enumerate(doc.element.body.iterchildren(qn("w:p")))
+                    if p.pPr is not None and p.pPr.sectPr is not None]
+    
+    for para_idx, image_ref in images:
+        if not image_ref.width:
+            continue
+        text_width = text_widths[min(bisect.bisect_left(section_ends, para_idx), len(text_widths) - 1)]
+        if image_ref.width - text_width > profile.image_overflow_tolerance:
+            comments_list.append(Finding("figure.too_wide", para_idx, (Emu(image_ref.width).cm, text_width.cm), author))
+        
+        # Разрешение при выводе: пиксели по ширине на дюйм ширины рисунка на странице
+        rel = doc.part.rels.get(image_ref.rel_id) if image_ref.rel_id else None
+        if rel is None or rel.is_external:
+            continue
+        info = media.inspect(str(rel.target_part.partname))
+        if info is None or info.format in VECTOR_FORMATS or not info.width:
+            continue
+        effective_dpi = info.width / Emu(image_ref.width).inches
+        if effective_dpi < profile.image_min_dpi:
+            comments_list.append(Finding("figure.low_resolution", para_idx,
+                                         (effective_dpi, profile.image_min_dpi, info.width, info.height), author))
+
+def check_caption_fields(fields, figure_captions, table_titles, comments_list, author):
+    """
+    Проверяет поля нумерации: устаревшие номера в подписях и ссылках (REF)
+    и ссылки на несуществующие закладки.
+    
+    Args:
+        fields: FieldIndex из evaluate_fields
+        figure_captions: подписи из find_figure_captions
+        table_titles: заголовки из find_table_titles
+        comments_list: список для добавления комментариев
+        author: имя автора комментариев
+    """
+    for code, captions, identifiers in (("figure_caption.stale_number", figure_captions, FIGURE_SEQ_IDENTIFIERS),
+                                        ("table_title.stale_number", table_titles, TABLE_SEQ_IDENTIFIERS)):
+        for i, num, _ in captions:
+            seq = fields.caption_field(i, identifiers)
+            if seq is not None and seq.cached is not None and seq.cached != seq.value:
+                comments_list.append(Finding(code, i, (seq.cached, seq.value), author))
+    
+    for i, ref in fields.refs:
+        if not ref.found:
+            comments_list.append(Finding("reference.broken", i, (ref.bookmark, ref.cached.strip()), author))
+        elif ref.target is not None:
+            shown = cached_number(ref.cached)
+            if shown is not None and shown != ref.target.value:
+                comments_list.append(Finding("reference.stale_number", i,
+                                             (ref.cached.strip(), ref.target.identifier, ref.target.value), author))
+
+def _toc_label(item):
+    return f"{item.number} {item.title}" if item.number else item.title
+
+def check_table_of_contents(doc, doc_paragraphs, outline, comments_list, author):
+    """
+    Сверяет содержание с заголовками документа: заголовки, которых нет в
+    содержании, пункты, которым не соответствует ни один заголовок, и пункты,
+    текст или номер которых расходится с заголовком.
+    
+    Args:
+        doc: документ docx
+        doc_paragraphs: список параграфов документа
+        outline: DocumentOutline - дерево заголовков, построенное при обходе абзацев
+        comments_list: список для добавления комментариев
+        author: имя автора комментариев
+    """
+    entries, max_level = extract_toc_entries(doc, doc_paragraphs)
+    if not entries:
+        return
+    # Заголовки ищем только после содержания
+    start = max(entry.para_idx for entry in entries) + 1
+    headings = collect_headings(outline.headings(start, max_level))
+    comparison = compare_toc(entries, headings)
+    
+    for entry, heading in comparison.mismatched:
+        comments_list.append(Finding("toc.mismatched_entry", entry.para_idx,
+                                     (_toc_label(entry), _toc_label(heading)), author))
+    for entry in comparison.extra:
+        comments_list.append(Finding("toc.extra_entry", entry.para_idx, (_toc_label(entry),), author))
+    for heading in comparison.missing:
+        comments_list.append(Finding("toc.missing_entry", heading.para_idx, (_toc_label(heading),), author))
 
 def find_tables_in_document(doc):
     """
@@ -1496,47 +1812,188 @@ def find_tables_in_document(doc):
     #print(f"DEBUG: Найдено {len(tables)} таблиц в документе")
     return tables
 
-def check_table_captions(doc, comments_list, author):
+def _table_paragraph_key(p):
     """
-    Проверяет наличие и форматирование заголовков таблиц
-    
+    Ключ оформления абзаца в ячейке: свойства абзаца и свойства непустых runs.
+    Абзацы с одинаковым ключом получают одинаковый вердикт. None - абзац без текста.
+    """
+    run_properties = tuple(etree.tostring(r.rPr) if r.rPr is not None else b""
+                           for r in p.r_lst if r.text.strip())
+    if not run_properties:
+        return None
+    return (etree.tostring(p.pPr) if p.pPr is not None else b"", run_properties)
+
+def _table_paragraph_verdict(para, profile, run_formats):
+    """
+    Нарушения оформления абзаца в таблице: кортеж (код, ожидается, текущее значение).
+
+    run_formats - кэш эффективных шрифта, размера и цвета run по (стиль абзаца, rPr).
+    """
+    violations = {}
+    style = para.style
+    style_id = style.style_id if style is not None else None
+    for run in para.runs:
+        if not run.text.strip():
+            continue
+        run_key = (style_id, etree.tostring(run._r.rPr) if run._r.rPr is not None else b"")
+        run_format = run_formats.get(run_key)
+        if run_format is None:
+            run_format = run_formats[run_key] = (get_run_font_name(run, style),
+                                                 get_run_font_size_emu(run, style),
+                                                 get_run_font_color_rgb(run, style))
+        font_name, size, color_rgb = run_format
+        if font_name and font_name != profile.font_name:
+            violations[("table_text.font_name", profile.font_name, font_name)] = None
+        if size is not None and abs(size - profile.table_font_size) > profile.font_size_tolerance:
+            violations[("table_text.font_size", profile.table_font_size.pt, size.pt)] = None
+        if color_rgb is not None and color_rgb != profile.font_color:
+            violations[("table_text.font_color", str(profile.font_color), str(color_rgb))] = None
+
+    line_spacing = para.paragraph_format.line_spacing
+    # Точный интервал или "не менее" python-docx возвращает длиной (Length), а не
+    # множителем - с множителем из профиля его не сравнить
+    if (line_spacing and not isinstance(line_spacing, Length)
+            and abs(line_spacing - profile.table_line_spacing) > profile.table_line_spacing_tolerance):
+        violations[("table_text.line_spacing", profile.table_line_spacing, line_spacing)] = None
+    return tuple(violations)
+
+def _table_title_numbers(tables, table_titles):
+    """
+    Номера таблиц по заголовкам: {индекс таблицы: номер}. Заголовок таблицы -
+    ближайший заголовок не дальше двух абзацев перед ней (как в check_table_captions).
+    Ближайший заголовок ищется двоичным поиском по отсортированным индексам заголовков.
+    """
+    titles = sorted((caption_idx, caption_num) for caption_idx, caption_num, _ in table_titles)
+    title_indices = [caption_idx for caption_idx, _ in titles]
+    numbers = {}
+    for table_idx, _ in tables:
+        # последний заголовок строго перед таблицей
+        pos = bisect.bisect_left(title_indices, table_idx) - 1
+        if pos >= 0 and table_idx - title_indices[pos] <= 2:
+            numbers[table_idx] = titles[pos][1]
+    return numbers
+
+def check_table_contents(doc, comments_list, author, profile=None, table_titles=None):
+    """
+    Проверяет оформление текста внутри таблиц: шрифт, размер, цвет и межстрочный интервал
+    (для таблиц в профиле задаются свои размер шрифта и интервал).
+
+    Ячейки перебираются по разметке w:tr/w:tc за один проход (см. table_walker),
+    а вердикт для абзаца запоминается по его оформлению: в больших таблицах
+    ячейки обычно оформлены одинаково, и эффективные свойства шрифта
+    вычисляются один раз на каждый вариант оформления.
+
+    Замечания собираются по таблице: одно на каждое нарушение, с числом ячеек
+    и первой ячейкой, где оно встретилось. Замечание привязывается к абзацу
+    после таблицы, как и остальные замечания о таблицах.
+
     Args:
         doc: документ docx
         comments_list: список для добавления комментариев
         author: имя автора комментариев
+        profile: профиль правил (None - профиль по умолчанию)
+        table_titles: заголовки таблиц из find_table_titles (None - найти заново);
+            в замечаниях таблица называется номером из своего заголовка
     """
-    # Найти все таблицы в документе
+    profile = get_profile(profile)
+    verdicts = {}     # ключ оформления абзаца -> нарушения
+    run_formats = {}  # (стиль, rPr) -> (шрифт, размер, цвет)
     tables = find_tables_in_document(doc)
+    if table_titles is None:
+        table_titles = find_table_titles(doc.paragraphs)
+    table_numbers = _table_title_numbers(tables, table_titles)
+
+    for table_idx, tbl in tables:
+        table_number = table_numbers.get(table_idx, "без заголовка")
+        # нарушение -> [число ячеек, строка, столбец первой ячейки]
+        table_violations = {}
+        for cell in iter_table_cells(tbl):
+            cell_violations = {}
+            for p in iter_cell_paragraphs(cell):
+                key = _table_paragraph_key(p)
+                if key is None:
+                    continue
+                verdict = verdicts.get(key)
+                if verdict is None:
+                    verdict = verdicts[key] = _table_paragraph_verdict(Paragraph(p, doc._body), profile, run_formats)
+                cell_violations.update(dict.fromkeys(verdict))
+            for violation in cell_violations:
+                if violation in table_violations:
+                    table_violations[violation][0] += 1
+                else:
+                    table_violations[violation] = [1, cell.row, cell.column]
+
+        for (code, expected, actual), (cells, row, column) in table_violations.items():
+            comments_list.append(Finding(code, table_idx, (table_number, expected, actual, cells, row + 1, column + 1),
+                                         author))
+
+def find_table_titles(doc_paragraphs, fields=None):
+    """
+    Находит заголовки таблиц ("Таблица N – Название") и их номера.
     
-    # Найти все заголовки таблиц
+    Args:
+        doc_paragraphs: список параграфов документа
+        fields: FieldIndex из evaluate_fields - номер берется из поля SEQ,
+            если заголовок пронумерован полем (None - только по тексту)
+    
+    Returns:
+        list: список кортежей (индекс параграфа, номер таблицы, параграф)
+    """
     captions = []
     caption_pattern = r"^Таблица\s+(\d+)\s*[-–]\s*.+$"
-    for i, para in enumerate(doc.paragraphs):
-        match = re.match(caption_pattern, para.text.strip())
-        if match:
+    for i, para in enumerate(doc_paragraphs):
+        text = para.text.strip()
+        match = re.match(caption_pattern, text)
+        seq = fields.caption_field(i, TABLE_SEQ_IDENTIFIERS) if fields is not None else None
+        if seq is not None and text.startswith("Таблица"):
+            # Номер из поля SEQ, даже если в тексте его нет (w:fldSimple) или он устарел
+            captions.append((i, seq.value, para))
+        elif match:
             caption_num = int(match.group(1))
             captions.append((i, caption_num, para))  # Сохраняем сам параграф для анализа выравнивания
             #print(f"DEBUG: Найден заголовок к таблице {caption_num} в параграфе {i}: '{para.text}'")
+    return captions
+
+def check_table_captions(doc, comments_list, author, captions=None, fields=None):
+    """
+    Проверяет наличие и форматирование заголовков таблиц
+    
+    Args:
+        doc: документ docx
+        comments_list: список для добавления комментариев
+        author: имя автора комментариев
+        captions: заголовки из find_table_titles (None - найти заново)
+        fields: FieldIndex из evaluate_fields (None - поля не учитываются)
+    """
+    # Найти все таблицы в документе
+    tables = find_tables_in_document(doc)
+    
+    # Найти все заголовки таблиц
+    if captions is None:
+        captions = find_table_titles(doc.paragraphs, fields)
     
     #print(f"DEBUG: Найдено {len(captions)} заголовков таблиц")
     
     # Добавить общий комментарий о количестве таблиц и заголовков
     if len(tables) > 0 or len(captions) > 0:
-        comments_list.append((-1, f"Информация: В документе найдено {len(tables)} таблиц и {len(captions)} заголовков к таблицам.", author))
+        comments_list.append(Finding("table.summary", -1, (len(tables), len(captions)), author))
     
     # Проверить соответствие количества таблиц и заголовков
     if len(tables) != len(captions) and len(tables) > 0:
         diff = abs(len(tables) - len(captions))
         if len(tables) > len(captions):
-            comments_list.append((-1, f"Ошибка: В документе {len(tables)} таблиц, но только {len(captions)} заголовков. {diff} таблица(ц) без заголовка.", author))
+            comments_list.append(Finding("table.missing_titles", -1, (len(tables), len(captions), diff), author))
         else:
-            comments_list.append((-1, f"Ошибка: В документе {len(captions)} заголовков таблиц, но только {len(tables)} таблиц. {diff} лишних заголовков.", author))
+            comments_list.append(Finding("table.extra_titles", -1, (len(captions), len(tables), diff), author))
     
     # Проверить последовательность нумерации таблиц
     expected_num = 1
     for i, num, _ in captions:
+        seq = fields.caption_field(i, TABLE_SEQ_IDENTIFIERS) if fields is not None else None
+        if seq is not None and seq.restarted:
+            expected_num = num
         if num != expected_num:
-            comments_list.append((i, f"Ошибка: Нарушена последовательность нумерации таблиц. Ожидается: Таблица {expected_num}, фактически: Таблица {num}", author))
+            comments_list.append(Finding("table_title.numbering", i, (expected_num, num), author))
         expected_num += 1
     
     # Проверить, что перед каждой таблицей есть заголовок
@@ -1556,10 +2013,10 @@ def check_table_captions(doc, comments_list, author):
             if not caption_found:
                 if nearest_caption_idx != -1:
                     # Заголовок существует, но слишком далеко от таблицы
-                    comments_list.append((table_idx, f"Ошибка: Заголовок таблицы должен быть размещен непосредственно перед таблицей (на расстоянии не более 1-2 параграфов)", author))
+                    comments_list.append(Finding("table.title_far", table_idx, (), author))
                 else:
                     # Заголовок отсутствует
-                    comments_list.append((table_idx, f"Ошибка: Таблица не имеет заголовка. Добавьте заголовок в формате 'Таблица N - Название таблицы'", author))
+                    comments_list.append(Finding("table.no_title", table_idx, (), author))
     
     # Проверить, что каждому заголовку соответствует таблица
     for caption_idx, caption_num, _ in captions:
@@ -1572,7 +2029,7 @@ def check_table_captions(doc, comments_list, author):
                 break
                     
         if not table_found:
-            comments_list.append((caption_idx, f"Ошибка: Заголовок таблицы {caption_num} не соответствует ни одной таблице или таблица расположена слишком далеко", author))
+            comments_list.append(Finding("table_title.no_table", caption_idx, (caption_num,), author))
     
     # Проверить выравнивание заголовков таблиц
     for i, num, para in captions:
@@ -1587,29 +2044,25 @@ def check_table_captions(doc, comments_list, author):
                 elif para.paragraph_format.alignment == WD_ALIGN_PARAGRAPH.CENTER:
                     actual_alignment = "по центру"
                 
-                comments_list.append((i, f"Ошибка: Заголовок таблицы {num} должен быть выровнен по левому краю, а не {actual_alignment}", author))
+                comments_list.append(Finding("table_title.numbered_alignment", i, (num, actual_alignment), author))
         else:
             # Если не удалось определить выравнивание, пропускаем сообщение об ошибке,
             # так как по умолчанию выравнивание обычно по левому краю
             pass
 
-def check_bibliography_numbering(doc_paragraphs, bibliography_section_start, comments_list, author):
+def find_bibliography_entries(doc_paragraphs, bibliography_section_start):
     """
-    Проверяет правильность нумерации библиографических записей.
-    
-    Элементы библиографии должны:
-    1. Иметь последовательную нумерацию (1, 2, 3, ...)
-    2. Каждый элемент должен начинаться с номера и точки
-    3. Не должно быть пропусков в нумерации
+    Находит записи списка литературы и их номера.
     
     Args:
         doc_paragraphs: Список параграфов документа
         bibliography_section_start: Индекс начала секции библиографии
-        comments_list: Список для добавления комментариев
-        author: Автор комментариев
+        
+    Returns:
+        list: список кортежей (индекс параграфа, номер или -1, текст, есть ли встроенная нумерация)
     """
     if bibliography_section_start < 0:
-        return
+        return []
     
     # Находим все элементы библиографии
     bibliography_items = []
@@ -1676,8 +2129,33 @@ def check_bibliography_numbering(doc_paragraphs, bibliography_section_start, com
                 # Для параграфов со встроенной нумерацией добавляем с определенным номером
                 bibliography_items.append((i, numbering_num, para.text.strip(), has_numbering))
     
-    # Если не нашли ни одной записи или не нашли раздел библиографии, выходим
-    if not bibliography_items or not found_real_bibliography_section:
+    # Если не нашли раздел библиографии, записей нет
+    if not found_real_bibliography_section:
+        return []
+    return bibliography_items
+
+def check_bibliography_numbering(doc_paragraphs, bibliography_section_start, comments_list, author,
+                                 bibliography_items=None):
+    """
+    Проверяет правильность нумерации библиографических записей.
+    
+    Элементы библиографии должны:
+    1. Иметь последовательную нумерацию (1, 2, 3, ...)
+    2. Каждый элемент должен начинаться с номера и точки
+    3. Не должно быть пропусков в нумерации
+    
+    Args:
+        doc_paragraphs: Список параграфов документа
+        bibliography_section_start: Индекс начала секции библиографии
+        comments_list: Список для добавления комментариев
+        author: Автор комментариев
+        bibliography_items: записи из find_bibliography_entries (None - найти заново)
+    """
+    if bibliography_items is None:
+        bibliography_items = find_bibliography_entries(doc_paragraphs, bibliography_section_start)
+    
+    # Если не нашли ни одной записи, выходим
+    if not bibliography_items:
         return
         
     # Проверяем правильность нумерации
@@ -1687,151 +2165,381 @@ def check_bibliography_numbering(doc_paragraphs, bibliography_section_start, com
         if has_numbering:
             # Для встроенной нумерации проверяем, соответствует ли она ожидаемому номеру
             if num != expected_number:
-                comments_list.append((i, f"Ошибка: Неправильная нумерация библиографической записи. "
-                                  f"Ожидается: {expected_number}. Текущий: {num}", author))
+                comments_list.append(Finding("bibliography.numbering", i, (expected_number, num), author))
             expected_number += 1
             continue
             
         if num == -1:
             # Элемент библиографии без номера - настоящая ошибка
-            comments_list.append((i, "Ошибка: Библиографическая запись должна начинаться с номера и точки "
-                               f"(ожидается: '{expected_number}. ')", author))
+            comments_list.append(Finding("bibliography.missing_number", i, (expected_number,), author))
         elif num != expected_number:
-            comments_list.append((i, f"Ошибка: Неправильная нумерация библиографической записи. "
-                               f"Ожидается: {expected_number}. Текущий: {num}", author))
+            comments_list.append(Finding("bibliography.numbering", i, (expected_number, num), author))
         
         expected_number += 1
 
-def check_document_formatting_final(doc_path, author="Norm Control"):
+def check_footnotes(doc, comments_list, author, profile=None):
     """
-    Основная функция проверки форматирования документа
-    
+    Проверяет форматирование всех сносок документа.
+
+    Args:
+        doc: документ docx
+        comments_list: список для добавления комментариев
+        author: имя автора комментариев
+        profile: профиль правил (None - профиль по умолчанию)
+    """
+    try:
+        if hasattr(doc.part.document, 'footnotes_part') and doc.part.document.footnotes_part:
+            footnotes_part = doc.part.document.footnotes_part
+            if hasattr(footnotes_part, 'footnotes') and footnotes_part.footnotes:
+                for idx, footnote_obj in enumerate(footnotes_part.footnotes.footnotes):
+                    check_footnote_format(footnote_obj, idx, comments_list, author, profile)
+    except Exception as e:
+        # Some documents might not have footnotes or the API might differ
+        comments_list.append(Finding("footnote.unchecked", -1, (str(e),), author))
+
+# Детекторы типа абзаца основной части в порядке приоритета: (тип, детектор).
+# Детектор получает абзац и флаг "находимся в разделе литературы".
+# Приложение проверяется раньше основного заголовка, библиографическая запись -
+# раньше элемента списка (чтобы нумерованные записи не принимались за список)
+BODY_PARAGRAPH_DETECTORS = (
+    ("appendix_heading", lambda para, in_bibliography: is_appendix_heading(para)),
+    ("main_heading", lambda para, in_bibliography: is_main_heading(para)),
+    ("section_heading", lambda para, in_bibliography: is_section_heading(para)),
+    ("subsection_heading", lambda para, in_bibliography: is_subsection_heading(para)),
+    ("figure_caption", lambda para, in_bibliography: is_figure_caption(para)),
+    ("table_title", lambda para, in_bibliography: is_table_title(para)),
+    ("bibliography_item", lambda para, in_bibliography: is_bibliography_item(para, in_bibliography)),
+    # Не проверяем элементы списка в библиографии
+    ("list_item", lambda para, in_bibliography: not in_bibliography and is_list_item(para)),
+)
+
+# Уровень заголовка по типу абзаца - для заголовков без стиля с уровнем структуры
+HEADING_KIND_LEVELS = {
+    "main_heading": 1,
+    "section_heading": 1,
+    "appendix_heading": 1,
+    "subsection_heading": 2,
+}
+APPENDIX_TITLE_PATTERN = re.compile(r"ПРИЛОЖЕНИЕ\s+[А-ЯЁA-Z]{1,2}\b")
+
+def classify_body_paragraph(para, para_idx, in_bibliography_section, trace=None):
+    """
+    Определяет тип абзаца основной части документа (после ВВЕДЕНИЯ).
+
+    Returns:
+        str: код типа ('section_heading', 'list_item', ... или 'main_text')
+    """
+    for kind, detector in BODY_PARAGRAPH_DETECTORS:
+        matched = detector(para, in_bibliography_section)
+        if trace is not None:
+            trace.detector(para_idx, kind, matched)
+        if matched:
+            return kind
+    # Assume it's regular main text
+    return "main_text"
+
+def _check_paragraph(kind, para, para_idx, doc, comments_list, author, next_para, profile, number_label=None):
+    """
+    Применяет к абзацу проверку, зависящую от профиля правил, по его типу.
+    number_label - номер абзаца по списочной нумерации (для заголовков, пронумерованных списком).
+    """
+    if kind == "appendix_heading":
+        check_appendix_heading_format(para, para_idx, doc, comments_list, author, next_para, profile)
+    elif kind == "main_heading":
+        check_main_heading_format(para, para_idx, doc, comments_list, author, next_para, profile)
+    elif kind == "section_heading":
+        check_section_heading_format(para, para_idx, doc, comments_list, author, next_para, profile, number_label)
+    elif kind == "subsection_heading":
+        check_subsection_heading_format(para, para_idx, comments_list, author, next_para, profile, number_label)
+    elif kind == "figure_caption":
+        check_figure_caption_format(para, para_idx, comments_list, author, profile)
+    elif kind == "table_title":
+        check_table_title_format(para, para_idx, comments_list, author, profile)
+    elif kind == "bibliography_item":
+        check_bibliography_item_format(para, para_idx, comments_list, author, profile)
+    else:
+        check_main_text_format(para, para_idx, comments_list, author, profile)
+
+def check_document_formatting_multi(doc_path, profiles=None, author="Norm Control", time_budget=None, trace=None):
+    """
+    Проверяет документ сразу по нескольким профилям правил.
+
+    Документ открывается и разбирается один раз, тип каждого абзаца
+    определяется один раз, после чего абзац проверяется по всем профилям.
+    Правила, которые от профиля не зависят (списки, нумерация рисунков,
+    таблиц и литературы, ссылки в тексте), тоже выполняются один раз, а их
+    замечания попадают в результат каждого профиля.
+
     Args:
         doc_path: путь к файлу docx
+        profiles: список имен профилей или RuleProfile (None - только профиль по умолчанию)
         author: имя автора, который будет указан в комментариях
-        
+        time_budget: лимит времени на всю проверку в секундах (None - без ограничения)
+        trace: ClassificationTrace для записи решений классификатора (None - без трассировки)
+
     Returns:
-        tuple: (список комментариев, путь к документу с комментариями)
+        dict: {имя профиля: CheckResult} в порядке переданных профилей
     """
+    # Профили компилируются один раз и дальше передаются во все проверки.
+    # Результаты хранятся по имени профиля: повторно переданный профиль
+    # проверяется один раз, а разные профили с одним именем - ошибка
+    unique_profiles = {}
+    for profile in (profiles or [None]):
+        profile = get_profile(profile)
+        known = unique_profiles.setdefault(profile.name, profile)
+        if known != profile:
+            raise ValueError(f"Разные профили правил с одним именем: {profile.name}")
+    compiled_profiles = list(unique_profiles.values())
+    deadline = CheckDeadline(time_budget)
+    skipped = []
+    results = {profile.name: [] for profile in compiled_profiles}
     try:
         doc = Document(doc_path)
-        comments_to_add = []
         
         # Check page margins (applies to entire document)
         if doc.sections:
-            check_page_margins(doc.sections[0], comments_to_add, author)
+            for profile in compiled_profiles:
+                check_page_margins(doc.sections[0], results[profile.name], author, profile)
         
         # Process paragraphs
         processing_active = False
         in_bibliography_section = False
         intro_index = -1
         bibliography_index = -1  # Добавляем переменную для индекса начала библиографии
+        # Формулы собираются при обходе и проверяются отдельно от основного текста
+        equations = EquationIndex()
+        # Дерево заголовков строится при обходе, нумерация заголовков проверяется
+        # по мере добавления. Уровень берется из стиля (как для оглавления Word)
+        # или по типу абзаца, номер - из текста или из списочной нумерации
+        outline = DocumentOutline()
+        outline_levels = paragraph_outline_levels(doc)
+        list_labels = list_number_labels(doc)
+        # Типы абзацев по классификатору (для автоисправления)
+        paragraph_kinds = {}
         
         for i, para in enumerate(doc.paragraphs):
+            # Лимит времени исчерпан - дальше абзацы не проверяем
+            if deadline.expired():
+                skipped.append(f"Абзацы {i}-{len(doc.paragraphs) - 1}")
+                break
+            
+            # Формула в отдельном абзаце (текста у нее может и не быть) - нумерация
+            # от профиля не зависит, проверяем один раз
+            if processing_active and is_equation_paragraph(para):
+                if trace is not None:
+                    trace.start(i, para, processing_active=processing_active,
+                                in_bibliography_section=in_bibliography_section)
+                    trace.decide(i, "equation")
+                equation_comments = []
+                equations.add(para, i, equation_comments, author)
+                for comments in results.values():
+                    comments.extend(equation_comments)
+                continue
+            
             # Skip empty paragraphs
             if not para.text.strip():
                 continue
             
-            # Check if we've reached the ВВЕДЕНИЕ section
-            if is_introduction_heading(para):
+            # Get the next paragraph for spacing checks if available
+            next_para = doc.paragraphs[i+1] if i+1 < len(doc.paragraphs) else None
+            
+            if trace is not None:
+                trace.start(i, para, processing_active=processing_active,
+                            in_bibliography_section=in_bibliography_section)
+            
+            # Identify paragraph type once, then check it against every profile
+            is_intro = is_introduction_heading(para)
+            is_bib_heading = not is_intro and is_bibliography_heading(para)
+            if trace is not None:
+                trace.detector(i, "introduction_heading", is_intro)
+                if not is_intro:
+                    trace.detector(i, "bibliography_heading", is_bib_heading)
+            if is_intro:
+                # Check if we've reached the ВВЕДЕНИЕ section
                 processing_active = True
                 intro_index = i
-                next_para = doc.paragraphs[i+1] if i+1 < len(doc.paragraphs) else None
-                check_main_heading_format(para, i, doc, comments_to_add, author, next_para)
-                continue
-            
-            # Check if we've reached the bibliography section
-            if is_bibliography_heading(para):
+                kind = "main_heading"
+            elif is_bib_heading:
+                # Check if we've reached the bibliography section
                 in_bibliography_section = True
                 bibliography_index = i  # Устанавливаем индекс начала библиографии
                 processing_active = True  # Ensure processing is active for bibliography
-                next_para = doc.paragraphs[i+1] if i+1 < len(doc.paragraphs) else None
-                check_main_heading_format(para, i, doc, comments_to_add, author, next_para)
-                continue
-            
-            # Skip formatting checks before ВВЕДЕНИЕ
-            if not processing_active:
+                kind = "main_heading"
+            elif not processing_active:
+                # Skip formatting checks before ВВЕДЕНИЕ
+                if trace is not None:
+                    trace.skip(i, "before_introduction")
                 continue
+            else:
+                kind = classify_body_paragraph(para, i, in_bibliography_section, trace)
+                if kind in ("appendix_heading", "main_heading"):
+                    # Reset bibliography section flag if we've moved to appendices or another main section
+                    in_bibliography_section = False
             
-            # Check if paragraph is in a table
-            if is_in_table(para, doc):
-                continue  # Skip table content checks for now
+            # Детектор приложений срабатывает на любой абзац, начинающийся со слова
+            # "Приложение", - в дерево попадают только заголовки "ПРИЛОЖЕНИЕ А"
+            heading_level = outline_levels.get(i)
+            if kind in HEADING_KIND_LEVELS and (kind != "appendix_heading"
+                                                or APPENDIX_TITLE_PATTERN.match(para.text.strip().upper())):
+                heading_level = heading_level or HEADING_KIND_LEVELS[kind]
+                if kind == "appendix_heading":
+                    # В каждом приложении своя нумерация
+                    outline.restart_numbering()
+            if heading_level:
+                heading_comments = []
+                node = outline.add(i, heading_level, para.text, list_labels.get(i), heading_comments, author)
+                for comments in results.values():
+                    comments.extend(heading_comments)
+                # Заголовок по стилю с номером (часто нарисованным списком) детекторы
+                # не узнают - проверяем его как заголовок раздела или подраздела
+                if kind == "main_text" and node.number is not None:
+                    kind = "section_heading" if len(node.number) == 1 else "subsection_heading"
             
-            # Get the next paragraph for spacing checks if available
-            next_para = doc.paragraphs[i+1] if i+1 < len(doc.paragraphs) else None
+            if trace is not None:
+                trace.decide(i, kind)
+            paragraph_kinds[i] = kind
             
-            # Identify paragraph type and apply appropriate checks
-            # Check appendix first (it has priority over main_heading)
-            if is_appendix_heading(para):
-                # Reset bibliography section flag if we've moved to appendices
-                in_bibliography_section = False
-                check_appendix_heading_format(para, i, doc, comments_to_add, author, next_para)
-            elif is_main_heading(para):
-                # Reset bibliography section flag if we've moved to another main section
-                if in_bibliography_section and not is_bibliography_heading(para):
-                    in_bibliography_section = False
-                check_main_heading_format(para, i, doc, comments_to_add, author, next_para)
-            elif is_section_heading(para):
-                check_section_heading_format(para, i, doc, comments_to_add, author, next_para)
-            elif is_subsection_heading(para):
-                check_subsection_heading_format(para, i, comments_to_add, author, next_para)
-            elif is_figure_caption(para):
-                check_figure_caption_format(para, i, comments_to_add, author)
-            elif is_table_title(para):
-                check_table_title_format(para, i, comments_to_add, author)
-            # Проверяем библиографические записи перед элементами списка, 
-            # чтобы избежать ложных срабатываний для библиографических записей с номерами
-            elif is_bibliography_item(para, in_bibliography_section):
-                check_bibliography_item_format(para, i, comments_to_add, author)
-            elif is_list_item(para) and not in_bibliography_section:  # Не проверяем элементы списка в библиографии
-                check_list_item_format(para, i, comments_to_add, author, doc.paragraphs, i)
+            if kind == "list_item":
+                # Оформление списков от профиля не зависит - проверяем один раз
+                list_comments = []
+                check_list_item_format(para, i, list_comments, author, doc.paragraphs, i, trace)
+                for comments in results.values():
+                    comments.extend(list_comments)
             else:
-                # Assume it's regular main text
-                check_main_text_format(para, i, comments_to_add, author)
-        
-        # Проверка соответствия рисунков и подписей
-        check_image_captions(doc, comments_to_add, author)
-        
-        # Проверка соответствия таблиц и их заголовков
-        check_table_captions(doc, comments_to_add, author)
-        
-        # Check footnotes if available
-        try:
-            if hasattr(doc.part.document, 'footnotes_part') and doc.part.document.footnotes_part:
-                footnotes_part = doc.part.document.footnotes_part
-                if hasattr(footnotes_part, 'footnotes') and footnotes_part.footnotes:
-                    for idx, footnote_obj in enumerate(footnotes_part.footnotes.footnotes):
-                        check_footnote_format(footnote_obj, idx, comments_to_add, author)
-        except Exception as e:
-            # Some documents might not have footnotes or the API might differ
-            comments_to_add.append((-1, f"Предупреждение: Не удалось проверить сноски. {str(e)}", author))
+                for profile in compiled_profiles:
+                    _check_paragraph(kind, para, i, doc, results[profile.name], author, next_para, profile,
+                                     list_labels.get(i))
         
+        # Правила уровня документа: (название, функция, зависит ли от профиля).
+        # Перед каждым правилом проверяем лимит времени, чтобы не начинать
+        # новое правило, когда время уже вышло
+        # Подписи, заголовки таблиц и записи списка литературы находятся один раз
+        # и используются и в своих проверках, и при сверке со ссылками в тексте.
+        # Находятся они при первом обращении из правила: правило, пропущенное по
+        # лимиту времени, их не вычисляет
+        # Номера подписей берутся из полей SEQ, если подписи пронумерованы полями
+        fields = cache(lambda: evaluate_fields(doc))
+        figure_captions = cache(lambda: find_figure_captions(doc.paragraphs, fields()))
+        table_titles = cache(lambda: find_table_titles(doc.paragraphs, fields()))
+        bibliography_items = cache(lambda: find_bibliography_entries(doc.paragraphs, bibliography_index))
+        # Текст документа одной строкой - для правил, которые ищут по тексту
+        text_layer = cache(lambda: TextLayer(doc.paragraphs))
+        document_rules = [
+            # Проверка соответствия рисунков и подписей
+            ("Рисунки и подписи к ним",
+             lambda comments, profile: check_image_captions(doc, comments, author, figure_captions(), fields()),
+             False),
+            # Проверка соответствия таблиц и их заголовков
+            ("Таблицы и их заголовки",
+             lambda comments, profile: check_table_captions(doc, comments, author, table_titles(), fields()),
+             False),
+            # Поля нумерации: устаревшие номера и ссылки на несуществующие закладки
+            ("Поля нумерации",
+             lambda comments, profile: check_caption_fields(fields(), figure_captions(), table_titles(), comments,
+                                                            author),
+             False),
+            # Содержание и заголовки документа
+            ("Содержание",
+             lambda comments, profile: check_table_of_contents(doc, doc.paragraphs, outline, comments, author), False),
+            # Оформление текста внутри таблиц
+            ("Содержимое таблиц",
+             lambda comments, profile: check_table_contents(doc, comments, author, profile, table_titles()), True),
+            # Размеры рисунков относительно области текста и их разрешение
+            ("Размеры рисунков", lambda comments, profile: check_image_sizes(doc, media, comments, author, profile), True),
+            # Check footnotes if available
+            ("Сноски", lambda comments, profile: check_footnotes(doc, comments, author, profile), True),
+        ]
         # Check in-text citations (only for paragraphs after ВВЕДЕНИЕ)
         if intro_index >= 0:
-            check_in_text_citations(doc.paragraphs, intro_index, comments_to_add, author)
-        
+            document_rules.append(("Ссылки на источники в тексте",
+                                   lambda comments, profile: check_in_text_citations(doc.paragraphs, intro_index, comments, author,
+                                                                                     text_layer()),
+                                   False))
+            # Ссылки на рисунки, таблицы и источники
+            document_rules.append(("Ссылки на рисунки, таблицы и источники",
+                                   lambda comments, profile: check_cross_references(
+                                       doc.paragraphs, intro_index, figure_captions(), table_titles(),
+                                       bibliography_items(), comments, author, text_layer()),
+                                   False))
         # Проверка последовательности нумерации элементов библиографии
-        check_bibliography_numbering(doc.paragraphs, bibliography_index, comments_to_add, author)
+        document_rules.append(("Нумерация списка литературы",
+                               lambda comments, profile: check_bibliography_numbering(doc.paragraphs, bibliography_index, comments,
+                                                                                      author, bibliography_items()),
+                               False))
+        # Заголовки файлов рисунков читаются прямо из архива документа
+        media = MediaInspector(doc_path)
+        try:
+            for rule_name, run_rule, depends_on_profile in document_rules:
+                if deadline.expired():
+                    skipped.append(rule_name)
+                    continue
+                if depends_on_profile:
+                    for profile in compiled_profiles:
+                        run_rule(results[profile.name], profile)
+                else:
+                    rule_comments = []
+                    run_rule(rule_comments, None)
+                    for comments in results.values():
+                        comments.extend(rule_comments)
+        finally:
+            media.close()
         
-        return comments_to_add
+        if skipped:
+            for comments in results.values():
+                comments.append(Finding("check.time_budget", -1, (deadline.time_budget, tuple(skipped)), author))
+        
+        # Тексты абзацев с замечаниями - для выгрузки в JSON без повторного разбора
+        paragraphs = doc.paragraphs
+        flagged = {finding.para_idx for comments in results.values() for finding in comments}
+        paragraph_texts = {i: paragraphs[i].text for i in flagged if 0 <= i < len(paragraphs)}
+        # Разделы - заголовки верхнего уровня дерева заголовков (для группировки в отчете)
+        sections = [(node.para_idx, node.label, node.title) for node in outline.roots]
+        return {name: CheckResult(comments, skipped, paragraph_texts, sections, paragraph_kinds)
+                for name, comments in results.items()}
     except Exception as e:
         # Return a meaningful error as a comment
-        return [(0, f"Ошибка при проверке форматирования: {str(e)}", author)]
+        return {name: CheckResult([Finding("check.failed", 0, (str(e),), author)], skipped)
+                for name in results}
+
+def check_document_formatting_final(doc_path, author="Norm Control", time_budget=None, profile=None, trace=None):
+    """
+    Основная функция проверки форматирования документа
+    
+    Args:
+        doc_path: путь к файлу docx
+        author: имя автора, который будет указан в комментариях
+        time_budget: лимит времени на проверку в секундах (None - без ограничения).
+            Когда лимит исчерпан, оставшиеся абзацы и правила не проверяются,
+            а в результат попадает то, что уже найдено.
+        profile: имя профиля правил из rule_profiles.json или RuleProfile
+            (None - профиль по умолчанию)
+        trace: ClassificationTrace для записи решений классификатора (None - без трассировки)
+        
+    Returns:
+        CheckResult: список комментариев; в атрибуте skipped перечислено,
+        что не успели проверить
+    """
+    results = check_document_formatting_multi(doc_path, [profile], author, time_budget, trace)
+    return next(iter(results.values()))
 
 # Keep the original function for backwards compatibility
-def check_document_formatting(doc_path, author="Norm Control"):
+def check_document_formatting(doc_path, author="Norm Control", time_budget=None, profile=None, trace=None):
     """
     Legacy function for checking document formatting.
     
     Args:
         doc_path: path to the document
         author: name of the comment author (default "Norm Control")
+        time_budget: time limit in seconds (None - no limit)
+        profile: rule profile name or RuleProfile (None - default profile)
+        trace: ClassificationTrace to record classifier decisions (None - no tracing)
         
     Returns:
-        list: list of tuples (paragraph_index, comment_text, author)
-        for detected formatting violations
+        CheckResult: list of tuples (paragraph_index, comment_text, author)
+        for detected formatting violations, with the skipped parts
+        in the skipped attribute
     """
-    return check_document_formatting_final(doc_path, author) 
+    return check_document_formatting_final(doc_path, author, time_budget, profile, trace) 
 
 def get_paragraph_type(para, doc, in_bibliography_section=False, previous_para_type=None):
     """
@@ -2013,11 +2721,11 @@ def is_list_item(para):
     
     return False
 
-def check_main_text_format(para, para_idx, comments_list, author):
+def check_main_text_format(para, para_idx, comments_list, author, profile=None):
     """
     Проверяет форматирование основного текста документа.
     
-    Правила для основного текста:
+    Правила для основного текста (значения по умолчанию - профиль ГОСТ):
     1. Шрифт: Times New Roman, 14 пт, черный
     2. Выравнивание: по ширине
     3. Отступ первой строки: 1.25 см
@@ -2028,32 +2736,32 @@ def check_main_text_format(para, para_idx, comments_list, author):
         para_idx: Индекс параграфа в документе
         comments_list: Список для добавления комментариев
         author: Автор комментариев
+        profile: Профиль правил (None - профиль по умолчанию)
     """
     # Пропускаем пустые параграфы
     if not para.text.strip():
         return
+    profile = get_profile(profile)
     
     # Проверяем шрифт, размер и цвет для всех runs
-    check_font_formatting_for_runs(
-        para, para_idx, comments_list, author, "Основной текст", 
-        expected_font="Times New Roman", expected_size_pt=14, 
-        must_be_bold=False, expected_color_rgb=RGBColor(0,0,0)
-    )
+    check_font_formatting_for_runs(para, para_idx, comments_list, author, "main_text", profile)
     
     # Проверяем выравнивание
     alignment = get_effective_alignment(para)
     if alignment != WD_ALIGN_PARAGRAPH.JUSTIFY:
-        comments_list.append((para_idx, f"Ошибка (Основной текст): Выравнивание должно быть по ширине (текущее: {alignment}).", author))
+        comments_list.append(Finding("main_text.alignment", para_idx, ("по ширине", alignment), author))
     
     # Проверяем отступ первой строки
-    first_line_indent_cm = get_first_line_indent_cm(para)
-    if abs(first_line_indent_cm - 1.25) > 0.05:  # Допускаем небольшую погрешность
-        comments_list.append((para_idx, f"Ошибка (Основной текст): Отступ первой строки должен быть 1.25 см (текущий: {first_line_indent_cm:.2f} см).", author))
+    first_line_indent = get_first_line_indent_emu(para)
+    if abs(first_line_indent - profile.text_first_line_indent) > profile.text_indent_tolerance:  # Допускаем небольшую погрешность
+        comments_list.append(Finding("main_text.first_line_indent", para_idx,
+                                     (profile.text_first_line_indent.cm, first_line_indent.cm), author))
     
     # Проверяем междустрочный интервал (если доступно)
     if hasattr(para, 'paragraph_format') and para.paragraph_format:
         if hasattr(para.paragraph_format, 'line_spacing') and para.paragraph_format.line_spacing:
             line_spacing = para.paragraph_format.line_spacing
-            # Для междустрочного интервала 1.5 значение должно быть около 1.5
-            if abs(line_spacing - 1.5) > 0.1:  # Допускаем небольшую погрешность
-                comments_list.append((para_idx, f"Ошибка (Основной текст): Междустрочный интервал должен быть 1.5 (текущий: {line_spacing:.2f}).", author))
\ No newline at end of file
+            # Значение должно быть около интервала из профиля (1.5 по ГОСТ)
+            if abs(line_spacing - profile.text_line_spacing) > profile.text_line_spacing_tolerance:  # Допускаем небольшую погрешность
+                comments_list.append(Finding("main_text.line_spacing", para_idx,
+                                             (profile.text_line_spacing, line_spacing), author))
\ No newline at end of file
@@ -2,7 +2,7 @@
 Утилиты для работы с форматированием документов DOCX.
 """
 
-from docx.shared import Pt, Cm, RGBColor 
+from docx.shared import Pt, Cm, Emu, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 
 def _get_style_attr(style_obj, attr_path):
@@ -54,6 +54,14 @@ def get_first_line_indent_cm(para):
             return 0.0
     return 0.0
 
+def get_first_line_indent_emu(para):
+    """
+    Получает отступ первой строки в EMU (целое число), с учетом стилей.
+    Удобно сравнивать с длинами из профиля правил без пересчета в сантиметры.
+    """
+    indent_obj = get_effective_first_line_indent_obj(para)
+    return indent_obj if indent_obj is not None else Emu(0)
+
 def get_effective_alignment(para):
     """
     Получает "эффективное" (т.е. видимое пользователю в Word самом) выравнивание с учетом наследования стилей.
@@ -94,6 +102,16 @@ def get_run_font_size_pt(run, para_style=None):
             return size.pt
     return None
 
+def get_run_font_size_emu(run, para_style=None):
+    """Получает размер шрифта для run в EMU (Length), учитывая стили."""
+    if run.font.size is not None:
+        return run.font.size
+    if run.style and run.style.font and run.style.font.size is not None:
+        return run.style.font.size
+    if para_style:
+        return _get_style_attr(para_style, 'font.size')
+    return None
+
 def get_run_font_color_rgb(run, para_style=None):
     """Здесь получаю цвет шрифта для проверки черного текста."""
     if run.font.color and run.font.color.rgb is not None:
@@ -0,0 +1,187 @@
+"""
+Чтение размеров и разрешения рисунков по заголовкам файлов.
+
+Чтобы проверить, что рисунок помещается в область текста и не слишком
+низкого разрешения, не нужно декодировать изображение целиком: размер
+в пикселях и DPI записаны в заголовке PNG, JPEG, GIF, EMF и WMF. Заголовок
+читается потоком прямо из zip-архива docx, пока не встретятся нужные поля.
+
+Результаты кэшируются в пределах одного документа (MediaInspector) по имени
+части, поэтому рисунок, на который ссылаются несколько раз (например, логотип
+на каждой странице), разбирается один раз. Общего кэша между документами нет:
+ключ по содержимому требует прочитать рисунок целиком, а это на порядок
+дороже, чем разобрать заголовок, а CRC32 и размер для ключа ненадежны.
+"""
+
+import struct
+import zipfile
+from collections import namedtuple
+from functools import lru_cache
+
+# Сведения о рисунке из заголовка файла:
+#   format - 'png', 'jpeg', 'gif', 'emf' или 'wmf'
+#   width, height - размер в пикселях (для WMF - в логических единицах)
+#   dpi_x, dpi_y - разрешение из заголовка (None, если не указано)
+ImageInfo = namedtuple("ImageInfo", ["format", "width", "height", "dpi_x", "dpi_y"])
+
+# Векторные форматы: разрешение для них не проверяется
+VECTOR_FORMATS = {"emf", "wmf"}
+
+# Сколько заголовков держать в кэше одного документа (LRU)
+HEADER_CACHE_SIZE = 1024
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_WMF_PLACEABLE_KEY = 0x9AC6CDD7
+_EMF_SIGNATURE = 0x464D4520  # " EMF"
+# Маркеры JPEG, в которых записан размер кадра (SOF), кроме DHT/JPG/DAC
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class _HeaderReader:
+    """Чтение из потока с уже прочитанным началом файла (по нему определяется формат)."""
+
+    def __init__(self, head, stream):
+        self._head = head
+        self._stream = stream
+
+    def read(self, size):
+        if self._head:
+            data, self._head = self._head[:size], self._head[size:]
+            if len(data) < size:
+                data += self._stream.read(size - len(data))
+            return data
+        return self._stream.read(size)
+
+    def read_exact(self, size):
+        data = self.read(size)
+        if len(data) < size:
+            raise ValueError("Заголовок изображения обрезан")
+        return data
+
+
+def _read_png(reader):
+    reader.read_exact(8)
+    width = height = dpi_x = dpi_y = None
+    while True:
+        length, chunk_type = struct.unpack(">I4s", reader.read_exact(8))
+        if chunk_type in (b"IDAT", b"IEND"):
+            break
+        data = reader.read_exact(length)
+        reader.read_exact(4)  # CRC блока
+        if chunk_type == b"IHDR":
+            width, height = struct.unpack(">II", data[:8])
+        elif chunk_type == b"pHYs":
+            ppu_x, ppu_y, unit = struct.unpack(">IIB", data[:9])
+            if unit == 1:  # точки на метр
+                dpi_x, dpi_y = ppu_x * 0.0254, ppu_y * 0.0254
+    return ImageInfo("png", width, height, dpi_x, dpi_y)
+
+def _read_jpeg(reader):
+    reader.read_exact(2)  # SOI
+    dpi_x = dpi_y = None
+    while True:
+        byte = reader.read_exact(1)
+        if byte != b"\xff":
+            continue
+        marker = reader.read_exact(1)[0]
+        while marker == 0xFF:  # байты-заполнители
+            marker = reader.read_exact(1)[0]
+        if marker == 0xD8 or marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            continue  # маркеры без данных
+        if marker == 0xD9:
+            return None  # конец файла, а кадра не было
+        length = struct.unpack(">H", reader.read_exact(2))[0]
+        data = reader.read_exact(length - 2)
+        if marker == 0xE0 and data[:5] == b"JFIF\x00" and len(data) >= 12:
+            units, density_x, density_y = struct.unpack(">BHH", data[7:12])
+            if units == 1:  # точки на дюйм
+                dpi_x, dpi_y = float(density_x), float(density_y)
+            elif units == 2:  # точки на сантиметр
+                dpi_x, dpi_y = density_x * 2.54, density_y * 2.54
+        elif marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[1:5])
+            return ImageInfo("jpeg", width, height, dpi_x, dpi_y)
+
+def _read_gif(reader):
+    width, height = struct.unpack("<HH", reader.read_exact(10)[6:10])
+    return ImageInfo("gif", width, height, None, None)
+
+def _read_emf(reader):
+    header = reader.read_exact(88)
+    left, top, right, bottom = struct.unpack("<4i", header[8:24])
+    device_x, device_y, millimeters_x, millimeters_y = struct.unpack("<4i", header[72:88])
+    dpi_x = device_x / millimeters_x * 25.4 if millimeters_x else None
+    dpi_y = device_y / millimeters_y * 25.4 if millimeters_y else None
+    return ImageInfo("emf", right - left + 1, bottom - top + 1, dpi_x, dpi_y)
+
+def _read_wmf(reader):
+    header = reader.read_exact(16)
+    left, top, right, bottom, units_per_inch = struct.unpack("<4hH", header[6:16])
+    dpi = float(units_per_inch) if units_per_inch else None
+    return ImageInfo("wmf", abs(right - left), abs(bottom - top), dpi, dpi)
+
+def read_image_header(stream):
+    """
+    Определяет формат рисунка и читает его размер и разрешение из заголовка.
+
+    Args:
+        stream: файловый объект, открытый на начало изображения
+
+    Returns:
+        ImageInfo или None, если формат не поддерживается или заголовок поврежден
+    """
+    head = stream.read(44)
+    reader = _HeaderReader(head, stream)
+    try:
+        if head.startswith(_PNG_SIGNATURE):
+            return _read_png(reader)
+        if head.startswith(b"\xff\xd8"):
+            return _read_jpeg(reader)
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return _read_gif(reader)
+        if len(head) >= 44 and struct.unpack("<I", head[:4])[0] == 1 \
+                and struct.unpack("<I", head[40:44])[0] == _EMF_SIGNATURE:
+            return _read_emf(reader)
+        if len(head) >= 4 and struct.unpack("<I", head[:4])[0] == _WMF_PLACEABLE_KEY:
+            return _read_wmf(reader)
+    except (ValueError, struct.error):
+        pass
+    return None
+
+
+class MediaInspector:
+    """
+    Сведения о рисунках из архива docx без распаковки самих изображений.
+
+    Пример:
+        with MediaInspector("document.docx") as media:
+            info = media.inspect("/word/media/image1.png")
+    """
+
+    def __init__(self, docx_path, cache_size=HEADER_CACHE_SIZE):
+        self._zip = zipfile.ZipFile(docx_path)
+        # LRU-кэш по имени части - у каждого документа свой
+        self.inspect = lru_cache(maxsize=cache_size)(self._inspect)
+
+    def _inspect(self, partname):
+        """
+        Возвращает ImageInfo для части пакета (например, '/word/media/image1.png').
+
+        Returns:
+            ImageInfo или None, если часть не найдена или формат не поддерживается
+        """
+        try:
+            zip_info = self._zip.getinfo(partname.lstrip("/"))
+        except KeyError:
+            return None
+        with self._zip.open(zip_info) as stream:
+            return read_image_header(stream)
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
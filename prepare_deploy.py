@@ -17,6 +17,21 @@ FILES_TO_INCLUDE = [
     'formatting_checker.py',
     'formatting_utils.py',
     'comment_utils.py',
+    'findings.py',
+    'rule_profiles.py',
+    'rule_profiles.json',
+    'classification_trace.py',
+    'image_inspector.py',
+    'table_walker.py',
+    'reference_index.py',
+    'text_layer.py',
+    'field_engine.py',
+    'equation_index.py',
+    'document_outline.py',
+    'table_of_contents.py',
+    'docx_writer.py',
+    'findings_export.py',
+    'findings_report.py',
     'requirements.txt',
     'README.md',
     'templates',
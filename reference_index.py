@@ -0,0 +1,113 @@
+"""
+Индекс ссылок в тексте на рисунки, таблицы и источники.
+
+Чтобы проверить, что на каждый рисунок, таблицу и источник есть ссылка и что
+каждая ссылка ведет на существующий элемент, текст просматривается один раз:
+одно регулярное выражение находит во всем тексте (см. text_layer) все ссылки
+("рис. 2", "в таблице 3", "[4, 5]"), и номера складываются в индекс номер -> абзацы. Дальше подписи,
+заголовки таблиц и записи списка литературы сверяются с индексом по номеру.
+"""
+
+import re
+
+from text_layer import TextLayer
+
+# Виды ссылок
+FIGURE = "figure"
+TABLE = "table"
+SOURCE = "source"
+
+# Диапазоны длиннее этого ("[1-300]") считаем опечаткой и берем только первый номер
+MAX_RANGE_LENGTH = 50
+
+# Список номеров: "2", "2-4", "2, 3 и 5"
+_NUMBERS = r"\d+(?:\s*(?:[-–—]|,|\bи\b)\s*\d+)*"
+
+# Ссылка на источник: "[1]", "[3-5]", "[1, 4]", "[1, с. 15]". Скобка сразу после
+# латинского идентификатора или другой скобки ("str[0]", "matrix[1][3]") - индекс
+# в коде, а не ссылка; после кириллицы ссылку ставят без пробела ("ГОСТ[4]")
+_SOURCE_REFERENCE = (r"(?<![A-Za-z0-9_\]])\[\s*(?P<source>\d+(?:\s*[-–—,;]\s*\d+)*"
+                     r"(?:,\s*с\.\s*\d+(?:\s*[-–—]\s*\d+)?)?)\s*\]")
+
+_REFERENCE_PATTERN = re.compile(
+    rf"(?:\bрис\.|\bрисун[а-яё]*)\s*(?P<figure>{_NUMBERS})"
+    rf"|(?:\bтабл\.|\bтаблиц[а-яё]*)\s*(?P<table>{_NUMBERS})"
+    rf"|{_SOURCE_REFERENCE}",
+    re.IGNORECASE)
+# Вызов в коде перед скобкой: "f(x)[2]" (но не "(Россия)[5]")
+_CALL_BEFORE = re.compile(r"[A-Za-z0-9_]\([^()]*\)$")
+_NUMBER_RANGE = re.compile(r"(\d+)(?:\s*[-–—]\s*(\d+))?")
+_NUMBER_SEPARATOR = re.compile(r"[,;]|\bи\b")
+
+
+def expand_numbers(text):
+    """Номера из списка вида '1, 3-5 и 7'. Части без номера ('с. 12') пропускаются."""
+    numbers = []
+    for part in _NUMBER_SEPARATOR.split(text):
+        match = _NUMBER_RANGE.fullmatch(part.strip())
+        if not match:
+            continue
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else start
+        if start <= end <= start + MAX_RANGE_LENGTH:
+            numbers.extend(range(start, end + 1))
+        else:
+            numbers.append(start)
+    return numbers
+
+
+def _is_call_subscript(text, bracket):
+    """Перед "[" стоит вызов функции ("f(x)[2]") - это индекс в коде."""
+    if not bracket or text[bracket - 1] != ")":
+        return False
+    # Ищем только в пределах строки: в общем тексте абзацы разделены переводом строки
+    line_start = text.rfind("\n", 0, bracket) + 1
+    return _CALL_BEFORE.search(text, line_start, bracket) is not None
+
+
+class ReferenceIndex:
+    """Номера, на которые есть ссылки в тексте, и абзацы с этими ссылками."""
+
+    def __init__(self):
+        # вид ссылки -> {номер: [индексы абзацев]}
+        self.positions = {FIGURE: {}, TABLE: {}, SOURCE: {}}
+
+    def add(self, kind, number, para_idx):
+        self.positions[kind].setdefault(number, []).append(para_idx)
+
+    def references(self, kind, number):
+        """Абзацы, в которых есть ссылка на элемент (пустой список - ссылок нет)."""
+        return self.positions[kind].get(number, [])
+
+    def items(self, kind):
+        """Пары (номер, абзацы) для вида ссылок в порядке первого упоминания."""
+        return self.positions[kind].items()
+
+
+def build_reference_index(doc_paragraphs, start_idx=0, skip=(), text_layer=None):
+    """
+    Строит индекс ссылок одним поиском по всему тексту документа.
+
+    Args:
+        doc_paragraphs: список параграфов документа
+        start_idx: с какого абзаца начинать (например, с ВВЕДЕНИЯ)
+        skip: индексы абзацев, которые ссылками не считаются (сами подписи,
+            заголовки таблиц, записи списка литературы)
+        text_layer: TextLayer этих абзацев (None - собрать заново)
+
+    Returns:
+        ReferenceIndex
+    """
+    if text_layer is None:
+        text_layer = TextLayer(doc_paragraphs)
+    index = ReferenceIndex()
+    skip = set(skip)
+    for i, match in text_layer.finditer(_REFERENCE_PATTERN, max(start_idx, 0)):
+        if i in skip:
+            continue
+        kind = match.lastgroup
+        if kind == SOURCE and _is_call_subscript(text_layer.text, match.start()):
+            continue
+        for number in expand_numbers(match.group(kind)):
+            index.add(kind, number, i)
+    return index
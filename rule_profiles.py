@@ -0,0 +1,193 @@
+"""
+Профили правил нормоконтроля.
+
+Ожидаемые значения (шрифт, поля, отступы, интервалы) разных вузов описываются
+в rule_profiles.json. Каждый профиль один раз компилируется в неизменяемый
+RuleProfile, где все длины уже переведены в EMU (целые числа, как Length
+в python-docx), поэтому в проверках абзацев остаются только сравнения целых
+чисел без пересчета в см/мм/пт.
+
+Скомпилированные профили кэшируются и перечитываются, только если файл
+конфигурации изменился.
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+
+from docx.shared import Pt, Mm, Cm, RGBColor
+
+PROFILES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rule_profiles.json")
+
+logger = logging.getLogger(__name__)
+
+# Порядок полей страницы в замечаниях
+MARGIN_SIDES = (("left", "левое"), ("right", "правое"), ("top", "верхнее"), ("bottom", "нижнее"))
+
+
+@dataclass(frozen=True)
+class RuleProfile:
+    """
+    Скомпилированный профиль правил.
+
+    Все длины - EMU (docx.shared.Length), их можно напрямую сравнивать
+    с длинами из документа, а для текста замечаний взять .pt/.cm/.mm.
+    """
+    name: str
+    title: str
+    # Шрифт
+    font_name: str
+    font_size: int
+    font_size_tolerance: int
+    font_color: RGBColor
+    # Поля страницы: ((название поля, длина), ...)
+    page_margins: tuple
+    margin_tolerance: int
+    # Основной текст
+    text_first_line_indent: int
+    text_indent_tolerance: int
+    text_line_spacing: float
+    text_line_spacing_tolerance: float
+    # Заголовки
+    heading_first_line_indent: int
+    heading_indent_tolerance: int
+    heading_no_indent_tolerance: int
+    # Подписи к рисункам и заголовки таблиц
+    caption_no_indent_tolerance: int
+    # Список литературы
+    bibliography_first_line_indent: int
+    bibliography_indent_tolerance: int
+    bibliography_numbered_max_indent: int
+    # Сноски
+    footnote_min_size: int
+    footnote_max_size: int
+    footnote_line_spacing: float
+    footnote_line_spacing_tolerance: float
+    # Текст в таблицах
+    table_font_size: int
+    table_line_spacing: float
+    table_line_spacing_tolerance: float
+    # Рисунки: минимальное разрешение при выводе и допуск выхода за область текста
+    image_min_dpi: float
+    image_overflow_tolerance: int
+
+
+def _resolve_profile_config(name, raw_profiles, seen=()):
+    """Собирает настройки профиля с учетом 'extends' (секции базового профиля перекрываются)."""
+    if name not in raw_profiles:
+        raise ValueError(f"Неизвестный профиль правил: {name}")
+    if name in seen:
+        raise ValueError(f"Циклическое наследование профилей: {' -> '.join(seen + (name,))}")
+
+    raw = raw_profiles[name]
+    config = {}
+    if raw.get("extends"):
+        config = _resolve_profile_config(raw["extends"], raw_profiles, seen + (name,))
+    for key, value in raw.items():
+        if key == "extends":
+            continue
+        if isinstance(value, dict):
+            config[key] = {**config.get(key, {}), **value}
+        else:
+            config[key] = value
+    return config
+
+def compile_profile(name, config):
+    """Переводит настройки профиля из конфигурации в RuleProfile с длинами в EMU."""
+    font = config["font"]
+    margins = config["page_margins_mm"]
+    main_text = config["main_text"]
+    headings = config["headings"]
+    bibliography = config["bibliography"]
+    footnotes = config["footnotes"]
+    tables = config.get("tables", {})
+    images = config.get("images", {})
+    return RuleProfile(
+        name=name,
+        title=config.get("title", name),
+        font_name=font["name"],
+        font_size=Pt(font["size_pt"]),
+        font_size_tolerance=Pt(font.get("size_tolerance_pt", 0.1)),
+        font_color=RGBColor.from_string(font.get("color", "000000")),
+        page_margins=tuple((label, Mm(margins[side])) for side, label in MARGIN_SIDES),
+        margin_tolerance=Mm(margins.get("tolerance", 1)),
+        text_first_line_indent=Cm(main_text["first_line_indent_cm"]),
+        text_indent_tolerance=Cm(main_text.get("indent_tolerance_cm", 0.05)),
+        text_line_spacing=float(main_text["line_spacing"]),
+        text_line_spacing_tolerance=float(main_text.get("line_spacing_tolerance", 0.1)),
+        heading_first_line_indent=Cm(headings["first_line_indent_cm"]),
+        heading_indent_tolerance=Cm(headings.get("indent_tolerance_cm", 0.1)),
+        heading_no_indent_tolerance=Cm(headings.get("no_indent_tolerance_cm", 0.01)),
+        caption_no_indent_tolerance=Cm(config.get("captions", {}).get("no_indent_tolerance_cm", 0.1)),
+        bibliography_first_line_indent=Cm(bibliography["first_line_indent_cm"]),
+        bibliography_indent_tolerance=Cm(bibliography.get("indent_tolerance_cm", 0.1)),
+        bibliography_numbered_max_indent=Cm(bibliography.get("numbered_max_indent_cm", 2.5)),
+        footnote_min_size=Pt(footnotes["min_size_pt"]),
+        footnote_max_size=Pt(footnotes["max_size_pt"]),
+        footnote_line_spacing=float(footnotes["line_spacing"]),
+        footnote_line_spacing_tolerance=float(footnotes.get("line_spacing_tolerance", 0.01)),
+        table_font_size=Pt(tables.get("font_size_pt", 12)),
+        table_line_spacing=float(tables.get("line_spacing", 1.0)),
+        table_line_spacing_tolerance=float(tables.get("line_spacing_tolerance", 0.01)),
+        image_min_dpi=float(images.get("min_dpi", 150)),
+        image_overflow_tolerance=Mm(images.get("overflow_tolerance_mm", 1)),
+    )
+
+def compile_profiles(config):
+    """Компилирует все профили из разобранного JSON. Возвращает (профили, имя профиля по умолчанию)."""
+    raw_profiles = config["profiles"]
+    profiles = {name: compile_profile(name, _resolve_profile_config(name, raw_profiles))
+                for name in raw_profiles}
+    default_name = config.get("default_profile") or next(iter(profiles))
+    if default_name not in profiles:
+        raise ValueError(f"Профиль по умолчанию '{default_name}' не описан в конфигурации")
+    return profiles, default_name
+
+
+# path -> (mtime_ns, профили, имя профиля по умолчанию)
+_profiles_cache = {}
+
+def load_profiles(path=PROFILES_PATH):
+    """
+    Возвращает скомпилированные профили из файла конфигурации.
+
+    Файл перечитывается только при изменении времени модификации. Если
+    файл не удалось прочитать (его нет или он как раз заменяется) или
+    разобрать, продолжаем работать с прежними профилями, а при первой
+    загрузке ошибка пробрасывается.
+
+    Returns:
+        tuple: (словарь {имя: RuleProfile}, имя профиля по умолчанию)
+    """
+    cached = _profiles_cache.get(path)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+        with open(path, encoding="utf-8") as f:
+            profiles, default_name = compile_profiles(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        if cached is None:
+            raise
+        logger.warning("Не удалось перечитать профили правил из %s: %s. Используются прежние профили.", path, e)
+        return cached[1], cached[2]
+
+    _profiles_cache[path] = (mtime, profiles, default_name)
+    return profiles, default_name
+
+def get_profile(profile=None, path=PROFILES_PATH):
+    """
+    Возвращает профиль правил.
+
+    Args:
+        profile: имя профиля, готовый RuleProfile или None (профиль по умолчанию)
+        path: путь к файлу конфигурации профилей
+    """
+    if isinstance(profile, RuleProfile):
+        return profile
+    profiles, default_name = load_profiles(path)
+    name = profile or default_name
+    if name not in profiles:
+        raise ValueError(f"Неизвестный профиль правил: {name}")
+    return profiles[name]
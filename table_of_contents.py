@@ -0,0 +1,235 @@
+"""
+Содержание (оглавление) и его сверка с заголовками документа.
+
+Пункты содержания берутся из результата поля TOC (в том числе внутри
+w:sdt, куда Word кладет автоматическое оглавление) или из абзацев со стилями
+"toc N"/"оглавление N". Если ни того, ни другого нет, содержание считается
+набранным вручную: это абзацы после заголовка СОДЕРЖАНИЕ, заканчивающиеся
+табуляцией или отточием с номером страницы.
+
+Сверка идет через словарь: пункты и заголовки приводятся к ключу
+(без номера, номера страницы, регистра и лишних пробелов), и каждый пункт
+ищет свой заголовок по ключу. Оставшиеся пункты сверяются с оставшимися
+заголовками по номеру раздела - так находятся пункты, текст которых
+разошелся с заголовком.
+"""
+
+import re
+from collections import namedtuple
+
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+
+# Пункт содержания: индекс абзаца, уровень, номер раздела ('1.2', None - без номера),
+# текст без номера и страницы, номер страницы (None - не указан) и ключ для сверки
+TocEntry = namedtuple("TocEntry", ["para_idx", "level", "number", "title", "page", "key"])
+# Заголовок документа в том же виде
+Heading = namedtuple("Heading", ["para_idx", "level", "number", "title", "key"])
+# Результат сверки: matched - пары (пункт, заголовок), mismatched - пары, у которых
+# расходится текст или номер, extra - пункты без заголовка, missing - заголовки без пункта
+TocComparison = namedtuple("TocComparison", ["matched", "mismatched", "extra", "missing"])
+
+# Глубина оглавления по умолчанию (как у Word: \o "1-3")
+DEFAULT_TOC_LEVELS = 3
+
+TOC_HEADINGS = ("содержание", "оглавление")
+
+_TOC_INSTRUCTION = re.compile(r"^\s*TOC\b", re.IGNORECASE)
+_TOC_LEVELS = re.compile(r'\\o\s*"?\s*\d+\s*-\s*(\d+)')
+_TOC_STYLE_NAME = re.compile(r"^(?:toc|оглавление)\s*(\d)$", re.IGNORECASE)
+# Номер страницы в конце пункта: после табуляции или отточия (номера может и не быть)
+_PAGE_TAIL = re.compile(r"(?:\t|\s*(?:\.{3,}|…+|_{3,})[\s.…_]*)\s*(\d*)\s*$")
+_LEADING_NUMBER = re.compile(r"^(\d+(?:\.\d+)*)\.?\s+")
+_APPENDIX = re.compile(r"^приложение\s+([а-яa-z])\b")
+
+_P, _FLD_CHAR, _INSTR_TEXT, _SDT = qn("w:p"), qn("w:fldChar"), qn("w:instrText"), qn("w:sdt")
+
+
+def normalize_title(text):
+    """
+    Ключ для сверки пункта содержания с заголовком: без номера раздела,
+    в нижнем регистре, ё -> е, без лишних пробелов и точки в конце.
+    У приложений ключ - только "приложение X": название в содержании часто опускают.
+    """
+    text = " ".join(text.replace("\xa0", " ").split()).lower().replace("ё", "е")
+    text = _LEADING_NUMBER.sub("", text).strip(" .:;")
+    match = _APPENDIX.match(text)
+    return f"приложение {match.group(1)}" if match else text
+
+def split_entry_text(text):
+    """Разбирает текст пункта: (номер раздела, текст, номер страницы)."""
+    page = None
+    match = _PAGE_TAIL.search(text)
+    if match:
+        page = int(match.group(1)) if match.group(1) else None
+        text = text[:match.start()]
+    text = " ".join(text.replace("\xa0", " ").split())
+    number = None
+    match = _LEADING_NUMBER.match(text + " ")
+    if match:
+        number = match.group(1)
+        text = text[match.end():].strip()
+    return number, text, page
+
+def _number_level(number):
+    return number.count(".") + 1 if number else None
+
+def _make_entry(para_idx, text, level=None):
+    number, title, page = split_entry_text(text)
+    return TocEntry(para_idx, level or _number_level(number) or 1, number, title, page, normalize_title(title))
+
+def _toc_style_levels(doc):
+    """Стили пунктов оглавления: {styleId: уровень}."""
+    levels = {}
+    for style in doc.styles.element.iterchildren(qn("w:style")):
+        name = style.find(qn("w:name"))
+        match = _TOC_STYLE_NAME.match(name.get(qn("w:val"), "")) if name is not None else None
+        if match:
+            levels[style.get(qn("w:styleId"))] = int(match.group(1))
+    return levels
+
+
+class _TocFieldScanner:
+    """Отслеживает вложенные поля и находит абзацы внутри результата поля TOC."""
+
+    def __init__(self):
+        self.open_fields = []  # стек: [инструкция, это поле TOC]
+        self.levels = None     # глубина оглавления из ключа \o
+
+    def in_toc(self):
+        return any(is_toc for _, is_toc in self.open_fields)
+
+    def scan(self, p):
+        """Обрабатывает поля абзаца; True - абзац относится к полю TOC."""
+        inside = self.in_toc()
+        for node in p.iter(_FLD_CHAR, _INSTR_TEXT):
+            if node.tag == _INSTR_TEXT:
+                if self.open_fields and not self.open_fields[-1][1]:
+                    self.open_fields[-1][0] += node.text or ""
+                    if _TOC_INSTRUCTION.match(self.open_fields[-1][0]):
+                        self.open_fields[-1][1] = True
+                        levels = _TOC_LEVELS.search(self.open_fields[-1][0])
+                        self.levels = int(levels.group(1)) if levels else self.levels
+                        inside = True
+                continue
+            kind = node.get(qn("w:fldCharType"))
+            if kind == "begin":
+                self.open_fields.append(["", False])
+            elif kind == "end" and self.open_fields:
+                self.open_fields.pop()
+        return inside
+
+
+def extract_toc_entries(doc, doc_paragraphs):
+    """
+    Находит пункты содержания документа.
+
+    Args:
+        doc: документ docx
+        doc_paragraphs: список параграфов документа (индексы пунктов - по нему)
+
+    Returns:
+        (список TocEntry, глубина оглавления); пункты внутри w:sdt привязываются
+        к предыдущему абзацу основной части
+    """
+    style_levels = _toc_style_levels(doc)
+    scanner = _TocFieldScanner()
+    entries = []
+    para_idx = -1
+
+    def visit(p, anchor):
+        inside = scanner.scan(p)
+        style = p.find(f"{qn('w:pPr')}/{qn('w:pStyle')}")
+        level = style_levels.get(style.get(qn("w:val"))) if style is not None else None
+        # Внутри поля TOC могли остаться абзацы без текста - например, сам заголовок поля
+        text = Paragraph(p, None).text
+        if (inside or level) and text.strip() and normalize_title(text) not in TOC_HEADINGS:
+            entries.append(_make_entry(anchor, text, level))
+
+    for child in doc.element.body.iterchildren(_P, _SDT):
+        if child.tag == _P:
+            para_idx += 1
+            visit(child, para_idx)
+        else:
+            for p in child.iter(_P):
+                visit(p, max(para_idx, 0))
+
+    if not entries:
+        entries = _manual_toc_entries(doc_paragraphs)
+    return entries, scanner.levels or DEFAULT_TOC_LEVELS
+
+def _manual_toc_entries(doc_paragraphs):
+    """Содержание, набранное вручную: абзацы с номером страницы после заголовка СОДЕРЖАНИЕ."""
+    start = next((i for i, para in enumerate(doc_paragraphs)
+                  if normalize_title(para.text) in TOC_HEADINGS), None)
+    if start is None:
+        return []
+    entries = []
+    for i in range(start + 1, len(doc_paragraphs)):
+        text = doc_paragraphs[i].text
+        if not text.strip():
+            continue
+        if not _PAGE_TAIL.search(text):
+            break
+        entries.append(_make_entry(i, text))
+    return entries
+
+
+def collect_headings(outline_nodes):
+    """
+    Заголовки, которые должны попасть в содержание.
+
+    Args:
+        outline_nodes: узлы дерева заголовков (DocumentOutline.headings) -
+            уже без заголовков до содержания и глубже оглавления
+
+    Returns:
+        список Heading в порядке документа
+    """
+    headings = []
+    for node in outline_nodes:
+        key = normalize_title(node.title)
+        if key and key not in TOC_HEADINGS:
+            headings.append(Heading(node.para_idx, node.level, node.label or None, node.title, key))
+    return headings
+
+
+def compare_toc(entries, headings):
+    """
+    Сверяет пункты содержания с заголовками: сначала по ключу текста,
+    затем оставшиеся - по номеру раздела.
+
+    Returns:
+        TocComparison
+    """
+    by_key = {}
+    for heading in headings:
+        by_key.setdefault(heading.key, []).append(heading)
+
+    matched, mismatched, unmatched = [], [], []
+    used = set()
+    for entry in entries:
+        candidates = by_key.get(entry.key)
+        if not candidates:
+            unmatched.append(entry)
+            continue
+        heading = candidates.pop(0)
+        used.add(heading.para_idx)
+        if entry.number and heading.number and entry.number != heading.number:
+            mismatched.append((entry, heading))
+        else:
+            matched.append((entry, heading))
+
+    by_number = {heading.number: heading for heading in reversed(headings)
+                 if heading.number and heading.para_idx not in used}
+    extra = []
+    for entry in unmatched:
+        heading = by_number.pop(entry.number, None) if entry.number else None
+        if heading is None:
+            extra.append(entry)
+        else:
+            used.add(heading.para_idx)
+            mismatched.append((entry, heading))
+
+    missing = [heading for heading in headings if heading.para_idx not in used]
+    return TocComparison(matched, mismatched, extra, missing)
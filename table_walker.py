@@ -0,0 +1,69 @@
+"""
+Обход таблиц docx прямо по разметке w:tr/w:tc.
+
+python-docx строит `row.cells` по сетке таблицы и для объединенных ячеек
+возвращает один и тот же w:tc несколько раз, поэтому обход больших таблиц
+с объединениями через него получается квадратичным. Здесь каждая строка и
+ячейка просматривается один раз: горизонтальное объединение (w:gridSpan)
+учитывается при подсчете столбцов, а продолжения вертикального объединения
+(w:vMerge без val="restart") пропускаются - их содержимое принадлежит
+верхней ячейке.
+"""
+
+from collections import namedtuple
+
+from docx.oxml.ns import qn
+
+# Ячейка таблицы: строка и столбец сетки (с нуля), сколько столбцов сетки
+# она занимает и сам элемент w:tc
+TableCell = namedtuple("TableCell", ["row", "column", "span", "tc"])
+
+
+def _grid_value(parent, tag, default):
+    """Целое значение w:val у дочернего элемента (w:gridSpan, w:gridBefore)."""
+    if parent is None:
+        return default
+    element = parent.find(qn(tag))
+    if element is None:
+        return default
+    return int(element.get(qn("w:val"), default))
+
+def _row_cells(tr):
+    """Элементы w:tc строки, включая ячейки внутри элементов управления содержимым (w:sdt)."""
+    for child in tr:
+        if child.tag == qn("w:tc"):
+            yield child
+        elif child.tag == qn("w:sdt"):
+            content = child.find(qn("w:sdtContent"))
+            if content is not None:
+                yield from content.iterchildren(qn("w:tc"))
+
+def is_merge_continuation(tc):
+    """Ячейка продолжает вертикальное объединение (ее содержимое - в верхней ячейке)."""
+    tc_pr = tc.find(qn("w:tcPr"))
+    if tc_pr is None:
+        return False
+    v_merge = tc_pr.find(qn("w:vMerge"))
+    return v_merge is not None and v_merge.get(qn("w:val"), "continue") == "continue"
+
+def iter_table_cells(tbl):
+    """
+    Перебирает ячейки таблицы по строкам за один проход.
+
+    Args:
+        tbl: элемент w:tbl
+
+    Yields:
+        TableCell для каждой ячейки, кроме продолжений вертикального объединения
+    """
+    for row, tr in enumerate(tbl.iterchildren(qn("w:tr"))):
+        column = _grid_value(tr.find(qn("w:trPr")), "w:gridBefore", 0)
+        for tc in _row_cells(tr):
+            span = _grid_value(tc.find(qn("w:tcPr")), "w:gridSpan", 1)
+            if not is_merge_continuation(tc):
+                yield TableCell(row, column, span, tc)
+            column += span
+
+def iter_cell_paragraphs(cell):
+    """Абзацы (w:p) ячейки, включая абзацы вложенных таблиц."""
+    return cell.tc.iter(qn("w:p"))
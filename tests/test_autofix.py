@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from collections import Counter
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.shared import Pt
+
+from autofix import DERIVED_STYLE_SUFFIX, autofix_file
+from formatting_checker import check_document_formatting
+
+TEXT = ("Основной текст работы описывает предметную область, постановку задачи и выбранные "
+        "методы решения, поэтому абзац достаточно длинный для основного текста.")
+
+
+def codes(path):
+    return Counter(finding.code for finding in check_document_formatting(str(path)))
+
+
+def make_document(path, style_name=None):
+    """Заголовок, шесть абзацев основного текста со стилем Arial 12 и таблица со стилем Normal"""
+    doc = Document()
+    style = doc.styles["Normal"]
+    if style_name:
+        style = doc.styles.add_style(style_name, WD_STYLE_TYPE.PARAGRAPH)
+    doc.add_paragraph("ВВЕДЕНИЕ")
+    style.font.name = "Arial"
+    style.font.size = Pt(12)
+    for _ in range(6):
+        doc.add_paragraph(TEXT, style=style)
+    doc.add_table(rows=1, cols=1).cell(0, 0).text = "Ячейка"
+    doc.save(path)
+    return path
+
+
+def test_shared_style_fixed_through_derived_style(tmp_path):
+    """Normal используется и в таблице - исправления уходят в производный стиль"""
+    source = make_document(tmp_path / "doc.docx")
+    before = codes(source)
+    assert before["main_text.font"] and before["main_text.alignment"]
+
+    output = tmp_path / "fixed.docx"
+    result, count = autofix_file(str(source), str(output))
+    assert count == sum(before.values())
+    assert [(fix.style_name, fix.derived_from) for fix in result.style_fixes] == [("Normal", "Normal")]
+    assert result.paragraphs_restyled == 6
+
+    after = codes(output)
+    assert not any(code.startswith("main_text.") for code in after)
+    assert all(after[code] <= before[code] for code in after)
+
+    doc = Document(output)
+    assert {para.style.name for para in doc.paragraphs[1:]} == {"Normal" + DERIVED_STYLE_SUFFIX}
+    assert doc.styles["Normal"].font.name == "Arial"
+    assert doc.tables[0].cell(0, 0).paragraphs[0].style.name == "Normal"
+
+
+def test_exclusive_style_fixed_in_place(tmp_path):
+    """Стиль, которым пользуется только основной текст, исправляется на месте"""
+    source = make_document(tmp_path / "doc.docx", style_name="Текст работы")
+    output = tmp_path / "fixed.docx"
+    result, _ = autofix_file(str(source), str(output))
+    assert [(fix.style_name, fix.derived_from) for fix in result.style_fixes] == [("Текст работы", None)]
+    assert result.paragraphs_restyled == 0
+
+    doc = Document(output)
+    assert {para.style.name for para in doc.paragraphs[1:]} == {"Текст работы"}
+    assert doc.styles["Текст работы"].font.name == "Times New Roman"
+    assert not any(code.startswith("main_text.") for code in codes(output))
+
+
+def test_paragraph_kinds(tmp_path):
+    """Классификатор сообщает типы абзацев после ВВЕДЕНИЯ"""
+    result = check_document_formatting(str(make_document(tmp_path / "doc.docx")))
+    assert result.paragraph_kinds == {0: "main_heading", **{i: "main_text" for i in range(1, 7)}}
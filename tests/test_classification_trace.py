@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+from docx import Document
+from classification_trace import ClassificationTrace
+from formatting_checker import check_document_formatting
+
+
+def create_test_doc(path):
+    """Создает документ с текстом до введения, заголовком раздела и обычным абзацем"""
+    doc = Document()
+    doc.add_paragraph("Титульный лист")
+    doc.add_paragraph("ВВЕДЕНИЕ").runs[0].bold = True
+    doc.add_paragraph("1. Обзор литературы").runs[0].bold = True
+    doc.add_paragraph("Обычный абзац основного текста документа.")
+    doc.save(path)
+    return str(path)
+
+def test_trace_records_decision_path(tmp_path):
+    """Для каждого абзаца записываются проверенные детекторы и итоговый тип"""
+    doc_path = create_test_doc(tmp_path / "trace.docx")
+    trace = ClassificationTrace()
+    check_document_formatting(doc_path, trace=trace)
+
+    records = {record["para_idx"]: record for record in trace.records}
+    assert records[0]["skipped"] == "before_introduction"
+    assert records[2]["kind"] == "section_heading"
+    assert records[2]["path"][-1] == {"detector": "section_heading", "result": True}
+    assert records[2]["features"]["bold_runs"] == 1
+    assert records[3]["kind"] == "main_text"
+    assert all(not step["result"] for step in records[3]["path"])
+
+def test_trace_exported_as_jsonl(tmp_path):
+    """Трассировка сохраняется построчно в JSONL и не меняет результат проверки"""
+    doc_path = create_test_doc(tmp_path / "trace.docx")
+    trace = ClassificationTrace()
+    with_trace = check_document_formatting(doc_path, trace=trace)
+    trace_path = trace.write_jsonl(str(tmp_path / "trace.jsonl"))
+
+    lines = open(trace_path, encoding="utf-8").read().splitlines()
+    assert len(lines) == len(trace.records)
+    assert json.loads(lines[1])["kind"] == "main_heading"
+    assert list(with_trace) == list(check_document_formatting(doc_path))
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from comment_utils import aggregate_comments
+from findings import Finding
+
+AUTHOR = "Norm Control"
+
+
+def test_merge_comments_for_one_paragraph():
+    """Замечания к одному абзацу объединяются в один комментарий"""
+    comments = [
+        Finding("main_text.alignment", 5, ("по ширине", "LEFT (0)"), AUTHOR),
+        Finding("main_text.first_line_indent", 5, (1.25, 0.0), AUTHOR),
+        Finding("figure_caption.trailing_period", 7, (), AUTHOR),
+    ]
+    result = aggregate_comments(comments)
+
+    assert len(result) == 2
+    merged = [text for idx, text, _ in result if idx == 5][0]
+    assert "Выравнивание" in merged and "Отступ первой строки" in merged
+
+def test_collapse_repeated_violation():
+    """Нарушение во всем документе сворачивается в сводку и несколько примеров"""
+    comments = [Finding("main_text.font", i, (("Arial",), "Times New Roman", (12 + i % 2,), 14, False, ()), AUTHOR)
+                for i in range(100)]
+    result = aggregate_comments(comments, max_examples=2)
+
+    summaries = [text for idx, text, _ in result if idx < 0]
+    examples = [idx for idx, _, _ in result if idx >= 0]
+    assert len(summaries) == 1
+    assert "100 раз" in summaries[0]
+    assert examples == [0, 1]
+
+def test_category_caps():
+    """Число замечаний одной категории ограничивается"""
+    comments = [Finding("section_heading.alignment", i, ("по левому краю", "CENTER (1)"), AUTHOR)
+                for i in range(10)]
+    result = aggregate_comments(comments, max_examples=None, category_caps={"section_heading": 4})
+
+    assert len([idx for idx, _, _ in result if idx >= 0]) == 4
+    assert any("Ещё 6 замечаний категории «Заголовок раздела»" in text for idx, text, _ in result if idx < 0)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+from docx import Document
+from docx.opc.packuri import PackURI
+from docx.opc.part import Part
+from docx.oxml.ns import qn
+
+from comment_utils import (DebugSidecar, add_comments_bulk, add_comments_to_docx, debug_sidecar_path,
+                           strip_prior_comments)
+from docx_writer import COMMENT_EXTENSION_RELS
+
+AUTHOR = "Norm Control"
+
+
+def test_bulk_comments_read_back(tmp_path):
+    """Все комментарии добавляются разом и читаются обратно через python-docx"""
+    doc = Document()
+    first = doc.add_paragraph("Первый абзац")
+    doc.add_comment(first.runs, "Уже был", AUTHOR)
+    second = doc.add_paragraph("Второй абзац")
+    empty = doc.add_paragraph()
+
+    ids = add_comments_bulk(doc, [
+        (second, "Замечание\nвторая строка", AUTHOR),
+        (empty, "К пустому абзацу", "Другой"),
+        (second, "Ещё\x0bодно", AUTHOR),
+    ])
+    assert ids == [1, 2, 3]
+
+    path = tmp_path / "out.docx"
+    doc.save(path)
+    saved = Document(path)
+    comments = {comment.comment_id: comment for comment in saved.comments}
+    assert [(comments[i].text, comments[i].author) for i in ids] == [
+        ("Замечание\nвторая строка", AUTHOR), ("К пустому абзацу", "Другой"), ("Ещёодно", AUTHOR)]
+
+    p = saved.paragraphs[1]._p
+    starts = [int(e.get(qn("w:id"))) for e in p.iter(qn("w:commentRangeStart"))]
+    references = [int(e.get(qn("w:id"))) for e in p.iter(qn("w:commentReference"))]
+    assert starts == [1, 3] and references == [1, 3]
+    assert saved.paragraphs[2].text == " "
+
+
+def make_source(tmp_path):
+    source = tmp_path / "in.docx"
+    doc = Document()
+    for text in ("Один", "Два", "Три"):
+        doc.add_paragraph(text)
+    doc.save(source)
+    return source
+
+COMMENTS = [(1, "Замечание", AUTHOR), (-1, "Сводка", AUTHOR), (10, "Далеко", AUTHOR)]
+
+
+def test_add_comments_to_docx(tmp_path):
+    """Общие замечания попадают в первый абзац, индексы за концом - в последний; без отладки - без Debug ID"""
+    output = tmp_path / "out.docx"
+    add_comments_to_docx(str(make_source(tmp_path)), str(output), COMMENTS)
+
+    saved = Document(output)
+    texts = [comment.text for comment in saved.comments]
+    assert texts == ["Замечание", "Далеко", "[Общий комментарий] Сводка"]
+    assert [len(list(para._p.iter(qn("w:commentReference")))) for para in saved.paragraphs] == [1, 1, 1]
+    assert [path.name for path in tmp_path.iterdir() if path.name.startswith("out")] == ["out.docx"]
+
+
+def test_bad_comment_not_saved(tmp_path):
+    """Ошибка в одном комментарии не дает сохранить документ с частью комментариев"""
+    output = tmp_path / "out.docx"
+    with pytest.raises(TypeError):
+        add_comments_to_docx(str(make_source(tmp_path)), str(output), COMMENTS + [(2, None, AUTHOR)])
+    assert not output.exists()
+
+    doc = Document()
+    para = doc.add_paragraph("Текст")
+    with pytest.raises(TypeError):
+        add_comments_bulk(doc, [(para, "Замечание", AUTHOR), (para, 42, AUTHOR)])
+    assert not doc.part._comments_part.element.xpath("./w:comment")
+    assert not list(para._p.iter(qn("w:commentRangeStart")))
+
+
+def test_debug_sidecar(tmp_path):
+    """С отладкой к комментариям добавляется Debug ID, записи сохраняются в JSONL в фоновом потоке"""
+    output = tmp_path / "out.docx"
+    debug = DebugSidecar()
+    add_comments_to_docx(str(make_source(tmp_path)), str(output), COMMENTS, debug=debug)
+
+    texts = [comment.text for comment in Document(output).comments]
+    assert texts == ["Замечание [Debug ID: P1_C0]", "Далеко [Debug ID: P2_C1]",
+                     "[Общий комментарий] Сводка [Debug ID: P0_C2]"]
+
+    debug.write_in_background(debug_sidecar_path(str(output))).join()
+    with open(debug_sidecar_path(str(output)), encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert records[0] == {"event": "document", "paragraphs": 3, "comments": 3}
+    assert records[2] == {"event": "out_of_range", "requested": 10, "paragraph": 2}
+    assert [(r["debug_id"], r["requested"], r["anchor"]) for r in records if r["event"] == "comment"] == [
+        ("P1_C0", 1, "runs"), ("P2_C1", 10, "runs"), ("P0_C2", -1, "runs")]
+
+
+def test_remove_comments_by_author(tmp_path):
+    """Удаляются комментарии автора вместе с якорями и записями в частях Word; чужие остаются"""
+    doc = Document()
+    first = doc.add_paragraph("Первый абзац")
+    second = doc.add_paragraph("Второй абзац")
+    add_comments_bulk(doc, [(first, "Старое замечание", AUTHOR), (first, "Вопрос студента", "Студент"),
+                            (second, "Еще одно", AUTHOR)])
+    # Word добавляет абзацам комментариев w14:paraId и ведет по ним commentsExtended
+    comments = doc.part._comments_part.element
+    for comment, para_id in zip(comments, ("0000000A", "0000000B", "0000000C")):
+        comment[0].set("{http://schemas.microsoft.com/office/word/2010/wordml}paraId", para_id)
+    extended = Part(PackURI("/word/commentsExtended.xml"),
+                    "application/vnd.openxmlformats-officedocument.wordprocessingml.commentsExtended+xml",
+                    ('<w15:commentsEx xmlns:w15="http://schemas.microsoft.com/office/word/2012/wordml">'
+                     '<w15:commentEx w15:paraId="0000000A" w15:done="0"/>'
+                     '<w15:commentEx w15:paraId="0000000B" w15:paraIdParent="0000000A" w15:done="0"/>'
+                     '<w15:commentEx w15:paraId="0000000C" w15:done="0"/></w15:commentsEx>').encode(),
+                    doc.part.package)
+    doc.part.relate_to(extended, COMMENT_EXTENSION_RELS[1])
+    path = tmp_path / "resubmitted.docx"
+    doc.save(path)
+
+    assert strip_prior_comments(str(path), AUTHOR) == 2
+    assert strip_prior_comments(str(path), AUTHOR) == 0
+
+    saved = Document(path)
+    assert [(comment.author, comment.text) for comment in saved.comments] == [("Студент", "Вопрос студента")]
+    anchors = [(e.tag.rpartition("}")[2], e.get(qn("w:id"))) for p in saved.paragraphs for e in p._p.iter(
+        qn("w:commentRangeStart"), qn("w:commentRangeEnd"), qn("w:commentReference"))]
+    assert anchors == [("commentRangeStart", "1"), ("commentRangeEnd", "1"), ("commentReference", "1")]
+    assert [p.text for p in saved.paragraphs] == ["Первый абзац", "Второй абзац"]
+    assert len(saved.paragraphs[1].runs) == 1
+
+    extended = next(rel.target_part for rel in saved.part.rels.values() if rel.reltype == COMMENT_EXTENSION_RELS[1])
+    assert extended.blob.endswith(b'<w15:commentEx w15:paraId="0000000B" w15:done="0"/></w15:commentsEx>')
+
+
+def test_resubmitted_document_stripped_while_commenting(tmp_path):
+    """Прежние замечания снимаются в том же проходе, что и добавление новых; исходник не меняется"""
+    source = make_source(tmp_path)
+    doc = Document(source)
+    add_comments_bulk(doc, [(doc.paragraphs[0], "Старое", AUTHOR), (doc.paragraphs[1], "Вопрос", "Студент")])
+    doc.save(source)
+    before = source.read_bytes()
+
+    output = tmp_path / "out.docx"
+    add_comments_to_docx(str(source), str(output), [(2, "Новое", AUTHOR)], strip_author=AUTHOR)
+
+    assert source.read_bytes() == before
+    saved = Document(output)
+    assert [(comment.author, comment.text) for comment in saved.comments] == [("Студент", "Вопрос"),
+                                                                              (AUTHOR, "Новое")]
+    assert not list(saved.paragraphs[0]._p.iter(qn("w:commentReference")))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from docx import Document
+
+from reference_index import FIGURE, TABLE, SOURCE, build_reference_index, expand_numbers
+from formatting_checker import (check_cross_references, find_figure_captions, find_table_titles,
+                                find_bibliography_entries)
+
+def test_reference_index():
+    """Ссылки на рисунки, таблицы и источники собираются с номерами абзацев"""
+    doc = Document()
+    doc.add_paragraph("Схема показана на рис. 1, результаты - на рисунках 2 и 3.")
+    doc.add_paragraph("Данные приведены в таблице 2 [1, с. 15] и [3-5].")
+    doc.add_paragraph("Рисунок 1 – Схема")
+
+    index = build_reference_index(doc.paragraphs, skip=[2])
+
+    assert dict(index.items(FIGURE)) == {1: [0], 2: [0], 3: [0]}
+    assert dict(index.items(TABLE)) == {2: [1]}
+    assert dict(index.items(SOURCE)) == {1: [1], 3: [1], 4: [1], 5: [1]}
+    assert expand_numbers("1, 2–4 и 7") == [1, 2, 3, 4, 7]
+    assert expand_numbers("Электронный ресурс") == []
+
+def test_code_subscripts_are_not_citations():
+    """Индексы в коде ("str[0]", "arr[i]") и текст в скобках ссылками на источники не считаются"""
+    doc = Document()
+    doc.add_paragraph("result = str[0] + arr[i] + f(x)[2] + matrix[1][3]")
+    doc.add_paragraph("Параметры [см. выше] и ссылка [7; 9].")
+    doc.add_paragraph("Описано в ГОСТ[4] и в OpenProject (США, GitHub)[5].")
+
+    assert dict(build_reference_index(doc.paragraphs).items(SOURCE)) == {7: [1], 9: [1], 4: [2], 5: [2]}
+
+def test_unreferenced_and_dangling():
+    """Элементы без ссылок и ссылки на несуществующие элементы"""
+    doc = Document()
+    for text in ["ВВЕДЕНИЕ",
+                 "Как видно на рисунке 1 и в таблице 3, результат подтверждается [1], [4].",
+                 "Рисунок 1 – Схема",
+                 "Рисунок 2 – График",
+                 "Таблица 1 – Данные",
+                 "СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ",
+                 "1. Иванов И.И. Книга. – М.: Наука, 2023. – 300 с.",
+                 "2. Петров П.П. Статья // Журнал. – 2022. – № 1. – С. 5-10."]:
+        doc.add_paragraph(text)
+    paragraphs = doc.paragraphs
+
+    comments = []
+    check_cross_references(paragraphs, 0, find_figure_captions(paragraphs), find_table_titles(paragraphs),
+                           find_bibliography_entries(paragraphs, 5), comments, "Тест")
+
+    assert sorted((f.code, f.para_idx, f.args[0]) for f in comments) == [
+        ("bibliography.unreferenced", 7, 2),
+        ("citation.dangling_reference", 1, 4),
+        ("figure.unreferenced", 3, 2),
+        ("table.dangling_reference", 1, 3),
+        ("table.unreferenced", 4, 1),
+    ]
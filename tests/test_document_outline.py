@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from docx import Document
+from docx.oxml import parse_xml
+
+from document_outline import DocumentOutline, list_number_labels, paragraph_outline_levels
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+def add_heading_numbering(doc):
+    """Многоуровневый список 1 / 1.1 / 1.1.1, привязанный к стилям Heading 1-3"""
+    levels = "".join(
+        f'<w:lvl w:ilvl="{i}"><w:start w:val="1"/><w:numFmt w:val="decimal"/>'
+        f'<w:pStyle w:val="Heading{i + 1}"/>'
+        f'<w:lvlText w:val="{".".join(f"%{k + 1}" for k in range(i + 1))}"/></w:lvl>'
+        for i in range(3))
+    numbering = doc.part.numbering_part.element
+    numbering.insert(0, parse_xml(f'<w:abstractNum {W} w:abstractNumId="90">{levels}</w:abstractNum>'))
+    numbering.append(parse_xml(f'<w:num {W} w:numId="90"><w:abstractNumId w:val="90"/></w:num>'))
+    for level in range(1, 4):
+        style = doc.styles[f"Heading {level}"].element
+        style.get_or_add_pPr().append(parse_xml(f'<w:numPr {W}><w:numId w:val="90"/></w:numPr>'))
+
+def test_list_number_labels():
+    """Номера, которые Word рисует по стилю заголовка; абзацы в таблице тоже считаются"""
+    doc = Document()
+    add_heading_numbering(doc)
+    doc.add_heading("Обзор", level=1)
+    doc.add_heading("Методы", level=2)
+    doc.add_heading("Детали", level=3)
+    doc.add_table(rows=1, cols=1).cell(0, 0).paragraphs[0].style = doc.styles["Heading 2"]
+    doc.add_heading("Итоги", level=2)
+    doc.add_heading("Реализация", level=1)
+    doc.add_heading("Архитектура", level=2)
+
+    assert list_number_labels(doc) == {0: "1", 1: "1.1", 2: "1.1.1", 3: "1.3", 4: "2", 5: "2.1"}
+
+def test_outline_tree_and_numbering():
+    """Дерево заголовков и замечания о пропусках, повторах и нарушении иерархии"""
+    outline = DocumentOutline()
+    comments = []
+    headings = [
+        (0, 1, "ВВЕДЕНИЕ"),
+        (1, 1, "1 Обзор"),
+        (2, 2, "1.1 Методы"),
+        (3, 2, "1.3 Пропуск"),
+        (4, 2, "1.3 Повтор"),
+        (5, 3, "1.3.2 Без первого"),
+        (6, 1, "2 Реализация"),
+        (7, 3, "2.1.1 Без подраздела"),
+        (8, 2, "3.1 Чужой раздел"),
+        (9, 1, "ЗАКЛЮЧЕНИЕ"),
+    ]
+    for i, level, text in headings:
+        outline.add(i, level, text, None, comments, "Тест")
+
+    assert [(f.code, f.para_idx, f.args) for f in comments] == [
+        ("heading.numbering", 3, ("1.2", "1.3")),
+        ("heading.duplicate_number", 4, ("1.3",)),
+        ("heading.numbering", 5, ("1.3.1", "1.3.2")),
+        ("heading.numbering_depth", 7, ("2.1.1", "2")),
+        ("heading.numbering_depth", 8, ("3.1", "2.1.1")),
+    ]
+    assert [node.title for node in outline.roots] == ["ВВЕДЕНИЕ", "Обзор", "Реализация", "ЗАКЛЮЧЕНИЕ"]
+    overview = outline.roots[1]
+    assert [node.label for node in overview.children] == ["1.1", "1.3", "1.3"]
+    assert [node.label for node in overview.children[2].children] == ["1.3.2"]
+    assert [node.label for node in outline.headings(start_idx=6, max_level=2)] == ["2", "3.1", ""]
+
+def test_rendered_numbers_in_outline():
+    """Номер из списочной нумерации участвует в проверке так же, как набранный"""
+    doc = Document()
+    add_heading_numbering(doc)
+    doc.add_heading("Обзор", level=1)
+    doc.add_heading("Методы", level=2)
+    doc.add_heading("Реализация", level=1)
+    labels = list_number_labels(doc)
+    levels = paragraph_outline_levels(doc)
+
+    outline = DocumentOutline()
+    comments = []
+    for i, para in enumerate(doc.paragraphs):
+        outline.add(i, levels[i], para.text, labels.get(i), comments, "Тест")
+    assert comments == []
+    assert [(node.label, node.title) for node in outline.nodes] == [("1", "Обзор"), ("1.1", "Методы"), ("2", "Реализация")]
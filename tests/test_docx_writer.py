@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import zipfile
+
+from docx import Document
+
+from comment_utils import add_comments_bulk
+import docx_writer
+from docx_writer import save_docx
+
+SOURCE = os.path.join(os.path.dirname(__file__), "test_images.docx")
+
+
+def raw_bytes(path, name):
+    """Сжатые данные записи архива как есть"""
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        info = archive.getinfo(name)
+        f.seek(info.header_offset + 26)
+        name_length, extra_length = int.from_bytes(f.read(2), "little"), int.from_bytes(f.read(2), "little")
+        f.seek(name_length + extra_length, os.SEEK_CUR)
+        return f.read(info.compress_size)
+
+
+def test_unchanged_parts_copied_raw(tmp_path):
+    """Картинки и стили копируются сжатыми байтами, комментарии пишутся заново"""
+    doc = Document(SOURCE)
+    add_comments_bulk(doc, [(doc.paragraphs[0], "Замечание", "Тест")])
+    output = tmp_path / "out.docx"
+    save_docx(doc, str(output), SOURCE)
+    reference = tmp_path / "reference.docx"
+    doc.save(reference)
+
+    with zipfile.ZipFile(output) as archive, zipfile.ZipFile(reference) as expected:
+        assert archive.testzip() is None
+        assert archive.namelist() == expected.namelist()
+        assert archive.read("word/document.xml") == expected.read("word/document.xml")
+        names = archive.namelist()
+
+    with zipfile.ZipFile(SOURCE) as source:
+        unchanged = [name for name in source.namelist()
+                     if name.startswith("word/media/") or name == "word/styles.xml"]
+        assert unchanged
+        for name in unchanged:
+            assert raw_bytes(str(output), name) == raw_bytes(SOURCE, name)
+            assert zipfile.ZipFile(output).getinfo(name).CRC == source.getinfo(name).CRC
+    assert "word/comments.xml" in names
+
+    saved = Document(output)
+    assert [comment.text for comment in saved.comments] == ["Замечание"]
+
+
+def test_same_file_falls_back_to_save(tmp_path):
+    """Запись поверх исходника идет обычным doc.save()"""
+    path = tmp_path / "doc.docx"
+    doc = Document()
+    doc.add_paragraph("Текст")
+    doc.save(path)
+
+    doc = Document(path)
+    add_comments_bulk(doc, [(doc.paragraphs[0], "Замечание", "Тест")])
+    save_docx(doc, str(path), str(path))
+    assert [comment.text for comment in Document(path).comments] == ["Замечание"]
+
+
+def test_parallel_compression_levels(tmp_path, monkeypatch):
+    """Параллельное сжатие дает тот же архив, что и последовательное; уровень влияет на размер"""
+    monkeypatch.setattr(docx_writer, "PARALLEL_MIN_SIZE", 0)
+    doc = Document(SOURCE)
+    add_comments_bulk(doc, [(para, "Замечание", "Тест") for para in doc.paragraphs])
+
+    sizes = {}
+    for level in (0, 9):
+        parallel, sequential = tmp_path / f"parallel{level}.docx", tmp_path / f"sequential{level}.docx"
+        docx_writer.save_docx(doc, str(parallel), SOURCE, compression_level=level, max_workers=4)
+        docx_writer.save_docx(doc, str(sequential), SOURCE, compression_level=level, max_workers=1)
+        with zipfile.ZipFile(parallel) as a, zipfile.ZipFile(sequential) as b:
+            assert a.testzip() is None
+            assert [(i.filename, i.CRC, i.compress_size) for i in a.infolist()] == \
+                   [(i.filename, i.CRC, i.compress_size) for i in b.infolist()]
+            sizes[level] = a.getinfo("word/document.xml").compress_size
+    assert sizes[9] < sizes[0]
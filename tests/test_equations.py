@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from docx import Document
+from docx.oxml import parse_xml
+
+from equation_index import EquationIndex, is_equation_paragraph
+
+M = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+     'xmlns:m="http://schemas.openxmlformats.org/officeDocument/2006/math"')
+
+def add_equation(doc, before="", after=""):
+    """Абзац с формулой x=1 и текстом до и после нее"""
+    para = doc.add_paragraph(before)
+    para._p.append(parse_xml(f'<m:oMath {M}><m:r><m:t>x=1</m:t></m:r></m:oMath>'))
+    if after:
+        para._p.append(parse_xml(f'<w:r {M}><w:t xml:space="preserve">{after}</w:t></w:r>'))
+    return para
+
+def test_display_and_inline_equations():
+    """Формула в отдельном абзаце отличается от формулы внутри предложения"""
+    doc = Document()
+    assert is_equation_paragraph(add_equation(doc, after="\t(1)"))
+    assert is_equation_paragraph(add_equation(doc))
+    assert not is_equation_paragraph(add_equation(doc, before="где ", after=" - переменная"))
+    assert not is_equation_paragraph(doc.add_paragraph("Текст (1)"))
+
+def test_equation_numbering():
+    """Нумерация формул: формат, положение номера и последовательность (сквозная и по главам)"""
+    doc = Document()
+    tails = ["\t(1)", "\t(2)", "\t(4)", ",", "\t1", "(5)", "\t(2.1)", "\t(2.2)", "\t(3.1)", "\t(3.3)", " ."]
+    index = EquationIndex()
+    comments = []
+    for i, tail in enumerate(tails):
+        index.add(add_equation(doc, after=tail), i, comments, "Тест")
+
+    assert [(f.code, f.para_idx, f.args) for f in comments] == [
+        ("equation.numbering", 2, ("(3)", "(4)")),
+        ("equation.number_format", 4, ("1",)),
+        ("equation.number_position", 5, ("(5)",)),
+        ("equation.numbering", 9, ("(3.2)", "(3.3)")),
+    ]
+    # Формулы без номера (в том числе с запятой или точкой после формулы)
+    assert [equation.number for equation in index.equations][3:5] == [None, None]
+    assert index.equations[-1].number is None
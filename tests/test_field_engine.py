@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from docx import Document
+from docx.oxml import parse_xml
+
+from field_engine import evaluate_fields
+from formatting_checker import check_caption_fields, find_figure_captions, find_table_titles
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+def add_xml(paragraph, content):
+    for element in parse_xml(f'<w:p {W}>{content}</w:p>'):
+        paragraph._p.append(element)
+
+def complex_field(instruction, result):
+    return (f'<w:r><w:fldChar w:fldCharType="begin"/></w:r><w:r><w:instrText>{instruction}</w:instrText></w:r>'
+            f'<w:r><w:fldChar w:fldCharType="separate"/></w:r><w:r><w:t>{result}</w:t></w:r>'
+            f'<w:r><w:fldChar w:fldCharType="end"/></w:r>')
+
+def caption(doc, label, instruction, cached, bookmark=None):
+    para = doc.add_paragraph(f"{label} ")
+    field = complex_field(instruction, cached)
+    if bookmark:
+        field = f'<w:bookmarkStart w:id="{bookmark[1]}" w:name="{bookmark[0]}"/>{field}<w:bookmarkEnd w:id="{bookmark[1]}"/>'
+    add_xml(para, field + '<w:r><w:t xml:space="preserve"> – Название</w:t></w:r>')
+    return para
+
+def test_seq_counters_and_refs():
+    """SEQ считается заново (с \\r и \\s), REF разрешается через закладку"""
+    doc = Document()
+    doc.add_heading("Глава 1", level=1)
+    caption(doc, "Рисунок", "SEQ Рисунок \\* ARABIC \\s 1", "1")
+    caption(doc, "Рисунок", "SEQ Рисунок \\* ARABIC \\s 1", "5", bookmark=("_Ref1", 1))
+    doc.add_heading("Глава 2", level=1)
+    caption(doc, "Рисунок", "SEQ Рисунок \\* ARABIC \\s 1", "3")
+    table_title = doc.add_paragraph("Таблица ")
+    add_xml(table_title, '<w:fldSimple w:instr=" SEQ Таблица \\r 4 "><w:r><w:t>4</w:t></w:r></w:fldSimple>'
+                         '<w:r><w:t xml:space="preserve"> – Данные</w:t></w:r>')
+    reference = doc.add_paragraph("См. рисунок ")
+    add_xml(reference, complex_field("REF _Ref1 \\h", "5") + complex_field("REF _Ref404 \\h", "7"))
+
+    fields = evaluate_fields(doc)
+
+    assert [(f.value, f.cached, f.restarted) for i in (1, 2, 4) for f in fields.seq[i]] == [
+        (1, 1, False), (2, 5, False), (1, 3, True)]
+    assert [(i, ref.bookmark, ref.found, ref.target.value if ref.target else None) for i, ref in fields.refs] == [
+        (6, "_Ref1", True, 2), (6, "_Ref404", False, None)]
+
+    paragraphs = doc.paragraphs
+    figure_captions = find_figure_captions(paragraphs, fields)
+    table_titles = find_table_titles(paragraphs, fields)
+    assert [(i, num) for i, num, _ in figure_captions] == [(1, 1), (2, 2), (4, 1)]
+    assert [(i, num) for i, num, _ in table_titles] == [(5, 4)]
+
+    comments = []
+    check_caption_fields(fields, figure_captions, table_titles, comments, "Тест")
+    assert [(f.code, f.para_idx, f.args) for f in comments] == [
+        ("figure_caption.stale_number", 2, (5, 2)),
+        ("figure_caption.stale_number", 4, (3, 1)),
+        ("reference.stale_number", 6, ("5", "Рисунок", 2)),
+        ("reference.broken", 6, ("_Ref404", "7")),
+    ]
+
+def test_simple_field_figure_caption():
+    """Подпись с номером в w:fldSimple: номера нет в тексте абзаца, он берется из поля SEQ"""
+    doc = Document()
+    doc.add_paragraph("Текст")
+    for name in ("Схема", "График"):
+        para = doc.add_paragraph("Рисунок ")
+        add_xml(para, '<w:fldSimple w:instr=" SEQ Рисунок \\* ARABIC "><w:r><w:t>9</w:t></w:r></w:fldSimple>'
+                      f'<w:r><w:t xml:space="preserve"> – {name}</w:t></w:r>')
+    doc.add_paragraph("Рисунок без поля не подпись")
+
+    paragraphs = doc.paragraphs
+    assert paragraphs[1].text.strip() == "Рисунок  – Схема"
+    fields = evaluate_fields(doc)
+    assert [(i, num) for i, num, _ in find_figure_captions(paragraphs, fields)] == [(1, 1), (2, 2)]
+    assert find_figure_captions(paragraphs) == []
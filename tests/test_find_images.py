@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from docx import Document
+from docx.oxml import parse_xml
+from formatting_checker import find_images_in_document, check_image_captions
+
+NAMESPACES = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+              'xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing" '
+              'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+              'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+              'xmlns:v="urn:schemas-microsoft-com:vml" '
+              'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"')
+
+def drawing(placement, rel_id):
+    """Разметка w:drawing с размером 2x1 см"""
+    return (f'<w:drawing><wp:{placement}><wp:extent cx="720000" cy="360000"/>'
+            f'<a:graphic><a:graphicData><a:blip r:embed="{rel_id}"/></a:graphicData></a:graphic>'
+            f'</wp:{placement}></w:drawing>')
+
+def vml_picture(rel_id, style="width:72pt;height:36pt"):
+    """Разметка VML-рисунка (по умолчанию размером 72x36 пт)"""
+    return (f'<w:pict><v:shape style="{style}">'
+            f'<v:imagedata r:id="{rel_id}"/></v:shape></w:pict>')
+
+def add_run(paragraph, content):
+    paragraph._p.append(parse_xml(f'<w:r {NAMESPACES}>{content}</w:r>'))
+
+def test_finds_inline_anchor_and_vml_images():
+    """Находятся встроенные рисунки, рисунки с обтеканием и VML-рисунки"""
+    doc = Document()
+    doc.add_paragraph("Текст")
+    add_run(doc.add_paragraph(), drawing("inline", "rId10"))
+    add_run(doc.add_paragraph(), drawing("anchor", "rId11"))
+    add_run(doc.add_paragraph(), vml_picture("rId12"))
+
+    images = find_images_in_document(doc)
+
+    assert [idx for idx, _ in images] == [1, 2, 3]
+    inline, anchor, vml = [ref for _, ref in images]
+    assert (inline.kind, inline.placement, inline.rel_id, inline.width) == ("drawing", "inline", "rId10", 720000)
+    assert anchor.placement == "anchor"
+    assert (vml.kind, vml.rel_id, vml.width, vml.height) == ("vml", "rId12", 914400, 457200)
+
+def test_vml_malformed_size_skipped():
+    """Испорченный размер в style VML-фигуры пропускается, а не прерывает поиск рисунков"""
+    doc = Document()
+    add_run(doc.add_paragraph(), vml_picture("rId1", "width:.;height:1.2.3pt"))
+    add_run(doc.add_paragraph(), vml_picture("rId2", "width:.5in;height:36pt"))
+
+    refs = [ref for _, ref in find_images_in_document(doc)]
+    assert [(ref.width, ref.height) for ref in refs] == [(None, None), (457200, 457200)]
+
+def test_alternate_content_counted_once():
+    """Запасная VML-копия рисунка в mc:Fallback не считается отдельным рисунком"""
+    doc = Document()
+    add_run(doc.add_paragraph(), f'<mc:AlternateContent><mc:Choice Requires="wps">{drawing("anchor", "rId5")}'
+                                 f'</mc:Choice><mc:Fallback>{vml_picture("rId5")}</mc:Fallback></mc:AlternateContent>')
+    add_run(doc.add_paragraph(), drawing("inline", "rId6") + drawing("inline", "rId7"))
+
+    images = find_images_in_document(doc)
+
+    assert [(idx, ref.rel_id) for idx, ref in images] == [(0, "rId5"), (1, "rId6"), (1, "rId7")]
+
+def test_image_caption_matching():
+    """Сопоставление рисунков и подписей: далекая подпись, нет подписи, подпись у двух рисунков"""
+    doc = Document()
+    layout = {0: "image", 2: "image", 3: "Рисунок 1 – Первый", 5: "image", 9: "Рисунок 2 – Второй",
+              12: "image", 19: "Рисунок 3 – Третий"}
+    for i in range(20):
+        content = layout.get(i, "Текст")
+        if content == "image":
+            add_run(doc.add_paragraph(), drawing("inline", f"rId{i}"))
+        else:
+            doc.add_paragraph(content)
+    comments = []
+    check_image_captions(doc, comments, "Test")
+
+    by_code = {}
+    for finding in comments:
+        by_code.setdefault(finding.code, []).append(finding)
+    assert [f.para_idx for f in by_code["figure_caption.claimed_twice"]] == [3]
+    assert by_code["figure_caption.claimed_twice"][0].args == (1, 0, 2)
+    assert [f.args for f in by_code["figure.caption_far"]] == [(5, 4)]
+    assert [f.para_idx for f in by_code["figure.no_caption"]] == [12]
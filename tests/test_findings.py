@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from findings import Finding, MESSAGES, ERROR, WARNING, render_message
+
+
+def test_finding_renders_message_from_catalog():
+    """Текст замечания строится из каталога по коду и аргументам"""
+    finding = Finding("main_text.first_line_indent", 3, (1.25, 0.5))
+
+    assert finding.severity == ERROR
+    assert finding.category == "main_text"
+    assert finding.message == "Ошибка (Основной текст): Отступ первой строки должен быть 1.25 см (текущий: 0.50 см)."
+
+def test_finding_unpacks_as_tuple():
+    """Замечание распаковывается как старый кортеж (индекс, текст, автор)"""
+    idx, text, author = Finding("footnote.unchecked", -1, ("нет сносок",), "Проверяющий")
+
+    assert idx == -1
+    assert author == "Проверяющий"
+    assert text.startswith("Предупреждение") and "нет сносок" in text
+
+def test_every_catalog_entry_has_severity():
+    """У каждого кода в каталоге есть уровень серьезности и шаблон"""
+    for code, (severity, template) in MESSAGES.items():
+        assert severity in (ERROR, WARNING, "info"), code
+        assert callable(template) or isinstance(template, str), code
+    assert "лимита времени" in render_message("check.time_budget", (5, ("Сноски",)))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+import json
+
+from docx import Document
+
+from findings import Finding
+from findings_export import dump_findings, excerpt, finding_record
+from formatting_checker import CheckResult, check_document_formatting
+
+
+def test_finding_record():
+    finding = Finding("figure.alignment", 3, ("по левому краю",), "Тест")
+    record = finding_record(finding, {3: "  Текст   абзаца\tс пробелами "})
+    assert record == {"paragraph": 3, "code": "figure.alignment", "category": "figure",
+                      "severity": "error", "message": finding.message, "excerpt": "Текст абзаца с пробелами"}
+    general = finding_record(Finding("check.failed", -1, ("сбой",)))
+    assert general["paragraph"] is None and general["excerpt"] is None
+    assert excerpt("слово " * 50, 20) == "слово слово слово с…"
+
+
+def test_json_and_ndjson():
+    """Замечания идут по порядку абзацев, общие - в конце; признак неполной проверки сохраняется"""
+    result = CheckResult([Finding("check.failed", -1, ("сбой",)), Finding("figure.alignment", 2, ("по левому краю",))],
+                         skipped=["Сноски"], paragraph_texts={2: "Абзац"})
+    data = json.loads(dump_findings(result, "json"))
+    assert data["partial"] is True and data["skipped"] == ["Сноски"] and data["count"] == 2
+    assert [(f["paragraph"], f["code"], f["excerpt"]) for f in data["findings"]] == [
+        (2, "figure.alignment", "Абзац"), (None, "check.failed", None)]
+
+    lines = dump_findings(result, "ndjson").splitlines()
+    assert [json.loads(line) for line in lines] == data["findings"]
+
+
+def test_check_result_keeps_paragraph_texts(tmp_path):
+    path = tmp_path / "doc.docx"
+    doc = Document()
+    doc.add_paragraph("ВВЕДЕНИЕ")
+    doc.add_paragraph("Текст работы с неправильным оформлением.")
+    doc.save(path)
+
+    result = check_document_formatting(str(path))
+    records = json.loads(dump_findings(result, "json"))["findings"]
+    assert records
+    for record in records:
+        if record["paragraph"] is not None:
+            assert record["excerpt"] == doc.paragraphs[record["paragraph"]].text
+
+
+def test_upload_json_skips_docx(tmp_path, monkeypatch):
+    """Загрузка с format=ndjson возвращает замечания и не пишет документ с комментариями"""
+    import app as app_module
+
+    monkeypatch.setitem(app_module.app.config, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setattr(app_module, "add_comments_to_docx",
+                        lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("docx не нужен")))
+    source = io.BytesIO()
+    doc = Document()
+    doc.add_paragraph("ВВЕДЕНИЕ")
+    doc.add_paragraph("Текст работы.")
+    doc.save(source)
+
+    client = app_module.app.test_client()
+    response = client.post("/upload", data={"docx_file": (io.BytesIO(source.getvalue()), "work.docx"),
+                                            "format": "ndjson"})
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert records and all({"paragraph", "code", "severity", "message", "excerpt"} <= set(r) for r in records)
+    assert not [p for p in tmp_path.iterdir() if "_with_remarks" in p.name]
+
+    response = client.post("/upload", data={"format": "json"})
+    assert response.status_code == 400 and response.get_json() == {"error": "Файл не выбран"}
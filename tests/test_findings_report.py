@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+import os
+
+from docx import Document
+
+from findings import Finding
+from findings_report import (GENERAL_GROUP_TITLE, PREAMBLE_GROUP_TITLE, group_by_section, load_snapshot,
+                             write_snapshot)
+from formatting_checker import CheckResult
+
+
+def record(paragraph, message="Замечание"):
+    return {"paragraph": paragraph, "code": "check.failed", "severity": "error", "message": message,
+            "excerpt": None}
+
+
+def test_group_by_section():
+    """Замечания раскладываются по разделам; общие - первой группой, до первого раздела - отдельной"""
+    sections = [(5, "1", "Обзор"), (20, "2", "Реализация"), (40, "", "ЗАКЛЮЧЕНИЕ")]
+    findings = [record(1), record(5), record(7), record(41), record(43), record(None)]
+    groups = [(group.title, group.para_idx, [r["paragraph"] for r in group.findings])
+              for group in group_by_section(findings, sections)]
+    assert groups == [(GENERAL_GROUP_TITLE, None, [None]), (PREAMBLE_GROUP_TITLE, None, [1]),
+                      ("1 Обзор", 5, [5, 7]), ("ЗАКЛЮЧЕНИЕ", 40, [41, 43])]
+
+
+def test_snapshot_round_trip(tmp_path):
+    result = CheckResult([Finding("check.failed", 3, ("сбой",))], paragraph_texts={3: "Текст"},
+                         sections=[(0, "1", "Обзор")])
+    path = str(tmp_path / "out.docx.findings.json")
+    (tmp_path / "out.docx.report.html").write_text("устаревший отчет", encoding="utf-8")
+    write_snapshot(result, path)
+    snapshot = load_snapshot(path)
+    assert snapshot["sections"] == [[0, "1", "Обзор"]]
+    assert [(r["paragraph"], r["excerpt"]) for r in snapshot["findings"]] == [(3, "Текст")]
+    assert not (tmp_path / "out.docx.report.html").exists()
+
+
+def test_report_route_streams_and_caches(tmp_path, monkeypatch):
+    """Первый запрос отчета отдается потоком и пишет кэш, повторный берется из кэша"""
+    import app as app_module
+
+    monkeypatch.setitem(app_module.app.config, "UPLOAD_FOLDER", str(tmp_path))
+    source = io.BytesIO()
+    doc = Document()
+    doc.add_paragraph("ВВЕДЕНИЕ")
+    doc.add_paragraph("Текст <работы> с ошибками оформления.")
+    doc.save(source)
+
+    client = app_module.app.test_client()
+    response = client.post("/upload", data={"docx_file": (io.BytesIO(source.getvalue()), "work.docx")})
+    assert response.status_code == 200
+    assert "/report/work_with_remarks.docx" in response.get_data(as_text=True)
+
+    response = client.get("/report/work_with_remarks.docx")
+    assert response.status_code == 200 and response.is_streamed
+    html = response.get_data(as_text=True)
+    assert "Отчет о проверке документа" in html and "Текст &lt;работы&gt;" in html
+    cache = tmp_path / "work_with_remarks.docx.report.html"
+    assert cache.read_text(encoding="utf-8") == html
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    # Повторный запрос не рендерит шаблон заново, а отдает файл кэша
+    cache.write_text(html + "<!-- из кэша -->", encoding="utf-8")
+    cached = client.get("/report/work_with_remarks.docx")
+    assert cached.get_data(as_text=True).endswith("<!-- из кэша -->")
+    cached.close()
+
+    assert client.get("/report/missing.docx").status_code == 404
+    assert client.get("/report/..%2Fapp.py").status_code == 404
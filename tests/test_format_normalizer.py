@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+from docx.shared import RGBColor
+
+from format_normalizer import FORCE_FONT, MARKER_ATTR, REMOVE_COLOR, SET_ALIGNMENT, normalize_part
+
+PASSES = [(FORCE_FONT, ["main_text"], "Times New Roman"), (REMOVE_COLOR, ["main_text"], "000000"),
+          (SET_ALIGNMENT, ["main_text"], "both")]
+
+
+def add_paragraph(doc, text):
+    """Абзац по центру с run Arial (с темой шрифта) красного цвета"""
+    para = doc.add_paragraph()
+    para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = para.add_run(text)
+    run.font.name = "Arial"
+    run._r.rPr.rFonts.set(qn("w:asciiTheme"), "minorHAnsi")
+    run.font.color.rgb = RGBColor(0xFF, 0, 0)
+    black = para.add_run(" черный")
+    black.font.color.rgb = RGBColor(0, 0, 0)
+    return para
+
+
+def test_only_marked_paragraphs_normalized():
+    doc = Document()
+    add_paragraph(doc, "Заголовок")
+    add_paragraph(doc, "Основной текст")
+    changed = normalize_part(doc.part, {1: "main_text", 0: "main_heading"}, PASSES)
+    assert changed == {"font_name": 1, "font_color": 1, "alignment": 1}
+
+    heading, text = doc.part.document.paragraphs
+    assert heading.alignment == WD_ALIGN_PARAGRAPH.CENTER
+    assert heading.runs[0].font.name == "Arial" and heading.runs[0].font.color.rgb == RGBColor(0xFF, 0, 0)
+
+    assert text.alignment == WD_ALIGN_PARAGRAPH.JUSTIFY
+    r_fonts = text.runs[0]._r.rPr.rFonts
+    assert r_fonts.get(qn("w:ascii")) == r_fonts.get(qn("w:hAnsi")) == "Times New Roman"
+    assert r_fonts.get(qn("w:asciiTheme")) is None
+    assert text.runs[0].font.color.type is None
+    assert text.runs[1].font.color.rgb == RGBColor(0, 0, 0)
+    assert not doc.part.element.xpath(f"//w:p[@{MARKER_ATTR}]")
+
+
+def test_nothing_to_fix_keeps_element():
+    doc = Document()
+    doc.add_paragraph("Текст")
+    root = doc.part.element
+    assert not normalize_part(doc.part, {0: "main_text"}, PASSES)
+    assert doc.part.element is root
+    assert root.body.p_lst[0].get(MARKER_ATTR) is None
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+import struct
+import zlib
+
+from docx import Document
+from docx.shared import Cm
+
+from image_inspector import MediaInspector, read_image_header
+from formatting_checker import check_image_sizes
+
+def png_bytes(width, height, dpi=None):
+    """Минимальный PNG (серое изображение) нужного размера"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    phys = chunk(b"pHYs", struct.pack(">IIB", round(dpi / 0.0254), round(dpi / 0.0254), 1)) if dpi else b""
+    pixels = zlib.compress(b"".join(b"\x00" + b"\x80" * width for _ in range(height)))
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + phys + chunk(b"IDAT", pixels) + chunk(b"IEND", b"")
+
+def test_reads_headers():
+    """Размер и разрешение читаются из заголовков PNG, JPEG и GIF"""
+    png = read_image_header(io.BytesIO(png_bytes(30, 20, dpi=300)))
+    assert (png.format, png.width, png.height) == ("png", 30, 20)
+    assert round(png.dpi_x) == 300
+
+    jfif = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00\x01\x01" + struct.pack(">BHHBB", 1, 72, 72, 0, 0)
+    sof = b"\xff\xc0" + struct.pack(">HBHHB", 8, 8, 480, 640, 0)
+    jpeg = read_image_header(io.BytesIO(b"\xff\xd8" + jfif + sof + b"\xff\xd9"))
+    assert jpeg == ("jpeg", 640, 480, 72.0, 72.0)
+
+    gif = read_image_header(io.BytesIO(b"GIF89a" + struct.pack("<HH", 12, 34) + b"\x00" * 20))
+    assert (gif.format, gif.width, gif.height) == ("gif", 12, 34)
+
+    assert read_image_header(io.BytesIO(b"\x89PNG\r\n\x1a\n\x00\x00")) is None
+    assert read_image_header(io.BytesIO(b"not an image")) is None
+
+def test_image_sizes(tmp_path):
+    """Рисунок шире области текста и рисунок с низким разрешением"""
+    doc = Document()
+    section = doc.sections[0]
+    text_width = section.page_width - section.left_margin - section.right_margin
+    doc.add_picture(io.BytesIO(png_bytes(2000, 10)), width=Cm(10))
+    doc.add_picture(io.BytesIO(png_bytes(100, 10)), width=Cm(10))
+    doc.add_picture(io.BytesIO(png_bytes(4000, 10)), width=text_width + Cm(1))
+    path = tmp_path / "images.docx"
+    doc.save(path)
+
+    doc = Document(path)
+    comments = []
+    with MediaInspector(path) as media:
+        check_image_sizes(doc, media, comments, "Тест")
+        assert media.inspect.cache_info().currsize == 3
+
+    assert [(f.code, f.para_idx) for f in comments] == [("figure.low_resolution", 1), ("figure.too_wide", 2)]
+    assert round(comments[0].args[0]) == 25
+
+def test_cache_per_document(tmp_path):
+    """Кэш заголовков у каждого документа свой: одинаковое имя части в другом файле разбирается заново"""
+    infos = []
+    for width in (30, 60):
+        doc = Document()
+        doc.add_picture(io.BytesIO(png_bytes(width, 10)))
+        path = tmp_path / f"image{width}.docx"
+        doc.save(path)
+        with MediaInspector(path) as media:
+            infos.append(media.inspect("/word/media/image1.png"))
+            assert media.inspect("/word/media/image1.png") is infos[-1]
+            assert media.inspect.cache_info().hits == 1
+    assert [info.width for info in infos] == [30, 60]
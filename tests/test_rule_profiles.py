@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import dataclasses
+import json
+import os
+
+import pytest
+from docx import Document
+from docx.shared import Pt, Cm, Mm
+from formatting_checker import check_document_formatting, check_document_formatting_multi
+from rule_profiles import get_profile, load_profiles
+
+
+def write_profiles(path, left_margin_mm):
+    """Записывает конфигурацию с базовым профилем и наследующим его профилем"""
+    config = {
+        "default_profile": "base",
+        "profiles": {
+            "base": {
+                "font": {"name": "Times New Roman", "size_pt": 14},
+                "page_margins_mm": {"left": left_margin_mm, "right": 15, "top": 20, "bottom": 20},
+                "main_text": {"first_line_indent_cm": 1.25, "line_spacing": 1.5},
+                "headings": {"first_line_indent_cm": 1.25},
+                "bibliography": {"first_line_indent_cm": 1.25},
+                "footnotes": {"min_size_pt": 10, "max_size_pt": 12, "line_spacing": 1.0}
+            },
+            "strict": {"extends": "base", "font": {"size_pt": 12}}
+        }
+    }
+    path.write_text(json.dumps(config), encoding="utf-8")
+    return str(path)
+
+def test_profiles_compiled_to_emu(tmp_path):
+    """Значения профиля переводятся в EMU, наследник перекрывает только свои поля"""
+    path = write_profiles(tmp_path / "profiles.json", 30)
+    base = get_profile(None, path)
+    strict = get_profile("strict", path)
+
+    assert base.font_size == Pt(14)
+    assert base.text_first_line_indent == Cm(1.25)
+    assert dict(base.page_margins)["левое"] == Mm(30)
+    assert strict.font_size == Pt(12) and strict.font_name == "Times New Roman"
+
+def test_profiles_reloaded_when_file_changes(tmp_path):
+    """Профили берутся из кэша и перечитываются только после изменения файла"""
+    path = write_profiles(tmp_path / "profiles.json", 30)
+    profiles, _ = load_profiles(path)
+    assert load_profiles(path)[0] is profiles
+
+    write_profiles(tmp_path / "profiles.json", 25)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert dict(get_profile(None, path).page_margins)["левое"] == Mm(25)
+
+def test_missing_file_keeps_cached_profiles(tmp_path, caplog):
+    """Файл профилей пропал (например, заменяется) - работаем с прежними профилями"""
+    path = write_profiles(tmp_path / "profiles.json", 30)
+    profiles, _ = load_profiles(path)
+    os.remove(path)
+    assert load_profiles(path)[0] is profiles
+    assert [record.levelname for record in caplog.records if record.name == "rule_profiles"] == ["WARNING"]
+
+def test_check_uses_selected_profile(tmp_path):
+    """Проверка документа сравнивает поля с выбранным профилем"""
+    doc_path = str(tmp_path / "margins.docx")
+    doc = Document()
+    doc.sections[0].left_margin = Mm(25)
+    doc.add_paragraph("Текст документа.")
+    doc.save(doc_path)
+
+    default_comments = [text for _, text, _ in check_document_formatting(doc_path)]
+    profile = get_profile(None, write_profiles(tmp_path / "profiles.json", 25))
+    profile_comments = [text for _, text, _ in check_document_formatting(doc_path, profile=profile)]
+
+    assert any("левое поле" in text for text in default_comments)
+    assert not any("левое поле" in text for text in profile_comments)
+
+def test_multi_profile_check(tmp_path):
+    """Один проход по документу дает результат для каждого профиля"""
+    doc_path = str(tmp_path / "multi.docx")
+    doc = Document()
+    doc.sections[0].left_margin = Mm(25)
+    doc.add_paragraph("ВВЕДЕНИЕ")
+    doc.add_paragraph("Текст документа.")
+    doc.save(doc_path)
+    base = get_profile(None, write_profiles(tmp_path / "base.json", 30))
+    relaxed = get_profile(None, write_profiles(tmp_path / "relaxed.json", 25))
+    relaxed = dataclasses.replace(relaxed, name="relaxed")
+
+    results = check_document_formatting_multi(doc_path, [base, relaxed])
+
+    assert list(results) == ["base", "relaxed"]
+    assert any("левое поле" in text for _, text, _ in results["base"])
+    assert not any("левое поле" in text for _, text, _ in results["relaxed"])
+    # Замечания, не зависящие от профиля, одинаковы в обоих результатах
+    assert [f for f in results["base"] if f.code != "page.margins"] == \
+           [f for f in results["relaxed"] if f.code != "page.margins"]
+    assert list(results["base"]) == list(check_document_formatting(doc_path, profile=base))
+
+def test_multi_profile_duplicates(tmp_path):
+    """Один профиль, переданный дважды, проверяется один раз; разные профили с одним именем - ошибка"""
+    doc_path = str(tmp_path / "multi.docx")
+    doc = Document()
+    doc.add_paragraph("ВВЕДЕНИЕ")
+    doc.add_paragraph("Текст документа.")
+    doc.save(doc_path)
+    default = get_profile(None)
+
+    results = check_document_formatting_multi(doc_path, [None, default.name])
+    assert list(results) == [default.name]
+    assert list(results[default.name]) == list(check_document_formatting(doc_path))
+
+    changed = dataclasses.replace(default, font_name="Arial")
+    with pytest.raises(ValueError):
+        check_document_formatting_multi(doc_path, [default, changed])
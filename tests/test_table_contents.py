@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from docx import Document
+from docx.enum.text import WD_LINE_SPACING
+from docx.shared import Pt
+
+from table_walker import iter_table_cells
+from formatting_checker import check_table_contents, is_in_table
+
+def make_table(doc, rows, cols, size=12):
+    table = doc.add_table(rows=rows, cols=cols)
+    for row in table.rows:
+        for cell in row.cells:
+            run = cell.paragraphs[0].add_run("x")
+            run.font.name = "Times New Roman"
+            run.font.size = Pt(size)
+    return table
+
+def test_walker_handles_merged_cells():
+    """Объединенные ячейки: gridSpan сдвигает столбцы, продолжения vMerge пропускаются"""
+    doc = Document()
+    table = doc.add_table(rows=3, cols=3)
+    table.cell(0, 0).merge(table.cell(0, 1))  # gridSpan="2"
+    table.cell(1, 2).merge(table.cell(2, 2))  # vMerge
+
+    cells = [(cell.row, cell.column, cell.span) for cell in iter_table_cells(table._tbl)]
+
+    assert cells == [(0, 0, 2), (0, 2, 1), (1, 0, 1), (1, 1, 1), (1, 2, 1), (2, 0, 1), (2, 1, 1)]
+    assert is_in_table(table.cell(0, 0).paragraphs[0], doc)
+
+def test_table_contents_grouped_per_table():
+    """Одно замечание на нарушение в таблице, с числом ячеек и первой ячейкой"""
+    doc = Document()
+    doc.add_paragraph("Таблица 1 – Данные")
+    table = make_table(doc, 40, 5)
+    for cell in table.columns[3].cells[10:]:
+        cell.paragraphs[0].runs[0].font.size = Pt(14)
+    doc.add_paragraph("Текст после таблицы")
+    make_table(doc, 2, 2)
+
+    comments = []
+    check_table_contents(doc, comments, "Тест")
+
+    assert [(f.code, f.para_idx) for f in comments] == [("table_text.font_size", 1)]
+    assert comments[0].args == (1, 12, 14, 30, 11, 4)
+
+def test_table_number_from_title_and_exact_spacing():
+    """В замечании - номер таблицы из заголовка; точный интервал не сравнивается с множителем"""
+    doc = Document()
+    make_table(doc, 1, 1, size=14)
+    doc.add_paragraph("Таблица 5 – Данные")
+    table = make_table(doc, 2, 2, size=14)
+    exact = table.cell(0, 0).paragraphs[0].paragraph_format
+    exact.line_spacing_rule = WD_LINE_SPACING.EXACTLY
+    exact.line_spacing = Pt(12)
+    doc.add_paragraph("Текст после таблицы")
+
+    comments = []
+    check_table_contents(doc, comments, "Тест")
+
+    assert [(f.code, f.args[0]) for f in comments] == [("table_text.font_size", "без заголовка"),
+                                                       ("table_text.font_size", 5)]
+    assert "в таблице 5." in comments[1].message
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from docx import Document
+from docx.oxml import parse_xml
+
+from document_outline import DocumentOutline, paragraph_outline_levels
+from formatting_checker import check_table_of_contents
+from table_of_contents import extract_toc_entries, normalize_title, split_entry_text
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+def add_xml(paragraph, content):
+    for element in parse_xml(f'<w:p {W}>{content}</w:p>'):
+        paragraph._p.append(element)
+
+def toc_entry(doc, text, begin=None, end=False):
+    """Пункт оглавления внутри поля TOC: первый пункт открывает поле, последний закрывает"""
+    para = doc.add_paragraph()
+    content = ""
+    if begin:
+        content += (f'<w:r><w:fldChar w:fldCharType="begin"/></w:r><w:r><w:instrText>{begin}</w:instrText></w:r>'
+                    '<w:r><w:fldChar w:fldCharType="separate"/></w:r>')
+    title, page = text.split("\t")
+    content += f'<w:r><w:t>{title}</w:t></w:r><w:r><w:tab/><w:t>{page}</w:t></w:r>'
+    if end:
+        content += '<w:r><w:fldChar w:fldCharType="end"/></w:r>'
+    add_xml(para, content)
+    return para
+
+def build_outline(doc, levels):
+    outline = DocumentOutline()
+    for i, level in sorted(levels.items()):
+        outline.add(i, level, doc.paragraphs[i].text)
+    return outline
+
+def test_normalize_title():
+    assert normalize_title("1.2. Основные  понятия.") == "основные понятия"
+    assert normalize_title("ПРИЛОЖЕНИЕ А Исходный код") == "приложение а"
+    assert normalize_title("Заключение\xa0") == normalize_title("ЗАКЛЮЧЕНИЕ")
+    assert split_entry_text("1.1 Методы\t5") == ("1.1", "Методы", 5)
+    assert split_entry_text("ВВЕДЕНИЕ ..........") == (None, "ВВЕДЕНИЕ", None)
+
+def test_toc_field_against_outline():
+    """Пункты поля TOC сверяются с заголовками по стилям; глубина - из ключа \\o"""
+    doc = Document()
+    doc.add_paragraph("СОДЕРЖАНИЕ")
+    toc_entry(doc, "Введение\t3", begin='TOC \\o "1-2" \\h \\z \\u')
+    toc_entry(doc, "1 Обзор\t4")
+    toc_entry(doc, "1.1 Методы\t5")
+    toc_entry(doc, "2 Старое название\t7")
+    toc_entry(doc, "Лишний пункт\t9", end=True)
+    doc.add_heading("Введение", level=1)             # 6
+    doc.add_heading("1 Обзор", level=1)              # 7
+    doc.add_heading("1.1 Методы", level=2)           # 8
+    doc.add_heading("1.1.1 Глубже оглавления", level=3)
+    doc.add_heading("1.2 Новые методы", level=2)     # 10
+    doc.add_heading("2 Новое название", level=1)     # 11
+
+    entries, max_level = extract_toc_entries(doc, doc.paragraphs)
+    assert max_level == 2
+    assert [(e.para_idx, e.level, e.number, e.page) for e in entries] == [
+        (1, 1, None, 3), (2, 1, "1", 4), (3, 2, "1.1", 5), (4, 1, "2", 7), (5, 1, None, 9)]
+
+    comments = []
+    check_table_of_contents(doc, doc.paragraphs, build_outline(doc, paragraph_outline_levels(doc)), comments, "Тест")
+    assert [(f.code, f.para_idx, f.args) for f in comments] == [
+        ("toc.mismatched_entry", 4, ("2 Старое название", "2 Новое название")),
+        ("toc.extra_entry", 5, ("Лишний пункт",)),
+        ("toc.missing_entry", 10, ("1.2 Новые методы",)),
+    ]
+
+def test_manual_toc_with_classified_headings():
+    """Содержание, набранное вручную с отточием, и заголовки без стилей"""
+    doc = Document()
+    doc.add_paragraph("СОДЕРЖАНИЕ")
+    doc.add_paragraph("ВВЕДЕНИЕ ....................... 3")
+    doc.add_paragraph("1. ТЕОРЕТИЧЕСКАЯ ЧАСТЬ .......... 4")
+    doc.add_paragraph("ПРИЛОЖЕНИЕ А ...................")
+    doc.add_paragraph("ВВЕДЕНИЕ")                  # 4
+    doc.add_paragraph("Текст введения.")
+    doc.add_paragraph("1. Теоретическая часть")    # 6
+    doc.add_paragraph("ПРИЛОЖЕНИЕ А")              # 7
+    doc.add_paragraph("ПРИЛОЖЕНИЕ Б")              # 8
+
+    comments = []
+    check_table_of_contents(doc, doc.paragraphs, build_outline(doc, {4: 1, 6: 1, 7: 1, 8: 1}), comments, "Тест")
+    assert [(f.code, f.para_idx, f.args) for f in comments] == [("toc.missing_entry", 8, ("ПРИЛОЖЕНИЕ Б",))]
+
+def test_no_toc():
+    doc = Document()
+    doc.add_heading("Введение", level=1)
+    comments = []
+    check_table_of_contents(doc, doc.paragraphs, build_outline(doc, {0: 1}), comments, "Тест")
+    assert comments == []
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import re
+
+from docx import Document
+
+from text_layer import TextLayer
+from formatting_checker import check_in_text_citations
+
+def test_matches_map_to_paragraphs():
+    """Совпадения в общем тексте относятся к своим абзацам и не переходят границу абзаца"""
+    doc = Document()
+    for text in ["Первый [1]", "", "Второй [2] и [3]", "Хвост [", "4] не ссылка"]:
+        doc.add_paragraph(text)
+    layer = TextLayer(doc.paragraphs)
+
+    pattern = re.compile(r"\[\s*\d+\s*\]")
+    assert [(i, m.group()) for i, m in layer.finditer(pattern)] == [(0, "[1]"), (2, "[2]"), (2, "[3]")]
+    assert [i for i, _ in layer.finditer(pattern, start_idx=1)] == [2, 2]
+    assert list(layer.finditer(pattern, start_idx=5)) == []
+    assert [layer.paragraph_text(i) for i in range(len(layer))] == [p.text for p in doc.paragraphs]
+
+def test_in_text_citations_one_finding_per_paragraph():
+    """Неправильные ссылки собираются по абзацам, абзацы до start_idx пропускаются"""
+    doc = Document()
+    for text in ["До введения [ 1 ]", "Ссылки [ 2 ] и [3 ]", "Правильно [4, с. 5]", "Снова [5, 10]"]:
+        doc.add_paragraph(text)
+
+    comments = []
+    check_in_text_citations(doc.paragraphs, 1, comments, "Тест")
+
+    assert [(f.para_idx, f.args[0]) for f in comments] == [(1, ("[ 2", "3 ]")), (3, ("[5, 1",))]
+
+def test_match_across_paragraphs_keeps_first_paragraph():
+    """Совпадение, захватившее следующий абзац, не теряет ссылку в первом абзаце"""
+    from reference_index import FIGURE, build_reference_index
+
+    doc = Document()
+    for text in ["Схема приведена на рисунке 1", "- 2 варианта подключения", "См. рис. 3"]:
+        doc.add_paragraph(text)
+    assert dict(build_reference_index(doc.paragraphs).items(FIGURE)) == {1: [0], 3: [2]}
+
+    layer = TextLayer(doc.paragraphs)
+    pattern = re.compile(r"\d+\s*-?\s*\d*")
+    assert [(i, m.group()) for i, m in layer.finditer(pattern)] == [(0, "1"), (1, "2 "), (2, "3")]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from docx import Document
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+import formatting_checker
+from formatting_checker import check_document_formatting, CheckResult
+
+
+def create_test_doc(path):
+    """Создает небольшой документ с введением и обычным текстом"""
+    doc = Document()
+    heading = doc.add_paragraph("ВВЕДЕНИЕ")
+    heading.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    heading.runs[0].bold = True
+    for i in range(20):
+        doc.add_paragraph(f"Абзац основного текста номер {i}, который нужно проверить.")
+    doc.save(path)
+    return str(path)
+
+def test_without_time_budget(tmp_path):
+    """Без лимита времени проверка выполняется полностью"""
+    doc_path = create_test_doc(tmp_path / "budget.docx")
+    comments = check_document_formatting(doc_path)
+
+    assert isinstance(comments, CheckResult)
+    assert not comments.is_partial
+    assert comments.skipped == []
+    assert not any("лимита времени" in text for _, text, _ in comments)
+
+def test_expired_time_budget(tmp_path):
+    """При исчерпанном лимите возвращается частичный результат с перечнем пропущенного"""
+    doc_path = create_test_doc(tmp_path / "budget.docx")
+    comments = check_document_formatting(doc_path, time_budget=0)
+
+    assert comments.is_partial
+    assert comments.skipped[0].startswith("Абзацы 0-")
+    assert "Нумерация списка литературы" in comments.skipped
+    partial_notes = [text for idx, text, _ in comments if "лимита времени" in text]
+    assert len(partial_notes) == 1
+    assert "Рисунки и подписи к ним" in partial_notes[0]
+
+def test_skipped_rules_do_not_collect_data(tmp_path, monkeypatch):
+    """Подписи, поля и список литературы не ищутся, если все правила пропущены по лимиту"""
+    doc_path = create_test_doc(tmp_path / "budget.docx")
+
+    def fail(*args):
+        raise AssertionError("вычисление для пропущенного правила")
+
+    for name in ("evaluate_fields", "find_figure_captions", "find_table_titles", "find_bibliography_entries",
+                 "TextLayer"):
+        monkeypatch.setattr(formatting_checker, name, fail)
+    comments = check_document_formatting(doc_path, time_budget=0)
+    assert comments.is_partial
+    assert not any(finding.code == "check.failed" for finding in comments)
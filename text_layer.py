@@ -0,0 +1,82 @@
+"""
+Текст документа одной строкой для текстовых правил.
+
+Правила, которые ищут что-то регулярным выражением (ссылки на источники,
+ссылки на рисунки и таблицы), раньше вызывали поиск отдельно для каждого
+абзаца. Здесь тексты абзацев один раз склеиваются через перевод строки, и
+каждое правило запускает поиск один раз по всему тексту. Абзац, к которому
+относится совпадение, находится двоичным поиском по смещениям начала абзацев.
+
+Перевод строки в качестве разделителя выбран потому, что `.` его не
+захватывает. Если совпадение все же переходит через границу абзаца
+(например, через `\\s` или `[^...]`), поиск в этом абзаце повторяется с
+концом строки на границе абзаца - результат тот же, что при поиске по
+одному абзацу.
+"""
+
+import bisect
+
+SEPARATOR = "\n"
+
+
+class TextLayer:
+    """
+    Тексты абзацев, склеенные в одну строку, и смещения начала каждого абзаца.
+
+    Пример:
+        layer = TextLayer(doc.paragraphs)
+        for para_idx, match in layer.finditer(pattern, start_idx=intro_index):
+            ...
+    """
+
+    def __init__(self, doc_paragraphs):
+        texts = [para.text for para in doc_paragraphs]
+        self.starts = []
+        offset = 0
+        for text in texts:
+            self.starts.append(offset)
+            offset += len(text) + len(SEPARATOR)
+        self.text = SEPARATOR.join(texts)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def para_index(self, offset):
+        """Индекс абзаца, в который попадает смещение в общем тексте."""
+        return bisect.bisect_right(self.starts, offset) - 1
+
+    def paragraph_end(self, para_idx):
+        """Смещение конца текста абзаца (без разделителя)."""
+        if para_idx + 1 < len(self.starts):
+            return self.starts[para_idx + 1] - len(SEPARATOR)
+        return len(self.text)
+
+    def paragraph_text(self, para_idx):
+        """Текст абзаца по индексу."""
+        return self.text[self.starts[para_idx]:self.paragraph_end(para_idx)]
+
+    def finditer(self, pattern, start_idx=0):
+        """
+        Совпадения скомпилированного выражения во всем тексте, начиная с абзаца start_idx.
+
+        Yields:
+            (индекс абзаца, match) - смещения в match относятся к общему тексту
+        """
+        if start_idx >= len(self.starts):
+            return
+        position = self.starts[max(start_idx, 0)]
+        while position <= len(self.text):
+            match = pattern.search(self.text, position)
+            if match is None:
+                return
+            para_idx = self.para_index(match.start())
+            end = self.paragraph_end(para_idx)
+            if match.end() > end:
+                # Совпадение захватило разделитель или следующий абзац - ищем заново
+                # только в пределах абзаца, как при поиске по одному абзацу
+                for match in pattern.finditer(self.text, match.start(), end):
+                    yield para_idx, match
+                position = end + len(SEPARATOR)
+                continue
+            yield para_idx, match
+            position = match.end() if match.end() > match.start() else match.end() + 1
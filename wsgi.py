@@ -30,7 +30,7 @@ except Exception as e:
     raise
 
 # Проверяем наличие основных файлов
-required_modules = ['formatting_checker.py', 'comment_utils.py', 'formatting_utils.py']
+required_modules = ['formatting_checker.py', 'comment_utils.py', 'formatting_utils.py', 'findings.py', 'rule_profiles.py', 'rule_profiles.json', 'classification_trace.py', 'image_inspector.py', 'table_walker.py', 'reference_index.py', 'text_layer.py', 'field_engine.py', 'equation_index.py', 'document_outline.py', 'table_of_contents.py', 'docx_writer.py', 'findings_export.py', 'findings_report.py']
 for module in required_modules:
     module_path = os.path.join(path, module)
     if os.path.exists(module_path):